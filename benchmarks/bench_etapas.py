@@ -0,0 +1,288 @@
+"""
+Benchmark por etapa do processamento, sobre o corpus sintético de benchmarks.corpus_nf.
+
+Mede separadamente:
+    extrair_texto_pdf           camada de texto (notas com texto)
+    extrair_texto_ocr[<dpi>]    OCR das notas digitalizadas, em cada DPI de OCR_DPI_OPTIONS
+    extrair_dados_texto         análise do texto já extraído
+    process_pdf                 extração completa de cada nota, sem cache
+    salvar_em_xlsx              exportação de todas as linhas para um POs.xlsx novo
+    process_directory[w=<n>]    execução completa sobre uma cópia do corpus
+
+Cada nota é medida --repeticoes vezes (vale o menor tempo); as execuções
+completas (salvar_em_xlsx, process_directory) contam cada repetição como uma
+amostra. As etapas de OCR exigem Tesseract e Poppler e são omitidas sem eles.
+O resultado vai para um JSON; com --comparar, as medianas são comparadas
+com as de um resultado anterior e o comando termina com código 1 se alguma
+etapa ficou mais lenta que a tolerância.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_etapas [--corpus PASTA] [--saida etapas.json] [--comparar base.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus_nf import carregar_corpus, gerar_corpus
+from config import DEFAULT_WORKERS, EXTRATOR_VERSAO, OCR_DPI_OPTIONS
+from core.extrators import extrair_dados_texto, extrair_texto_pdf
+from core.file_utils import salvar_em_xlsx
+from core.ocr_utils import check_dependencies, extrair_texto_ocr
+from core.processor import linhas_do_resultado, process_directory, process_pdf, processar_valor_monetario
+
+VERSAO_RESULTADO = 1
+
+
+@contextlib.contextmanager
+def silencio():
+    """Descarta as mensagens de depuração das funções medidas."""
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+
+def cronometrar(funcao, *args, repeticoes: int = 1):
+    """(menor tempo em s entre as repetições, retorno da última chamada)."""
+    melhor = float("inf")
+    retorno = None
+    for _ in range(repeticoes):
+        with silencio():
+            inicio = time.perf_counter()
+            retorno = funcao(*args)
+            melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, retorno
+
+
+def resumir(tempos: list, **extras) -> dict:
+    """Estatísticas (ms) de uma lista de tempos em segundos."""
+    ordenados = sorted(tempos)
+    return {
+        "n": len(tempos),
+        "total_s": round(sum(tempos), 4),
+        "media_ms": round(statistics.fmean(tempos) * 1000, 3),
+        "mediana_ms": round(statistics.median(tempos) * 1000, 3),
+        "p95_ms": round(ordenados[min(len(ordenados) - 1, int(0.95 * len(ordenados)))] * 1000, 3),
+        "min_ms": round(ordenados[0] * 1000, 3),
+        "max_ms": round(ordenados[-1] * 1000, 3),
+        **extras,
+    }
+
+
+def chave_linha(po, linha, valor) -> tuple:
+    """Identificação de uma linha de pedido, com o valor convertido como em process_pdf."""
+    if isinstance(valor, str):
+        valor = processar_valor_monetario(valor)
+    return po, linha, round(valor, 2)
+
+
+def acerto(encontradas: set, esperado: dict) -> float:
+    """Fração das linhas de pedido esperadas (chave_linha) presentes em encontradas."""
+    linhas = [chave_linha(linha["po"], linha["linha"], linha["valor"]) for linha in esperado["linhas"]]
+    return sum(linha in encontradas for linha in linhas) / len(linhas) if linhas else 1.0
+
+
+def linhas_extraidas(dados: dict) -> set:
+    """chave_linha das linhas encontradas por extrair_dados_texto."""
+    return {
+        chave_linha(linha.group("po"), linha.group("linha"), linha.group("valor"))
+        for linha in (dados or {}).get("linhas_nf", [])
+    }
+
+
+def medir_etapas(diretorio: str, notas: list, repeticoes: int, workers: list, ocr: bool) -> dict:
+    etapas = {}
+    caminho = {nota["arquivo"]: os.path.join(diretorio, nota["arquivo"]) for nota in notas}
+    com_texto = [nota for nota in notas if nota["tipo"] == "texto"]
+    digitalizadas = [nota for nota in notas if nota["tipo"] == "digitalizado"]
+
+    # Camada de texto e análise do texto
+    tempos, textos = [], {}
+    for nota in com_texto:
+        tempo, textos[nota["arquivo"]] = cronometrar(extrair_texto_pdf, caminho[nota["arquivo"]], repeticoes=repeticoes)
+        tempos.append(tempo)
+    if tempos:
+        paginas = sum(nota["paginas"] for nota in com_texto)
+        etapas["extrair_texto_pdf"] = resumir(tempos, paginas=paginas)
+
+    # OCR por DPI, com o acerto das linhas por nível de ruído
+    if ocr and digitalizadas:
+        for dpi in range(OCR_DPI_OPTIONS["inicial"], OCR_DPI_OPTIONS["max"] + 1, OCR_DPI_OPTIONS["passo"]):
+            tempos, acertos = [], {}
+            for nota in digitalizadas:
+                tempo, texto = cronometrar(extrair_texto_ocr, caminho[nota["arquivo"]], dpi, repeticoes=repeticoes)
+                tempos.append(tempo)
+                textos.setdefault(nota["arquivo"], texto)
+                with silencio():
+                    dados = extrair_dados_texto(caminho[nota["arquivo"]], texto)
+                acertos.setdefault(nota["ruido"], []).append(acerto(linhas_extraidas(dados), nota["esperado"]))
+            etapas[f"extrair_texto_ocr[{dpi}dpi]"] = resumir(
+                tempos, paginas=sum(nota["paginas"] for nota in digitalizadas),
+                acerto={ruido: round(statistics.fmean(valores), 4) for ruido, valores in acertos.items()}
+            )
+
+    tempos, acertos = [], []
+    for nota in notas:
+        if nota["arquivo"] in textos:
+            tempo, dados = cronometrar(
+                extrair_dados_texto, caminho[nota["arquivo"]], textos[nota["arquivo"]], repeticoes=repeticoes
+            )
+            tempos.append(tempo)
+            acertos.append(acerto(linhas_extraidas(dados), nota["esperado"]))
+    if tempos:
+        etapas["extrair_dados_texto"] = resumir(tempos, acerto=round(statistics.fmean(acertos), 4))
+
+    # Extração completa de cada nota (sem OCR disponível, só as notas com texto)
+    tempos, acertos, dados_por_po = [], [], {}
+    for nota in notas if ocr else com_texto:
+        tempo, (resultado, _) = cronometrar(process_pdf, caminho[nota["arquivo"]], False, repeticoes=repeticoes)
+        tempos.append(tempo)
+        linhas = {
+            chave_linha(linha["po"], linha["linha"], linha["valor"])
+            for linha in (resultado or {}).get("linhas", []) if linha.get("processado")
+        }
+        acertos.append(acerto(linhas, nota["esperado"]))
+        for po, linhas_po in linhas_do_resultado(resultado).items():
+            dados_por_po.setdefault(po, []).extend(linhas_po)
+    if tempos:
+        etapas["process_pdf"] = resumir(tempos, acerto=round(statistics.fmean(acertos), 4))
+
+    # Exportação das linhas extraídas para um POs.xlsx novo
+    if dados_por_po:
+        tempos = []
+        with tempfile.TemporaryDirectory() as saida:
+            for _ in range(repeticoes):
+                tempo, gravou = cronometrar(salvar_em_xlsx, saida, dados_por_po, "POs.xlsx")
+                assert gravou, "salvar_em_xlsx falhou"
+                tempos.append(tempo)
+                for nome in os.listdir(saida):
+                    os.remove(os.path.join(saida, nome))
+        etapas["salvar_em_xlsx"] = resumir(
+            tempos, linhas=sum(len(linhas) for linhas in dados_por_po.values()), pos=len(dados_por_po)
+        )
+
+    # Execução completa sobre uma cópia do corpus (os PDFs são movidos)
+    arquivos = [nota["arquivo"] for nota in (notas if ocr else com_texto)]
+    for quantidade in workers:
+        tempos = []
+        for _ in range(repeticoes):
+            with tempfile.TemporaryDirectory() as trabalho:
+                pasta = os.path.join(trabalho, "notas")
+                os.makedirs(pasta)
+                for arquivo in arquivos:
+                    shutil.copy2(caminho[arquivo], pasta)
+                tempo, _ = cronometrar(
+                    process_directory, pasta, "Linear", [], trabalho, "POs.xlsx",
+                    lambda valor, maximo: None, lambda mensagem: None, 10, quantidade, False
+                )
+                tempos.append(tempo)
+        etapas[f"process_directory[w={quantidade}]"] = resumir(
+            tempos, documentos=len(arquivos), documentos_por_s=round(len(arquivos) / statistics.median(tempos), 3)
+        )
+
+    return etapas
+
+
+def commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def comparar(atual: dict, base: dict, tolerancia: float, minimo_ms: float) -> list:
+    """
+    Imprime a comparação das medianas e devolve as etapas que ficaram mais
+    lentas que a tolerância (diferenças abaixo de minimo_ms são ruído).
+    """
+    regressoes = []
+    print(f"\n{'etapa':<32} {'base (ms)':>12} {'atual (ms)':>12} {'razão':>8}")
+    for etapa, medidas in atual["etapas"].items():
+        anterior = base.get("etapas", {}).get(etapa)
+        if not anterior:
+            print(f"{etapa:<32} {'-':>12} {medidas['mediana_ms']:>12.1f} {'nova':>8}")
+            continue
+        razao = medidas["mediana_ms"] / anterior["mediana_ms"] if anterior["mediana_ms"] else float("inf")
+        lenta = razao > 1 + tolerancia and medidas["mediana_ms"] - anterior["mediana_ms"] > minimo_ms
+        marca = "  <- regressão" if lenta else ""
+        print(f"{etapa:<32} {anterior['mediana_ms']:>12.1f} {medidas['mediana_ms']:>12.1f} {razao:>8.2f}{marca}")
+        if marca:
+            regressoes.append(etapa)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="pasta do corpus (reaproveitada se já tiver corpus.json; padrão: temporária)")
+    parser.add_argument("--textos", type=int, default=20, help="notas com texto, se o corpus for gerado")
+    parser.add_argument("--digitalizados", type=int, default=2, help="notas digitalizadas por nível de ruído")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, DEFAULT_WORKERS}))
+    parser.add_argument("--saida", default="bench_etapas.json", help="arquivo JSON do resultado")
+    parser.add_argument("--comparar", metavar="BASE", help="resultado anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="aumento da mediana aceito (0.10 = 10%%)")
+    parser.add_argument("--minimo-ms", type=float, default=1.0, help="diferença mínima para contar como regressão")
+    args = parser.parse_args()
+
+    with silencio():
+        erros, _ = check_dependencies()
+    ocr = not erros
+    if not ocr:
+        print("OCR indisponível, etapas de OCR omitidas:\n  " + "\n  ".join(erros))
+
+    with contextlib.ExitStack() as pilha:
+        corpus = args.corpus or pilha.enter_context(tempfile.TemporaryDirectory())
+        if os.path.exists(os.path.join(corpus, "corpus.json")):
+            notas = carregar_corpus(corpus)
+        else:
+            notas = gerar_corpus(corpus, args.textos, args.digitalizados, semente=args.semente)
+
+        inicio = time.perf_counter()
+        etapas = medir_etapas(corpus, notas, args.repeticoes, args.workers, ocr)
+        duracao = time.perf_counter() - inicio
+
+    resultado = {
+        "versao": VERSAO_RESULTADO,
+        "meta": {
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": commit_atual(),
+            "extrator_versao": EXTRATOR_VERSAO,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "ocr": ocr,
+            "notas": len(notas),
+            "repeticoes": args.repeticoes,
+            "duracao_s": round(duracao, 2),
+        },
+        "etapas": etapas,
+    }
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+
+    print(f"{'etapa':<32} {'n':>5} {'mediana (ms)':>14} {'p95 (ms)':>12} {'total (s)':>10}")
+    for etapa, medidas in etapas.items():
+        print(f"{etapa:<32} {medidas['n']:>5} {medidas['mediana_ms']:>14.1f} {medidas['p95_ms']:>12.1f} "
+              f"{medidas['total_s']:>10.2f}")
+    print(f"\nResultado gravado em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultado, json.load(arquivo), args.tolerancia, args.minimo_ms)
+        if regressoes:
+            print(f"\n{len(regressoes)} etapa(s) acima da tolerância de {args.tolerancia:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark adversarial do padrão alternativo de linhas de pedido.
+
+Gera textos de OCR ruidosos com muitos números de seis dígitos e "linha",
+mas sem "valor": o pior caso da regex original, que retrocede pelo documento
+inteiro a cada candidato. Compara a regex com extrair_linhas_alternativas e
+mostra o tempo por caractere, que deve se manter constante no analisador linear.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_linhas_alternativas [--max-regex SEGUNDOS]
+"""
+import argparse
+import random
+import re
+import time
+
+from core.extrators import extrair_linhas_alternativas
+
+# Padrão alternativo original de extrair_linhas_pedido
+PADRAO_ORIGINAL = re.compile(
+    r'(?:/)?\s*(?:PO\s+)?(?P<po>\d{6})[\s\S]*?(?:linha|item)[\s:]*(?P<linha>\d+)[\s\S]*?'
+    r'(?:valor|vlr?|total)[\s:]*[\$R]*(?P<valor>[\d.,]+)'
+    r'(?:[\s/;-]*(?P<descricao>[^\n\r]*))?',
+    re.IGNORECASE
+)
+
+TAMANHOS = (1_000, 2_000, 4_000, 8_000, 16_000, 32_000, 64_000)
+
+
+def texto_adversarial(tamanho: int, semente: int = 0) -> str:
+    """Texto com números de seis dígitos e "linha n", sem nenhuma palavra de valor."""
+    rng = random.Random(semente)
+    partes = []
+    total = 0
+    while total < tamanho:
+        parte = rng.choice([
+            f"{rng.randint(0, 999999):06d}",
+            f"linha {rng.randint(1, 99)}",
+            "servico de manutencao",
+            "\n",
+        ])
+        partes.append(parte)
+        total += len(parte) + 1
+    return " ".join(partes)[:tamanho]
+
+
+def cronometrar(funcao, texto: str) -> float:
+    inicio = time.perf_counter()
+    funcao(texto)
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-regex", type=float, default=10.0,
+                        help="interrompe a regex original quando uma medição passar deste tempo (s)")
+    args = parser.parse_args()
+
+    print(f"{'caracteres':>10} {'regex (ms)':>12} {'linear (ms)':>12} {'linear (us/kchar)':>18}")
+    regex_ativa = True
+    for tamanho in TAMANHOS:
+        texto = texto_adversarial(tamanho)
+
+        linear = cronometrar(extrair_linhas_alternativas, texto)
+
+        coluna_regex = "-"
+        if regex_ativa:
+            tempo_regex = cronometrar(lambda t: list(PADRAO_ORIGINAL.finditer(t)), texto)
+            coluna_regex = f"{tempo_regex * 1000:.1f}"
+            regex_ativa = tempo_regex < args.max_regex
+
+        print(f"{tamanho:>10} {coluna_regex:>12} {linear * 1000:>12.3f} {linear * 1e6 / (tamanho / 1000):>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
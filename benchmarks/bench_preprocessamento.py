@@ -0,0 +1,72 @@
+"""
+Micro-benchmark do pré-processamento de páginas: cadeia PIL original x core.preprocessamento.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_preprocessamento [--repeticoes N]
+"""
+import argparse
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from config import OCR_PERFIS_PREPROCESSAMENTO
+from core.preprocessamento import preprocessar
+
+# Página A4 em polegadas
+A4 = (8.27, 11.69)
+
+
+def pagina_sintetica(dpi: int, semente: int = 0) -> Image.Image:
+    """Página em tons de cinza com faixas de "texto" escuras sobre fundo claro ruidoso."""
+    rng = np.random.default_rng(semente)
+    largura, altura = int(A4[0] * dpi), int(A4[1] * dpi)
+    pixels = rng.normal(230, 20, (altura, largura)).clip(0, 255).astype(np.uint8)
+
+    passo = max(1, dpi // 6)
+    for topo in range(passo, altura - passo, passo):
+        pixels[topo:topo + passo // 3, dpi // 2:largura - dpi // 2] //= 4
+
+    return Image.fromarray(pixels, mode='L')
+
+
+def cadeia_pil(img: Image.Image) -> Image.Image:
+    """Pré-processamento original de extrair_texto_ocr."""
+    img = img.convert('L').point(lambda x: 0 if x < 180 else 255)
+    return ImageEnhance.Contrast(img).enhance(1.5)
+
+
+def cronometrar(funcao, img: Image.Image, repeticoes: int) -> float:
+    """Menor tempo (s) entre as repetições."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(img).close()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'DPI':>5} {'etapa':<28} {'tempo (ms)':>12} {'x PIL':>8}")
+    for dpi in (300, 600):
+        img = pagina_sintetica(dpi)
+
+        # A saída do perfil padrão deve ser idêntica à da cadeia PIL
+        assert np.array_equal(np.asarray(cadeia_pil(img)), np.asarray(preprocessar(img, 'padrao')))
+
+        referencia = cronometrar(cadeia_pil, img, args.repeticoes)
+        print(f"{dpi:>5} {'PIL (original)':<28} {referencia * 1000:>12.1f} {1:>8.2f}")
+
+        for perfil in OCR_PERFIS_PREPROCESSAMENTO:
+            tempo = cronometrar(lambda i: preprocessar(i, perfil), img, args.repeticoes)
+            print(f"{dpi:>5} {'numpy/' + perfil:<28} {tempo * 1000:>12.1f} {referencia / tempo:>8.2f}")
+
+        img.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark da exportação para XLSX: workbook em memória x modo write-only (streaming).
+
+Gera um POs.xlsx novo com N linhas distribuídas entre algumas POs e mede o
+tempo total e o pico de memória alocada (tracemalloc) de cada caminho de
+salvar_em_xlsx.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.bench_xlsx [--linhas 1000 10000 100000] [--pos 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from core.file_utils import salvar_em_xlsx
+
+
+def dados_sinteticos(linhas: int, pos: int, semente: int = 0) -> dict:
+    """Linhas de pedido no formato de dados_por_po, com algumas duplicatas."""
+    rng = random.Random(semente)
+    numeros_po = [str(450000 + i) for i in range(pos)]
+    dados = {}
+    for _ in range(linhas):
+        dados.setdefault(rng.choice(numeros_po), []).append({
+            "nota": str(rng.randint(1, linhas // 2 + 1)),
+            "data_emissao": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+            "linha": str(rng.randint(1, 20)),
+            "descricao": "SERVICO DE MANUTENCAO PREVENTIVA",
+            "valor": f"{rng.randint(100, 99999)},{rng.randint(0, 99):02d}",
+        })
+    return dados
+
+
+def medir(dados: dict, streaming: bool) -> tuple:
+    """
+    Retorna (tempo em s, pico de memória em MB) de uma exportação completa.
+
+    O tempo é medido sem o tracemalloc, que deixa a alocação bem mais lenta;
+    o pico de memória vem de uma segunda exportação, com o rastreamento ativo.
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        inicio = time.perf_counter()
+        assert salvar_em_xlsx(diretorio, dados, "POs.xlsx", streaming=streaming)
+        tempo = time.perf_counter() - inicio
+        os.remove(os.path.join(diretorio, "POs.xlsx"))
+
+        tracemalloc.start()
+        assert salvar_em_xlsx(diretorio, dados, "POs.xlsx", streaming=streaming)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return tempo, pico / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--pos", type=int, default=20, help="quantidade de planilhas (POs)")
+    args = parser.parse_args()
+
+    print(f"{'linhas':>8} {'caminho':<12} {'tempo (s)':>10} {'pico (MB)':>10} {'x tempo':>10}")
+    for linhas in args.linhas:
+        dados = dados_sinteticos(linhas, args.pos)
+
+        tempo_ref, pico_ref = medir(dados, streaming=False)
+        print(f"{linhas:>8} {'memória':<12} {tempo_ref:>10.2f} {pico_ref:>10.1f} {1:>10.2f}")
+
+        tempo, pico = medir(dados, streaming=True)
+        print(f"{linhas:>8} {'streaming':<12} {tempo:>10.2f} {pico:>10.1f} {tempo_ref / tempo:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Gerador de um corpus sintético de notas fiscais em PDF para os benchmarks.
+
+Gera notas no layout esperado pelos extratores (número da nota, data de
+emissão e linhas "PO <po> LINHA <n> VALOR <v> / <descrição>"), com várias
+páginas e muitas linhas de PO, em dois tipos:
+
+    texto          PDF com camada de texto (lido por pdfplumber)
+    digitalizado   páginas rasterizadas, como um documento escaneado, em
+                   níveis de ruído (limpo, leve, medio, forte); só o OCR lê
+
+Cada nota é descrita em corpus.json com os valores esperados, para que os
+benchmarks também meçam o acerto da extração.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.corpus_nf <pasta> [--textos 20] [--digitalizados 4] [--semente 0]
+"""
+import argparse
+import json
+import os
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Página A4 em pontos (1/72")
+A4_PONTOS = (595, 842)
+MARGEM = 40
+ENTRELINHA = 13
+FONTE_PONTOS = 10
+LINHAS_POR_PAGINA = (A4_PONTOS[1] - 2 * MARGEM) // ENTRELINHA
+
+# Níveis de ruído das notas digitalizadas: desvio do ruído gaussiano, fração
+# de pixels "sal e pimenta" e inclinação máxima da página (graus)
+RUIDOS = {
+    "limpo": {"desvio": 0, "pontos": 0.0, "inclinacao": 0.0},
+    "leve": {"desvio": 12, "pontos": 0.002, "inclinacao": 0.5},
+    "medio": {"desvio": 28, "pontos": 0.01, "inclinacao": 1.0},
+    "forte": {"desvio": 45, "pontos": 0.03, "inclinacao": 2.0},
+}
+
+SERVICOS = (
+    "Servico de pintura", "Manutencao preventiva", "Instalacao eletrica", "Reparo hidraulico",
+    "Limpeza de fachada", "Troca de revestimento", "Impermeabilizacao de laje", "Locacao de andaime",
+)
+
+
+def formatar_valor(centavos: int) -> str:
+    """Valor no formato brasileiro (1.234,56)."""
+    inteiro, fracao = divmod(centavos, 100)
+    return f"{inteiro:,}".replace(",", ".") + f",{fracao:02d}"
+
+
+def nota_sintetica(rng: random.Random, numero: int, pos: int, linhas: int) -> dict:
+    """
+    Conteúdo de uma nota: nome do arquivo, linhas de texto e valores esperados.
+
+    Args:
+        rng: Gerador aleatório (determinístico pela semente)
+        numero: Número da nota
+        pos: Quantidade de POs distintas
+        linhas: Quantidade de linhas de pedido
+    """
+    numeros_po = sorted({str(rng.randint(100000, 999999)) for _ in range(pos)})
+    data = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2025)}"
+
+    texto = [
+        "NOTA FISCAL DE SERVICOS ELETRONICA - NFS-e",
+        f"Numero da nota {numero}",
+        f"Data e hora da emissao {data} {rng.randint(8, 18):02d}:{rng.randint(0, 59):02d}:00",
+        "PRESTADOR DE SERVICOS",
+        "Razao social: Linear Construtora LTDA",
+        f"CNPJ: {rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}/0001-{rng.randint(10, 99)}",
+        "",
+        "DISCRIMINACAO DOS SERVICOS",
+    ]
+
+    esperadas = []
+    total = 0
+    for indice in range(linhas):
+        po = numeros_po[indice % len(numeros_po)]
+        centavos = rng.randint(1_000, 5_000_000)
+        total += centavos
+        descricao = f"{rng.choice(SERVICOS)} {indice + 1}"
+        texto.append(f"PO {po} LINHA {indice + 1} VALOR {formatar_valor(centavos)} / {descricao}")
+        esperadas.append({"po": po, "linha": str(indice + 1), "valor": formatar_valor(centavos)})
+
+    texto += ["", f"VALOR TOTAL DA NOTA R$ {formatar_valor(total)}"]
+
+    return {
+        "arquivo": f"NF {numero} Linear Construtora LTDA PO {' '.join(numeros_po)}.pdf",
+        "texto": texto,
+        "esperado": {"numero_nf": str(numero), "data_nf": data, "linhas": esperadas},
+    }
+
+
+def paginar(texto: list) -> list:
+    """Divide as linhas de texto em páginas A4."""
+    return [texto[inicio:inicio + LINHAS_POR_PAGINA] for inicio in range(0, len(texto), LINHAS_POR_PAGINA)] or [[]]
+
+
+def gravar_pdf_texto(caminho: str, paginas: list):
+    """PDF mínimo com camada de texto (Helvetica, WinAnsi), uma página por lista de linhas."""
+    objetos = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    paginas_ids = []
+
+    for linhas in paginas:
+        comandos = " ".join(
+            "(%s) '" % linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for linha in linhas
+        )
+        fluxo = f"BT /F1 {FONTE_PONTOS} Tf {MARGEM} {A4_PONTOS[1] - MARGEM} Td {ENTRELINHA} TL {comandos} ET"
+        fluxo = fluxo.encode("cp1252", errors="replace")
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(fluxo) + fluxo + b"\nendstream")
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % (*A4_PONTOS, len(objetos))
+        )
+        paginas_ids.append(len(objetos))
+
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % pagina for pagina in paginas_ids), len(paginas_ids)
+    )
+
+    conteudo = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, 1):
+        posicoes.append(len(conteudo))
+        conteudo += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+
+    inicio_xref = len(conteudo)
+    conteudo += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    conteudo += b"".join(b"%010d 00000 n \n" % posicao for posicao in posicoes)
+    conteudo += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(conteudo)
+
+
+def _fonte(tamanho: int):
+    for nome in ("DejaVuSans.ttf", "arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(nome, tamanho)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=tamanho)
+    except TypeError:
+        # Pillow < 10.1: só a fonte bitmap, sem tamanho
+        return ImageFont.load_default()
+
+
+def rasterizar_pagina(linhas: list, dpi: int, ruido: str, rng: np.random.Generator) -> Image.Image:
+    """Página "escaneada": texto desenhado em tons de cinza, com ruído e inclinação."""
+    escala = dpi / 72
+    largura, altura = int(A4_PONTOS[0] * escala), int(A4_PONTOS[1] * escala)
+    img = Image.new("L", (largura, altura), 255)
+    desenho = ImageDraw.Draw(img)
+    fonte = _fonte(int(FONTE_PONTOS * escala))
+
+    for indice, linha in enumerate(linhas):
+        desenho.text((MARGEM * escala, (MARGEM + indice * ENTRELINHA) * escala), linha, fill=20, font=fonte)
+
+    parametros = RUIDOS[ruido]
+    if parametros["inclinacao"]:
+        angulo = rng.uniform(-parametros["inclinacao"], parametros["inclinacao"])
+        img = img.rotate(angulo, resample=Image.BILINEAR, fillcolor=255)
+
+    if parametros["desvio"] or parametros["pontos"]:
+        pixels = np.asarray(img, dtype=np.int16)
+        if parametros["desvio"]:
+            pixels = pixels + rng.normal(0, parametros["desvio"], pixels.shape).astype(np.int16)
+        if parametros["pontos"]:
+            sorteio = rng.random(pixels.shape)
+            pixels[sorteio < parametros["pontos"] / 2] = 0
+            pixels[sorteio > 1 - parametros["pontos"] / 2] = 255
+        img = Image.fromarray(pixels.clip(0, 255).astype(np.uint8), mode="L")
+
+    return img
+
+
+def gravar_pdf_digitalizado(caminho: str, paginas: list, dpi: int, ruido: str, rng: np.random.Generator):
+    """PDF sem camada de texto, uma imagem por página."""
+    imagens = [rasterizar_pagina(linhas, dpi, ruido, rng) for linhas in paginas]
+    imagens[0].save(caminho, "PDF", resolution=dpi, save_all=True, append_images=imagens[1:])
+    for img in imagens:
+        img.close()
+
+
+def gerar_corpus(
+        diretorio: str,
+        textos: int = 20,
+        digitalizados: int = 4,
+        ruidos: tuple = tuple(RUIDOS),
+        linhas: tuple = (1, 120),
+        pos: tuple = (1, 4),
+        dpi_digitalizacao: int = 200,
+        semente: int = 0
+) -> list:
+    """
+    Gera o corpus em diretorio e grava a descrição em corpus.json.
+
+    Args:
+        diretorio: Pasta de destino (criada se necessário)
+        textos: Quantidade de notas com camada de texto
+        digitalizados: Quantidade de notas digitalizadas por nível de ruído
+        ruidos: Níveis de ruído (chaves de RUIDOS)
+        linhas: Intervalo (mín., máx.) de linhas de pedido por nota; acima de
+            ~55 linhas a nota ocupa mais de uma página
+        pos: Intervalo (mín., máx.) de POs distintas por nota
+        dpi_digitalizacao: Resolução das páginas rasterizadas
+        semente: Semente dos geradores aleatórios
+
+    Returns:
+        Lista de notas: {'arquivo', 'tipo', 'ruido', 'paginas', 'esperado'}
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    rng = random.Random(semente)
+    rng_imagem = np.random.default_rng(semente)
+
+    especificacoes = [("texto", None)] * textos + [
+        ("digitalizado", ruido) for ruido in ruidos for _ in range(digitalizados)
+    ]
+
+    notas = []
+    for indice, (tipo, ruido) in enumerate(especificacoes):
+        nota = nota_sintetica(rng, 10000 + indice, rng.randint(*pos), rng.randint(*linhas))
+        paginas = paginar(nota["texto"])
+        caminho = os.path.join(diretorio, nota["arquivo"])
+
+        if tipo == "texto":
+            gravar_pdf_texto(caminho, paginas)
+        else:
+            gravar_pdf_digitalizado(caminho, paginas, dpi_digitalizacao, ruido, rng_imagem)
+
+        notas.append({
+            "arquivo": nota["arquivo"], "tipo": tipo, "ruido": ruido,
+            "paginas": len(paginas), "esperado": nota["esperado"],
+        })
+
+    with open(os.path.join(diretorio, "corpus.json"), "w", encoding="utf-8") as arquivo:
+        json.dump({"semente": semente, "notas": notas}, arquivo, ensure_ascii=False, indent=1)
+    return notas
+
+
+def carregar_corpus(diretorio: str) -> list:
+    """Notas descritas em corpus.json."""
+    with open(os.path.join(diretorio, "corpus.json"), encoding="utf-8") as arquivo:
+        return json.load(arquivo)["notas"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pasta")
+    parser.add_argument("--textos", type=int, default=20)
+    parser.add_argument("--digitalizados", type=int, default=4, help="notas por nível de ruído")
+    parser.add_argument("--ruidos", nargs="+", choices=list(RUIDOS), default=list(RUIDOS))
+    parser.add_argument("--linhas", type=int, nargs=2, default=[1, 120], metavar=("MIN", "MAX"))
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    notas = gerar_corpus(args.pasta, args.textos, args.digitalizados, tuple(args.ruidos),
+                         tuple(args.linhas), semente=args.semente)
+    paginas = sum(nota["paginas"] for nota in notas)
+    print(f"{len(notas)} notas ({paginas} páginas) geradas em {args.pasta}")
+
+
+if __name__ == "__main__":
+    main()
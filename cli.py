@@ -0,0 +1,282 @@
+"""
+Interface de linha de comando do ConsolidadorOS, para servidores sem tela e
+execuções agendadas (cron, Agendador de Tarefas).
+
+Não importa tkinter: as mesmas opções da interface gráfica viram argumentos,
+o log vai para a saída de erro (e para o arquivo de log rotativo) e o resumo
+pode ser gravado em JSON.
+
+Exemplos:
+    python cli.py /dados/notas --saida /dados/saida
+    python cli.py /dados/notas --saida /dados/saida --formatos xlsx,csv --workers 4 --json -
+    python cli.py /dados/notas --saida /dados/saida --monitorar
+    python cli.py /dados/notas --poppler /opt/poppler/bin --tesseract /opt/tesseract/bin/tesseract
+
+Códigos de saída:
+    0  Todos os arquivos processados com sucesso
+    1  Processamento concluído, com arquivos que precisam de revisão
+    2  Argumentos inválidos
+    3  Falha ao gravar algum dos formatos de saída
+    4  Erro fatal (pasta inexistente, exceção inesperada)
+    5  PDFs digitalizados não processados: Poppler ou Tesseract não instalados
+    130  Cancelado (Ctrl+C/SIGTERM) ou interrompido
+
+O primeiro Ctrl+C (ou SIGTERM) cancela a execução de forma cooperativa: o
+que já foi processado é gravado e movido, e a próxima execução retoma o
+restante. No monitoramento, o primeiro sinal apenas encerra o monitoramento
+depois da passada atual. Um sinal a mais interrompe de imediato.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from config import (
+    DEFAULT_FORMATOS_EXPORTACAO,
+    DEFAULT_TERMO_NOME,
+    DEFAULT_TERMOS_EXCLUSAO,
+    DEFAULT_WORKERS,
+    DEFAULT_XLSX_FILENAME,
+    LOG_ARQUIVO,
+    LOG_NIVEL,
+    METRICAS_DOCUMENTOS_LENTOS,
+    TRIAGEM_ATIVA,
+    TRIAGEM_WORKERS_TEXTO
+)
+from core.controle import ControleExecucao
+from core.exportadores import EXPORTADORES, formatos_disponiveis
+from core.log import configurar_log, obter_logger
+from core.monitor import monitorar_diretorio
+from core.ocr_utils import check_dependencies
+from core.processor import process_directory
+
+SAIDA_SUCESSO = 0
+SAIDA_REVISAR = 1
+SAIDA_EXPORTACAO = 3
+SAIDA_ERRO = 4
+SAIDA_DEPENDENCIAS = 5
+SAIDA_INTERROMPIDO = 130
+
+log = obter_logger("cli")
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Consolida as linhas de ordens de serviço das notas fiscais em PDF.",
+        epilog="Códigos de saída: 0 sucesso, 1 arquivos para revisar, 2 argumentos inválidos, "
+               "3 falha na exportação, 4 erro fatal, 5 OCR indisponível (Poppler/Tesseract), "
+               "130 cancelado ou interrompido."
+    )
+    parser.add_argument("pasta", help="Pasta raiz para varredura dos PDFs")
+    parser.add_argument("--saida", "-o",
+                        help="Pasta de saída dos arquivos gerados (padrão: a pasta raiz)")
+    parser.add_argument("--nome", default=DEFAULT_XLSX_FILENAME,
+                        help=f"Nome do arquivo XLSX; base dos demais formatos (padrão: {DEFAULT_XLSX_FILENAME})")
+    parser.add_argument("--termo", default=DEFAULT_TERMO_NOME,
+                        help=f'Termo que o nome do arquivo deve conter (padrão: "{DEFAULT_TERMO_NOME}")')
+    parser.add_argument("--excluir", default=DEFAULT_TERMOS_EXCLUSAO,
+                        help=f'Termos de exclusão, separados por vírgula (padrão: "{DEFAULT_TERMOS_EXCLUSAO}")')
+    parser.add_argument("--formatos", default=",".join(DEFAULT_FORMATOS_EXPORTACAO),
+                        help=f"Formatos de saída, separados por vírgula: {', '.join(EXPORTADORES)} "
+                             f"(padrão: {','.join(DEFAULT_FORMATOS_EXPORTACAO)})")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS,
+                        help=f"Processos paralelos de extração; com --triagem, divididos entre as faixas (padrão: {DEFAULT_WORKERS})")
+    parser.add_argument("--workers-texto", type=int, default=TRIAGEM_WORKERS_TEXTO, metavar="N",
+                        help="Com --triagem, quantos dos --workers ficam com a faixa de texto (padrão: um quarto, ao menos 1)")
+    parser.add_argument("--triagem", action="store_true", default=TRIAGEM_ATIVA,
+                        help="Separa os PDFs com camada de texto dos digitalizados, em faixas de extração próprias; "
+                             "os resultados deixam de seguir a ordem da descoberta (requer --workers 2 ou mais)")
+    parser.add_argument("--poppler", metavar="PASTA",
+                        help="Pasta dos binários do Poppler (padrão: POPPLER_PATH, caminhos conhecidos ou o pdftoppm do PATH)")
+    parser.add_argument("--tesseract", metavar="EXECUTAVEL",
+                        help="Executável do Tesseract (padrão: caminhos conhecidos ou o tesseract do PATH)")
+    parser.add_argument("--ignorar-cache", action="store_true",
+                        help="Reprocessa todos os arquivos, ignorando o cache de extração")
+    parser.add_argument("--monitorar", action="store_true",
+                        help="Depois de processar, continua monitorando a pasta até SIGINT/SIGTERM")
+    parser.add_argument("--polling", action="store_true",
+                        help="No monitoramento, usa varredura periódica em vez de inotify")
+    parser.add_argument("--json", metavar="ARQUIVO",
+                        help='Grava o resumo da execução em JSON ("-" para a saída padrão)')
+    parser.add_argument("--relatorio", metavar="ARQUIVO",
+                        help="Grava o tempo por etapa e os documentos mais lentos (.json ou .csv)")
+    parser.add_argument("--relatorio-n", type=int, default=METRICAS_DOCUMENTOS_LENTOS, metavar="N",
+                        help=f"Documentos mais lentos listados no relatório (padrão: {METRICAS_DOCUMENTOS_LENTOS})")
+    verbosidade = parser.add_mutually_exclusive_group()
+    verbosidade.add_argument("--silencioso", "-q", action="store_true",
+                             help="Não exibe o log de progresso, apenas avisos e erros")
+    verbosidade.add_argument("--verboso", "-v", action="store_true",
+                             help="Exibe também as mensagens de depuração")
+    parser.add_argument("--log-arquivo", default=str(LOG_ARQUIVO), metavar="ARQUIVO",
+                        help=f'Arquivo de log rotativo ("" desativa; padrão: {LOG_ARQUIVO})')
+    return parser
+
+
+def log_message(message: str):
+    """log_message da linha de comando: process_directory já espelha as mensagens no log."""
+
+
+@contextlib.contextmanager
+def stdout_para_stderr():
+    """
+    Redireciona a saída padrão (inclusive dos processos de extração, no nível
+    do descritor) para a saída de erro, deixando-a livre para o JSON.
+    """
+    sys.stdout.flush()
+    original = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(original, 1)
+        os.close(original)
+
+
+def instalar_sinais(controle: ControleExecucao, parar: threading.Event = None):
+    """
+    SIGINT/SIGTERM em etapas: encerra o monitoramento (se houver), depois
+    cancela a execução e, no sinal seguinte, interrompe (KeyboardInterrupt).
+    """
+    etapas = ([parar.set] if parar is not None else []) + [controle.cancelar]
+
+    def tratar(sinal, frame):
+        if not etapas:
+            raise KeyboardInterrupt
+        etapas.pop(0)()
+
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, tratar)
+
+
+def codigo_saida(resumo: dict) -> int:
+    if resumo.get("cancelado"):
+        return SAIDA_INTERROMPIDO
+    if any(caminho is None for caminho in resumo.get("exportacao", {}).values()):
+        return SAIDA_EXPORTACAO
+    if resumo.get("contadores", {}).get("ocr_indisponivel", 0):
+        return SAIDA_DEPENDENCIAS
+    if resumo.get("falhas", 0):
+        return SAIDA_REVISAR
+    return SAIDA_SUCESSO
+
+
+def gravar_json(destino: str, relatorio: dict):
+    conteudo = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if destino == "-":
+        sys.stdout.write(conteudo + "\n")
+        sys.stdout.flush()
+    else:
+        with open(destino, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo + "\n")
+
+
+def main(argv=None) -> int:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+
+    formatos = [formato.strip().lower() for formato in args.formatos.split(",") if formato.strip()]
+    desconhecidos = [formato for formato in formatos if formato not in EXPORTADORES]
+    if not formatos or desconhecidos:
+        parser.error(f"formatos inválidos: {', '.join(desconhecidos) or '(nenhum)'}")
+    indisponiveis = [formato for formato in formatos if formato not in formatos_disponiveis()]
+    if indisponiveis:
+        parser.error(f"formatos sem as dependências instaladas: {', '.join(indisponiveis)}")
+    if args.workers < 1:
+        parser.error("--workers deve ser maior ou igual a 1")
+    if args.workers_texto is not None and args.workers_texto < 1:
+        parser.error("--workers-texto deve ser maior ou igual a 1")
+    if args.triagem and args.workers_texto is not None and args.workers_texto >= args.workers:
+        parser.error("--workers-texto deve ser menor que --workers, que é dividido entre as faixas")
+    if args.relatorio and args.monitorar:
+        parser.error("--relatorio não é suportado com --monitorar")
+    if args.poppler and not os.path.exists(args.poppler):
+        parser.error(f"--poppler: caminho não encontrado: {args.poppler}")
+    if args.tesseract and not os.path.exists(args.tesseract):
+        parser.error(f"--tesseract: executável não encontrado: {args.tesseract}")
+
+    configurar_log(
+        nivel="DEBUG" if args.verboso else "WARNING" if args.silencioso else LOG_NIVEL,
+        arquivo=args.log_arquivo or None
+    )
+    saida = os.path.abspath(args.saida or args.pasta)
+    inicio = time.time()
+    relatorio = {
+        "pasta": os.path.abspath(args.pasta),
+        "saida": saida,
+        "formatos": formatos,
+        "workers": args.workers,
+    }
+
+    if not os.path.isdir(args.pasta):
+        log.error("Pasta não encontrada: %s", args.pasta)
+        codigo = SAIDA_ERRO
+        relatorio.update(erro=f"Pasta não encontrada: {args.pasta}")
+    else:
+        codigo, resumo = executar(args, saida, formatos)
+        relatorio.update(resumo)
+
+    relatorio.update(codigo_saida=codigo, duracao_segundos=round(time.time() - inicio, 3))
+    if args.json:
+        gravar_json(args.json, relatorio)
+    return codigo
+
+
+def executar(args, saida: str, formatos: list):
+    """Executa process_directory (ou o monitoramento); devolve (código de saída, resumo)."""
+    with stdout_para_stderr() if args.json == "-" else contextlib.nullcontext():
+        errors, _ = check_dependencies(tesseract=args.tesseract, poppler=args.poppler)
+        for erro in errors:
+            log.warning("%s", erro)
+        if errors:
+            # PDFs com camada de texto ainda são processados; os que precisam de
+            # OCR vão para revisão sem tentar cada DPI, e a saída é SAIDA_DEPENDENCIAS
+            log.warning("OCR indisponível: PDFs digitalizados serão enviados para revisão")
+
+        os.makedirs(saida, exist_ok=True)
+        parametros = dict(
+            base_dir=args.pasta,
+            termo_nome=args.termo,
+            termos_exclusao=[termo.strip() for termo in args.excluir.split(",") if termo.strip()],
+            xlsx_output_dir=saida,
+            xlsx_filename=args.nome,
+            update_progress=lambda valor, maximo: None,
+            log_message=log_message,
+            workers=args.workers,
+            workers_texto=args.workers_texto,
+            triagem=args.triagem,
+            usar_cache=not args.ignorar_cache,
+            formatos=formatos,
+            controle=ControleExecucao()
+        )
+
+        try:
+            if args.monitorar:
+                parar = threading.Event()
+                instalar_sinais(parametros["controle"], parar)
+                resumo = monitorar_diretorio(parar=parar, polling=args.polling, **parametros)
+            else:
+                instalar_sinais(parametros["controle"])
+                resumo = process_directory(
+                    relatorio_metricas=args.relatorio, documentos_lentos=args.relatorio_n, **parametros
+                )
+        except KeyboardInterrupt:
+            log.warning("Interrompido")
+            return SAIDA_INTERROMPIDO, {"erro": "Interrompido"}
+        except Exception as e:
+            log.error("%s", e)
+            return SAIDA_ERRO, {"erro": str(e)}
+
+    return codigo_saida(resumo), {"resumo": resumo, "dependencias": errors}
+
+
+if __name__ == "__main__":
+    # Necessário para o pool de processos em executáveis congelados
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -6,7 +6,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 TESSERACT_DIR = BASE_DIR / "tesseract"
 POPPLER_DIR = BASE_DIR / "poppler" / "bin"
 
-# Configurações do Tesseract
+# Configurações do Tesseract (além destes, o "tesseract" do PATH)
 TESSERACT_PATHS = [
     r"C:\Program Files\Tesseract-OCR\tesseract.exe",
     r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
@@ -18,10 +18,15 @@ TESSDATA_PATHS = [
     os.environ.get('TESSDATA_PREFIX', ''),  # variável de ambiente, se definida corretamente
     r"C:\Program Files\Tesseract-OCR\tessdata",
     r"C:\Program Files (x86)\Tesseract-OCR\tessdata",
-    str(TESSERACT_DIR / "tessdata")
+    str(TESSERACT_DIR / "tessdata"),
+    # Pacotes do Linux (tesseract-ocr no Debian/Ubuntu, tesseract no Fedora)
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata"
 ]
 
-# Configurações do Poppler
+# Configurações do Poppler (além destes, o "pdftoppm" do PATH)
 POPPLER_PATHS = [
     r"C:\Program Files\Poppler\Library\bin",
     r"C:\Program Files (x86)\Poppler\Library\bin",
@@ -32,6 +37,20 @@ POPPLER_PATHS = [
 OCR_CONFIG = "--psm 12 --oem 2"
 OCR_LANG = "por+osd+eng"
 
+# Perfis de pré-processamento das páginas antes do OCR (core/preprocessamento.py)
+#   limiar: binariza (pixel < limiar -> preto); contraste: fator aplicado antes do limiar
+#   remover_ruido: remove pixels pretos isolados; corrigir_inclinacao: deskew
+OCR_PERFIS_PREPROCESSAMENTO = {
+    'padrao': {'limiar': 180, 'contraste': None, 'remover_ruido': False, 'corrigir_inclinacao': False},
+    'digitalizado': {'limiar': 180, 'contraste': 1.5, 'remover_ruido': True, 'corrigir_inclinacao': True},
+}
+OCR_PERFIL = 'padrao'
+
+# Backend de OCR: "auto" usa tesserocr (opcional) se instalado, senão pytesseract
+OCR_BACKEND = "auto"
+# Motores de OCR mantidos carregados em cada processo de extração
+OCR_MOTORES_POR_PROCESSO = 1
+
 # Configurações de resolução para OCR
 OCR_DPI_OPTIONS = {
     'inicial': 300,
@@ -39,9 +58,110 @@ OCR_DPI_OPTIONS = {
     'passo': 100
 }
 
+# Teto de memória (por processo de extração) para as páginas renderizadas
+# simultaneamente; com o pool o consumo total é workers x OCR_MEMORIA_MAX_MB
+OCR_MEMORIA_MAX_MB = 512
+# Cópias de cada página mantidas durante o pré-processamento (estimativa)
+OCR_FATOR_MEMORIA = 3
+# Limite de páginas por chamada ao Poppler, mesmo com memória sobrando
+OCR_JANELA_MAX_PAGINAS = 4
+
+# OCR por regiões: detecta em baixa resolução as faixas do cabeçalho e da
+# discriminação dos serviços e processa apenas esses recortes em alta resolução.
+# "auto" só usa as regiões com o motor tesserocr: com o pytesseract a detecção
+# e cada recorte abrem um processo do Tesseract, o que custa mais que o OCR da
+# página inteira (que ainda é feito quando os recortes não bastam).
+# True/False forçam o uso ou não com qualquer motor
+OCR_ROI_ATIVO = "auto"
+OCR_ROI_DPI_DETECCAO = 150
+# Acima desta fração da altura da página, o recorte não compensa
+OCR_ROI_COBERTURA_MAX = 0.6
+
+# Páginas com menos caracteres na camada de texto são enviadas ao OCR
+OCR_MIN_CARACTERES_PAGINA = 30
+
+# Filtro padrão dos nomes dos PDFs: termo obrigatório e termos de exclusão
+DEFAULT_TERMO_NOME = "Linear Construtora LTDA"
+DEFAULT_TERMOS_EXCLUSAO = "Cancelar, Cancelada, Corrigida"
+
 # Nome padrão para o arquivo gerado
 DEFAULT_XLSX_FILENAME = "POs.xlsx"
 
+# Pipeline de processamento: tamanho das filas entre as etapas e frequência
+# com que o escritor grava os resultados (a cada N documentos ou T segundos)
+PIPELINE_FILA_ARQUIVOS = 256
+PIPELINE_FLUSH_DOCUMENTOS = 25
+PIPELINE_FLUSH_SEGUNDOS = 60
+
+# Triagem (core/triagem.py), opcional: antes da extração, uma leitura rápida de
+# até TRIAGEM_PAGINAS_AMOSTRA páginas (as primeiras e a última) separa os PDFs
+# com camada de texto dos digitalizados. Cada grupo segue por uma faixa própria,
+# para que um documento digitalizado longo não atrase os digitais que chegaram
+# depois dele; os resultados saem na ordem em que ficam prontos, e não mais na
+# ordem da descoberta. Os workers da execução são divididos entre as faixas:
+# TRIAGEM_WORKERS_TEXTO na de texto (None: um quarto, ao menos 1) e o restante
+# na de OCR; com menos de 2 workers não há o que dividir e a triagem não é feita.
+TRIAGEM_ATIVA = False
+TRIAGEM_WORKERS_TEXTO = None
+TRIAGEM_PAGINAS_AMOSTRA = 3
+# Documentos maiores vão para a faixa de OCR mesmo com camada de texto
+TRIAGEM_PAGINAS_MAX_TEXTO = 50
+# Página coberta por imagens (fração da área) só conta como texto com
+# TRIAGEM_CARACTERES_PAGINA_IMAGEM caracteres (ex.: PDF digitalizado pesquisável)
+TRIAGEM_COBERTURA_IMAGEM = 0.5
+TRIAGEM_CARACTERES_PAGINA_IMAGEM = 200
+
+# Pastas (dentro da pasta raiz) para onde os PDFs são movidos após o processamento
+PASTA_PROCESSADAS = "Notas Processadas"
+PASTA_REVISAR = "Precisa Revisar"
+
+# Monitoramento contínuo da pasta raiz (core/monitor.py): intervalo entre as
+# verificações, tempo sem alterações para um PDF ser considerado completo e,
+# para PDFs sem o marcador %%EOF no fim, espera máxima antes de processar assim mesmo
+MONITOR_INTERVALO_SEGUNDOS = 0.5
+MONITOR_INTERVALO_POLLING_SEGUNDOS = 2.0
+MONITOR_ESTABILIZACAO_SEGUNDOS = 2.0
+MONITOR_ESPERA_MAXIMA_SEGUNDOS = 30.0
+
+# Quantidade de documentos mais lentos listados no relatório de métricas
+METRICAS_DOCUMENTOS_LENTOS = 20
+
+# Formatos exportados por padrão (chaves de core.exportadores.EXPORTADORES)
+DEFAULT_FORMATOS_EXPORTACAO = ["xlsx"]
+
+# Layout das planilhas de PO: cabeçalhos das colunas (linha 3) e larguras
+XLSX_CABECALHOS = ["N. Nota", "Data", "Linha da PO", "Descrição", "Valor"]
+XLSX_LARGURAS_COLUNAS = {"A": 20, "B": 20, "C": 20, "D": 50, "E": 20}
+
+# Versão da lógica de extração: incrementar sempre que extrators/ocr_utils
+# mudarem de forma a alterar o resultado, invalidando o cache de extração
+EXTRATOR_VERSAO = 4
+
+# Cache persistente dos resultados de extração
+CACHE_DIR = Path(os.environ.get('LOCALAPPDATA') or Path.home()) / "ConsolidadorOS"
+CACHE_PATH = CACHE_DIR / "cache_extracao.sqlite3"
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+# Resultado da verificação do Tesseract/Poppler (caminhos e versão), reaproveitado
+# na abertura enquanto o executável e as pastas não mudarem (mtime)
+DEPENDENCIAS_CACHE_PATH = CACHE_DIR / "dependencias.json"
+
+# Quantidade padrão de processos usados na extração (1 = execução serial)
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Interface gráfica: intervalo em que o loop do Tk aplica as mensagens e o
+# progresso publicados pelo processamento, e linhas mantidas no console
+GUI_INTERVALO_ATUALIZACAO_MS = 100
+GUI_LINHAS_CONSOLE = 50
+
+# Log (core/log.py): nível do terminal e do arquivo (DEBUG, INFO, WARNING, ERROR);
+# o arquivo é rotacionado ao atingir LOG_ARQUIVO_MAX_BYTES, mantendo LOG_ARQUIVO_COPIAS
+LOG_NIVEL = os.environ.get('CONSOLIDADOR_LOG_NIVEL', 'INFO')
+LOG_NIVEL_ARQUIVO = os.environ.get('CONSOLIDADOR_LOG_NIVEL_ARQUIVO', 'INFO')
+LOG_ARQUIVO = CACHE_DIR / "consolidador.log"
+LOG_ARQUIVO_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
+LOG_ARQUIVO_COPIAS = 3
+
 import re
 
 ANSI_COLORS = {
@@ -56,6 +176,9 @@ ANSI_COLORS = {
 }
 
 
+TAG_COR = re.compile(r"<(\w+)>(.*?)</\1>")
+
+
 def colorize_terminal(text: str) -> str:
     def replace_tag(match):
         tag = match.group(1)
@@ -63,4 +186,9 @@ def colorize_terminal(text: str) -> str:
         color = ANSI_COLORS.get(tag.lower(), "")
         return f"{color}{content}{ANSI_COLORS['reset']}"
 
-    return re.sub(r"<(\w+)>(.*?)</\1>", replace_tag, text)
\ No newline at end of file
+    return TAG_COR.sub(replace_tag, text)
+
+
+def remover_tags(text: str) -> str:
+    """Remove as tags <cor>...</cor>, mantendo o conteúdo (saídas sem cor)."""
+    return TAG_COR.sub(r"\2", text)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict
+
+from config import (
+    CACHE_PATH,
+    CACHE_MAX_BYTES,
+    EXTRATOR_VERSAO,
+    OCR_CONFIG,
+    OCR_LANG,
+    OCR_DPI_OPTIONS,
+    OCR_MIN_CARACTERES_PAGINA,
+    OCR_PERFIL,
+    OCR_PERFIS_PREPROCESSAMENTO,
+    OCR_ROI_ATIVO,
+    OCR_ROI_COBERTURA_MAX,
+    OCR_ROI_DPI_DETECCAO
+)
+from core.log import obter_logger
+from core.ocr_engines import backend_efetivo
+
+log = obter_logger(__name__)
+
+# Fração de CACHE_MAX_BYTES mantida após uma remoção, evitando remover a cada gravação
+_FRACAO_APOS_REMOCAO = 0.9
+
+
+def versao_extracao() -> str:
+    """
+    Identificador da versão do extrator e de todas as configurações que
+    alteram o resultado da extração: Tesseract (parâmetros, idiomas e motor
+    efetivo), DPIs, pré-processamento do perfil ativo, OCR por regiões e o
+    mínimo de caracteres que envia uma página ao OCR. As que só mudam o tempo
+    (memória, janelas, workers) não entram.
+    """
+    configuracoes = {
+        "extrator": EXTRATOR_VERSAO,
+        "ocr_config": OCR_CONFIG,
+        "ocr_lang": OCR_LANG,
+        "dpis": OCR_DPI_OPTIONS,
+        "backend": backend_efetivo(),
+        "perfil": OCR_PERFIL,
+        "preprocessamento": OCR_PERFIS_PREPROCESSAMENTO.get(OCR_PERFIL),
+        "regioes": [OCR_ROI_ATIVO, OCR_ROI_DPI_DETECCAO, OCR_ROI_COBERTURA_MAX],
+        "min_caracteres_pagina": OCR_MIN_CARACTERES_PAGINA,
+    }
+    base = json.dumps(configuracoes, sort_keys=True, default=str)
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()[:12]
+
+
+def calcular_chave(filepath: str) -> str:
+    """
+    Calcula a chave de cache de um arquivo.
+
+    O nome do arquivo faz parte da chave porque a NF e as POs também são
+    extraídas do nome (extrair_numero_nf / extrair_pos).
+
+    Args:
+        filepath: Caminho do arquivo
+
+    Returns:
+        Chave no formato "<sha256 do conteúdo>:<nome do arquivo>:<versão>"
+    """
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloco)
+
+    return f"{sha.hexdigest()}:{os.path.basename(filepath)}:{versao_extracao()}"
+
+
+class CacheExtracao:
+    """Cache em SQLite dos dados estruturados retornados por extrair_dados."""
+
+    def __init__(self, caminho: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.caminho = str(caminho)
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        # timeout alto: os workers do pool de extração gravam no mesmo arquivo.
+        # Na execução serial a extração roda na thread do pipeline, que muda a
+        # cada process_directory: a conexão é compartilhada, protegida pelo lock
+        self.conn = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS extracoes ("
+            " chave TEXT PRIMARY KEY,"
+            " dados TEXT NOT NULL,"
+            " tamanho INTEGER NOT NULL,"
+            " ultimo_acesso REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON extracoes (ultimo_acesso)")
+        self.conn.commit()
+
+    def obter(self, chave: str) -> Optional[Dict]:
+        """Retorna os dados armazenados para a chave ou None se não houver."""
+        with self._lock:
+            row = self.conn.execute("SELECT dados FROM extracoes WHERE chave = ?", (chave,)).fetchone()
+            if row is None:
+                return None
+
+            self.conn.execute("UPDATE extracoes SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave))
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def gravar(self, chave: str, dados: Dict):
+        """Armazena os dados da chave e aplica o limite de tamanho do cache."""
+        conteudo = json.dumps(dados, ensure_ascii=False)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extracoes (chave, dados, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (chave, conteudo, len(conteudo), time.time())
+            )
+            self.conn.commit()
+        self.remover_excedente()
+
+    def remover_excedente(self):
+        """Remove as entradas acessadas há mais tempo enquanto o cache exceder max_bytes."""
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM extracoes").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            alvo = int(self.max_bytes * _FRACAO_APOS_REMOCAO)
+            removidas = []
+            for chave, tamanho in self.conn.execute("SELECT chave, tamanho FROM extracoes ORDER BY ultimo_acesso"):
+                if total <= alvo:
+                    break
+                removidas.append((chave,))
+                total -= tamanho
+
+            self.conn.executemany("DELETE FROM extracoes WHERE chave = ?", removidas)
+            self.conn.commit()
+        log.debug("Cache: <amarelo>%d</amarelo> entradas removidas", len(removidas))
+
+    def limpar(self):
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self.conn.execute("DELETE FROM extracoes")
+            self.conn.commit()
+
+    def fechar(self):
+        with self._lock:
+            self.conn.close()
+
+
+_cache: Optional[CacheExtracao] = None
+_cache_indisponivel = False
+
+
+def obter_cache() -> Optional[CacheExtracao]:
+    """
+    Retorna a instância do cache do processo atual, criando-a no primeiro uso.
+
+    Cada worker do pool de extração abre sua própria conexão.
+
+    Returns:
+        Instância do cache ou None se o arquivo não puder ser aberto
+    """
+    global _cache, _cache_indisponivel
+    if _cache is None and not _cache_indisponivel:
+        try:
+            _cache = CacheExtracao()
+        except (sqlite3.Error, OSError) as e:
+            _cache_indisponivel = True
+            log.warning("Cache de extração indisponível: %s", e)
+    return _cache
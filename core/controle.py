@@ -0,0 +1,87 @@
+"""
+Pausa e cancelamento cooperativos de uma execução.
+
+A interface (ou a CLI, nos sinais) chama ``pausar``/``retomar``/``cancelar``
+em um ControleExecucao; o processamento chama ``verificar_cancelamento()``
+nos pontos em que pode parar com segurança: entre documentos, entre páginas
+e entre as passadas de OCR. Os eventos são de ``multiprocessing``, então o
+mesmo controle vale nos processos do pool de extração, que o recebem no
+inicializador (core.ocr_utils.inicializar_worker_ocr).
+"""
+import multiprocessing
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class ExecucaoCancelada(BaseException):
+    """
+    Execução cancelada pelo operador.
+
+    Deriva de BaseException, como KeyboardInterrupt, para atravessar os
+    ``except Exception`` da extração (que transformam falhas de um documento
+    em "Precisa Revisar") até process_directory.
+    """
+
+
+class ControleExecucao:
+    """Pausa e cancelamento de uma execução, compartilhados com os processos de extração."""
+
+    def __init__(self):
+        self._cancelado = multiprocessing.Event()
+        # Liberado = não pausado; verificar() espera enquanto estiver limpo
+        self._liberado = multiprocessing.Event()
+        self._liberado.set()
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
+
+    @property
+    def pausado(self) -> bool:
+        return not self._liberado.is_set()
+
+    def pausar(self):
+        if not self.cancelado:
+            self._liberado.clear()
+
+    def retomar(self):
+        self._liberado.set()
+
+    def cancelar(self):
+        self._cancelado.set()
+        # Uma execução pausada também precisa acordar para encerrar
+        self._liberado.set()
+
+    def verificar(self):
+        """Espera enquanto a execução estiver pausada; lança ExecucaoCancelada se foi cancelada."""
+        if not self._liberado.is_set():
+            self._liberado.wait()
+        if self._cancelado.is_set():
+            raise ExecucaoCancelada()
+
+
+# Controle da execução em andamento neste processo (None fora de process_directory)
+_atual: Optional[ControleExecucao] = None
+
+
+def instalar(controle: Optional[ControleExecucao]):
+    """Define o controle do processo atual (inicializador dos processos de extração)."""
+    global _atual
+    _atual = controle
+
+
+@contextmanager
+def ativar(controle: Optional[ControleExecucao]) -> Iterator[Optional[ControleExecucao]]:
+    """Define o controle do processo atual durante o bloco."""
+    anterior = _atual
+    instalar(controle)
+    try:
+        yield controle
+    finally:
+        instalar(anterior)
+
+
+def verificar_cancelamento():
+    """Ponto de parada da execução atual; sem controle ativo não faz nada."""
+    if _atual is not None:
+        _atual.verificar()
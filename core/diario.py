@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.log import obter_logger
+
+log = obter_logger(__name__)
+
+# Estados de um arquivo no diário, na ordem em que acontecem
+DESCOBERTO = "descoberto"
+EXTRAIDO = "extraido"
+EXPORTADO = "exportado"
+MOVIDO = "movido"
+
+
+def caminho_diario(diretorio: str, xlsx_filename: str) -> str:
+    """Diário da saída (POs.xlsx -> POs.diario.jsonl), na pasta de saída."""
+    return os.path.join(diretorio, os.path.splitext(xlsx_filename)[0] + ".diario.jsonl")
+
+
+class DiarioProcessamento:
+    """
+    Diário (write-ahead log) do estado de cada arquivo em process_directory.
+
+    Cada transição (descoberto -> extraido -> exportado -> movido) é
+    acrescentada ao arquivo JSON Lines antes de a execução seguir adiante; as
+    transições que protegem contra repetição (extraido, exportado, movido) são
+    sincronizadas em disco. Uma execução concluída apaga o diário; se ele ainda
+    existir na próxima execução sobre a mesma pasta, ela retoma de onde parou:
+    resultados extraídos são reaproveitados, linhas já exportadas não são
+    exportadas de novo e arquivos já movidos são ignorados.
+
+    Attributes:
+        retomando: Se o diário veio de uma execução interrompida
+        arquivos: Estado de cada arquivo: {'estado', 'resultado', 'status',
+            'erro', 'formatos', 'destino'}
+    """
+
+    def __init__(self, caminho: str, base_dir: str):
+        self.caminho = caminho
+        self.base_dir = os.path.abspath(base_dir)
+        self.arquivos: Dict[str, Dict] = {}
+        self.retomando = False
+        self._lock = threading.Lock()
+        self._arquivo = None
+
+    @classmethod
+    def abrir(cls, caminho: str, base_dir: str) -> "DiarioProcessamento":
+        """Carrega o diário de uma execução interrompida sobre base_dir, ou inicia um novo."""
+        diario = cls(caminho, base_dir)
+
+        if os.path.exists(caminho):
+            if diario._carregar():
+                diario.retomando = True
+            else:
+                log.warning("Diário de outra pasta descartado: %s", caminho)
+
+        # A pasta de saída pode ainda não existir: é criada na primeira exportação
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        diario._arquivo = open(caminho, "a" if diario.retomando else "w", encoding="utf-8")
+        if not diario.retomando:
+            diario._gravar([{"evento": "inicio", "base_dir": diario.base_dir, "ts": time.time()}], sincronizar=True)
+        return diario
+
+    def _carregar(self) -> bool:
+        """Reaplica os eventos do diário; False se ele pertence a outra pasta."""
+        with open(self.caminho, encoding="utf-8") as arquivo:
+            for numero, linha in enumerate(arquivo):
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    # Última linha incompleta de uma execução interrompida
+                    continue
+
+                if numero == 0:
+                    if evento.get("evento") != "inicio" or evento.get("base_dir") != self.base_dir:
+                        return False
+                    continue
+
+                self._aplicar(evento)
+        return True
+
+    def _aplicar(self, evento: Dict):
+        tipo = evento.get("evento")
+        info = self.arquivos.setdefault(evento.get("arquivo"), {"estado": DESCOBERTO})
+
+        if tipo == EXTRAIDO:
+            info.update(estado=EXTRAIDO, resultado=evento.get("resultado"),
+                        status=evento.get("status"), erro=evento.get("erro"))
+        elif tipo == EXPORTADO:
+            info.update(estado=EXPORTADO, formatos=set(evento.get("formatos", [])))
+        elif tipo == MOVIDO:
+            info.update(estado=MOVIDO, destino=evento.get("destino"))
+
+    def _gravar(self, eventos: List[Dict], sincronizar: bool = False):
+        with self._lock:
+            for evento in eventos:
+                self._arquivo.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+            self._arquivo.flush()
+            if sincronizar:
+                os.fsync(self._arquivo.fileno())
+
+    def _registrar(self, eventos: List[Dict], sincronizar: bool = True):
+        """Grava os eventos (uma única sincronização) e os aplica ao estado em memória."""
+        self._gravar(eventos, sincronizar)
+        with self._lock:
+            for evento in eventos:
+                self._aplicar(evento)
+
+    def contagem(self) -> Counter:
+        """Quantidade de arquivos em cada estado."""
+        return Counter(info["estado"] for info in self.arquivos.values())
+
+    def registrar_descoberto(self, arquivo: str):
+        if arquivo not in self.arquivos:
+            self._registrar([{"evento": DESCOBERTO, "arquivo": arquivo}], sincronizar=False)
+
+    def registrar_extraido(self, arquivo: str, resultado: Optional[Dict], status: Optional[str], erro: Optional[str]):
+        self._registrar([{"evento": EXTRAIDO, "arquivo": arquivo, "resultado": resultado,
+                          "status": status, "erro": erro}])
+
+    def registrar_exportados(self, arquivos: Iterable[str], formatos: Iterable[str]):
+        """
+        Registra os formatos de um lote já gravados: todos os arquivos de uma
+        vez, a cada formato concluído e antes de qualquer arquivo ser movido,
+        para que uma interrupção no meio dos formatos seguintes ou das
+        movimentações não leve a exportar de novo o que já foi gravado.
+        """
+        formatos = set(formatos)
+        eventos = [
+            {"evento": EXPORTADO, "arquivo": arquivo,
+             "formatos": sorted(formatos | self.arquivos.get(arquivo, {}).get("formatos", set()))}
+            for arquivo in arquivos
+        ]
+        if eventos:
+            self._registrar(eventos)
+
+    def registrar_movido(self, arquivo: str, destino: str):
+        self._registrar([{"evento": MOVIDO, "arquivo": arquivo, "destino": destino}])
+
+    def resultados_extraidos(self) -> Dict[str, Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+        """Resultados já extraídos e ainda não exportados: {arquivo: (resultado, status, erro)}."""
+        return {
+            arquivo: (info["resultado"], info["status"], info["erro"])
+            for arquivo, info in self.arquivos.items() if info["estado"] == EXTRAIDO
+        }
+
+    def exportados_sem_mover(self) -> Dict[str, Dict]:
+        """Arquivos exportados (ao menos em parte) que não chegaram a ser movidos."""
+        return {arquivo: info for arquivo, info in self.arquivos.items() if info["estado"] == EXPORTADO}
+
+    def concluidos(self) -> Set[str]:
+        """Arquivos que a execução não deve descobrir de novo: os movidos e seus destinos."""
+        finalizados = set()
+        for arquivo, info in self.arquivos.items():
+            if info["estado"] == MOVIDO:
+                finalizados.add(arquivo)
+                if info.get("destino"):
+                    finalizados.add(info["destino"])
+        return finalizados
+
+    def concluir(self):
+        """Encerra uma execução completa, apagando o diário."""
+        self.fechar()
+        try:
+            os.remove(self.caminho)
+        except OSError:
+            pass
+
+    def fechar(self):
+        if self._arquivo and not self._arquivo.closed:
+            self._arquivo.close()
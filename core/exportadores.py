@@ -0,0 +1,471 @@
+import csv
+import importlib.util
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from core.log import obter_logger
+
+# core.file_utils (openpyxl) e o pyarrow só são importados quando um
+# exportador é usado, para não atrasar a abertura da interface
+
+log = obter_logger(__name__)
+
+# Colunas dos formatos tabulares, na ordem de gravação
+COLUNAS = ("po", "nota", "data_emissao", "linha", "descricao", "valor")
+
+
+def registros(dados_por_po: Dict[str, List[Dict]]) -> Iterator[Dict]:
+    """Percorre dados_por_po como registros planos (PO + campos da linha), na ordem das POs."""
+    for po, linhas in dados_por_po.items():
+        for linha in linhas:
+            yield {"po": po, **linha}
+
+
+def valores_tabulares(registro: Dict) -> tuple:
+    """
+    Valores de um registro na ordem de COLUNAS, com tipos estáveis entre linhas.
+
+    PO, nota, data, linha e descrição são texto (a nota pode ter letras);
+    o valor passa pela mesma conversão do XLSX e vira float, ou None se não
+    for numérico.
+    """
+    from core.file_utils import converter_valores
+
+    valor = converter_valores([None, None, None, None, registro.get("valor", 0)])[4]
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        valor = None
+
+    def texto(campo):
+        conteudo = registro.get(campo)
+        return None if conteudo is None else str(conteudo)
+
+    return (
+        texto("po"), texto("nota"), texto("data_emissao"), texto("linha"), texto("descricao"),
+        None if valor is None else float(valor),
+    )
+
+
+def chave_registro(valores: tuple) -> tuple:
+    """
+    Chave de duplicidade de uma linha de valores_tabulares: (nota, po, linha, valor).
+
+    Os formatos tabulares não gravam de novo uma linha com a mesma chave,
+    vinda de um lote repetido (retomada) ou de uma nova execução sobre as
+    mesmas notas; no XLSX a linha repetida continua marcada como duplicada.
+    """
+    po, nota, _, linha, _, valor = valores
+    return nota, po, linha, valor
+
+
+class ChavesGravadas:
+    """
+    Chaves já gravadas em um arquivo e as do lote em andamento.
+
+    As chaves do lote só passam a valer como gravadas em confirmar(); um lote
+    cancelado não impede que as mesmas linhas sejam gravadas depois.
+    """
+
+    def __init__(self, existentes: Iterable[tuple] = ()):
+        self.gravadas = set(existentes)
+        self.pendentes = set()
+
+    def nova(self, chave: tuple) -> bool:
+        """Se a chave ainda não foi gravada; em caso afirmativo, ela é reservada para o lote."""
+        if chave in self.gravadas or chave in self.pendentes:
+            return False
+        self.pendentes.add(chave)
+        return True
+
+    def confirmar(self):
+        self.gravadas |= self.pendentes
+        self.pendentes = set()
+
+    def descartar(self):
+        self.pendentes = set()
+
+
+class Exportador(ABC):
+    """
+    Interface dos exportadores de dados_por_po.
+
+    Um exportador recebe os registros um a um (abrir -> escrever... -> fechar),
+    o que permite alimentar vários formatos na mesma passada pelos dados. Os
+    arquivos existentes são acumulados entre execuções, como no XLSX. A mesma
+    instância pode ser reaberta a cada gravação periódica (ver ``exportadores``
+    em exportar), preservando o que ela já sabe sobre o arquivo.
+    """
+
+    nome = ""
+    extensao = ""
+
+    def __init__(self, diretorio: str, nome_base: str):
+        self.caminho = os.path.join(diretorio, nome_base + self.extensao)
+
+    @classmethod
+    def disponivel(cls) -> bool:
+        """Se as dependências do formato estão instaladas."""
+        return True
+
+    def abrir(self):
+        pass
+
+    @abstractmethod
+    def escrever(self, registro: Dict):
+        """Recebe um registro de registros(); a gravação pode ficar para fechar()."""
+
+    def fechar(self):
+        pass
+
+    def cancelar(self):
+        """Libera os recursos depois de uma falha, sem concluir a gravação."""
+        pass
+
+
+class ExportadorXLSX(Exportador):
+    """Planilhas de PO formatadas (salvar_em_xlsx); agrupa os registros e grava no fechamento."""
+
+    nome = "xlsx"
+    extensao = ".xlsx"
+
+    def abrir(self):
+        self.dados_por_po = {}
+
+    def escrever(self, registro: Dict):
+        linha = dict(registro)
+        self.dados_por_po.setdefault(linha.pop("po"), []).append(linha)
+
+    def fechar(self):
+        from core.file_utils import salvar_em_xlsx
+
+        if not salvar_em_xlsx(os.path.dirname(self.caminho), self.dados_por_po, os.path.basename(self.caminho)):
+            raise RuntimeError("Erro ao salvar arquivo XLSX")
+
+
+class ExportadorCSV(Exportador):
+    """
+    CSV UTF-8 com cabeçalho; novas execuções acrescentam linhas ao arquivo.
+
+    As chaves do arquivo existente são lidas na primeira abertura e mantidas
+    na instância; linhas com uma chave já gravada são ignoradas.
+    """
+
+    nome = "csv"
+    extensao = ".csv"
+
+    def __init__(self, diretorio: str, nome_base: str):
+        super().__init__(diretorio, nome_base)
+        self.chaves = None
+
+    def abrir(self):
+        novo = not os.path.exists(self.caminho) or os.path.getsize(self.caminho) == 0
+        if self.chaves is None:
+            self.chaves = ChavesGravadas(() if novo else self._chaves_existentes())
+
+        self.arquivo = open(self.caminho, "a", newline="", encoding="utf-8")
+        # Posição para desfazer as linhas de um lote cancelado
+        self.inicio = self.arquivo.tell()
+        self.writer = csv.writer(self.arquivo)
+        if novo:
+            self.writer.writerow(COLUNAS)
+
+    def _chaves_existentes(self) -> Iterator[tuple]:
+        with open(self.caminho, newline="", encoding="utf-8") as arquivo:
+            leitor = csv.reader(arquivo)
+            cabecalho = next(leitor, [])
+            if not set(COLUNAS) <= set(cabecalho):
+                raise RuntimeError(f"{os.path.basename(self.caminho)} não tem as colunas {', '.join(COLUNAS)}")
+
+            posicoes = [cabecalho.index(coluna) for coluna in ("nota", "po", "linha", "valor")]
+            for linha in leitor:
+                yield tuple(linha[posicao] if posicao < len(linha) else "" for posicao in posicoes)
+
+    def escrever(self, registro: Dict):
+        valores = valores_tabulares(registro)
+        # Compara como o texto gravado no arquivo (None vira "", o float seu repr)
+        if self.chaves.nova(tuple("" if valor is None else str(valor) for valor in chave_registro(valores))):
+            self.writer.writerow(valores)
+
+    def fechar(self):
+        self.arquivo.close()
+        self.chaves.confirmar()
+
+    def cancelar(self):
+        if self.chaves is not None:
+            self.chaves.descartar()
+        if not self.arquivo.closed:
+            self.arquivo.truncate(self.inicio)
+        self.arquivo.close()
+
+
+class ExportadorSQLite(Exportador):
+    """
+    Tabela linhas_po em um banco SQLite, gravada em uma única transação.
+
+    Um índice único sobre (po, nota, linha, valor) e INSERT OR IGNORE evitam
+    linhas repetidas; os campos vazios entram no índice como '', para que
+    NULL também seja comparado.
+    """
+
+    nome = "sqlite"
+    extensao = ".sqlite3"
+
+    TAMANHO_LOTE = 1000
+
+    CHAVE = "IFNULL(po, ''), IFNULL(nota, ''), IFNULL(linha, ''), IFNULL(valor, '')"
+
+    def abrir(self):
+        self.conexao = sqlite3.connect(self.caminho)
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS linhas_po ("
+            " po TEXT, nota TEXT, data_emissao TEXT, linha TEXT, descricao TEXT, valor REAL)"
+        )
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_linhas_po_po ON linhas_po (po)")
+
+        existe = self.conexao.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_linhas_po_chave'"
+        ).fetchone()
+        if not existe:
+            # Bancos gravados antes do índice podem ter repetições: fica a primeira
+            self.conexao.execute(
+                f"DELETE FROM linhas_po WHERE rowid NOT IN (SELECT MIN(rowid) FROM linhas_po GROUP BY {self.CHAVE})"
+            )
+            self.conexao.execute(f"CREATE UNIQUE INDEX idx_linhas_po_chave ON linhas_po ({self.CHAVE})")
+            self.conexao.commit()
+        self.lote = []
+
+    def escrever(self, registro: Dict):
+        self.lote.append(valores_tabulares(registro))
+        if len(self.lote) >= self.TAMANHO_LOTE:
+            self._descarregar()
+
+    def _descarregar(self):
+        self.conexao.executemany("INSERT OR IGNORE INTO linhas_po VALUES (?, ?, ?, ?, ?, ?)", self.lote)
+        self.lote = []
+
+    def fechar(self):
+        try:
+            self._descarregar()
+            self.conexao.commit()
+        finally:
+            self.conexao.close()
+
+    def cancelar(self):
+        self.conexao.rollback()
+        self.conexao.close()
+
+
+class ExportadorParquet(Exportador):
+    """
+    Conjunto de dados Parquet (requer pyarrow): uma pasta com uma parte por
+    gravação (part-00001.parquet, ...), lida como uma única tabela por
+    pyarrow.dataset e pandas.read_parquet.
+
+    Parquet não aceita acréscimos; gravar cada lote em uma parte nova evita
+    reescrever os dados anteriores a cada gravação periódica. A parte é
+    escrita com um nome oculto e renomeada quando concluída, então os
+    leitores nunca veem uma parte incompleta. As chaves das partes existentes
+    são lidas na primeira abertura e linhas já gravadas são ignoradas.
+    """
+
+    nome = "parquet"
+    extensao = ".parquet"
+
+    TAMANHO_LOTE = 10000
+
+    _RE_PARTE = re.compile(r"^part-(\d+)\.parquet$")
+
+    def __init__(self, diretorio: str, nome_base: str):
+        super().__init__(diretorio, nome_base)
+        self.chaves = None
+        self.writer = None
+
+    @classmethod
+    def disponivel(cls) -> bool:
+        # Dependência opcional: verifica a instalação sem importar o pacote
+        return importlib.util.find_spec("pyarrow") is not None
+
+    def abrir(self):
+        if not self.disponivel():
+            raise RuntimeError("pyarrow não instalado")
+        import pyarrow
+
+        self.schema = pyarrow.schema(
+            [(coluna, pyarrow.string()) for coluna in COLUNAS[:-1]] + [("valor", pyarrow.float64())]
+        )
+        self._preparar_pasta()
+        if self.chaves is None:
+            self.chaves = ChavesGravadas(self._chaves_existentes())
+
+        self.writer = None
+        self.lote = []
+
+    def _preparar_pasta(self):
+        if os.path.isfile(self.caminho):
+            # Arquivo único das versões anteriores: passa a ser a primeira parte
+            anterior = self.caminho + ".anterior"
+            os.replace(self.caminho, anterior)
+            os.makedirs(self.caminho)
+            os.replace(anterior, self._parte(0))
+        os.makedirs(self.caminho, exist_ok=True)
+
+        # Partes de uma gravação interrompida
+        for nome in os.listdir(self.caminho):
+            if nome.startswith(".part-") and nome.endswith(".tmp"):
+                os.remove(os.path.join(self.caminho, nome))
+
+    def _numeros_partes(self) -> List[int]:
+        return sorted(
+            int(m.group(1)) for m in map(self._RE_PARTE.match, os.listdir(self.caminho)) if m
+        )
+
+    def _parte(self, numero: int) -> str:
+        return os.path.join(self.caminho, f"part-{numero:05d}.parquet")
+
+    def _chaves_existentes(self) -> Iterator[tuple]:
+        import pyarrow.parquet as pq
+
+        colunas = ["nota", "po", "linha", "valor"]
+        for numero in self._numeros_partes():
+            tabela = pq.read_table(self._parte(numero), columns=colunas)
+            yield from zip(*(tabela.column(coluna).to_pylist() for coluna in colunas))
+
+    def escrever(self, registro: Dict):
+        valores = valores_tabulares(registro)
+        if self.chaves.nova(chave_registro(valores)):
+            self.lote.append(valores)
+            if len(self.lote) >= self.TAMANHO_LOTE:
+                self._descarregar()
+
+    def _descarregar(self):
+        if self.lote:
+            import pyarrow
+            import pyarrow.parquet as pq
+
+            if self.writer is None:
+                self.numero = max(self._numeros_partes(), default=0) + 1
+                self.temporario = os.path.join(self.caminho, f".part-{self.numero:05d}.parquet.tmp")
+                self.writer = pq.ParquetWriter(self.temporario, self.schema)
+
+            colunas = list(zip(*self.lote))
+            self.writer.write_batch(pyarrow.record_batch(colunas, schema=self.schema))
+            self.lote = []
+
+    def fechar(self):
+        self._descarregar()
+        # Um lote só com linhas já gravadas não gera parte
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.temporario, self._parte(self.numero))
+            self.writer = None
+        self.chaves.confirmar()
+
+    def cancelar(self):
+        if self.chaves is not None:
+            self.chaves.descartar()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            os.remove(self.temporario)
+
+
+# Formatos disponíveis, na ordem exibida na interface
+EXPORTADORES = {
+    exportador.nome: exportador
+    for exportador in (ExportadorXLSX, ExportadorCSV, ExportadorSQLite, ExportadorParquet)
+}
+
+
+def formatos_disponiveis() -> List[str]:
+    """Formatos cujas dependências estão instaladas."""
+    return [nome for nome, exportador in EXPORTADORES.items() if exportador.disponivel()]
+
+
+def exportar(
+        dados_por_po: Dict[str, List[Dict]],
+        diretorio: str,
+        nome_base: str,
+        formatos: List[str],
+        log_message: Optional[Callable] = None,
+        exportadores: Optional[Dict[str, Exportador]] = None,
+        ao_gravar: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Exporta dados_por_po para todos os formatos pedidos em uma única passada.
+
+    Cada registro é entregue a todos os exportadores antes do próximo; a falha
+    de um formato não interrompe os demais.
+
+    Args:
+        dados_por_po: Linhas agrupadas por PO, como montadas em process_directory
+        diretorio: Pasta de saída
+        nome_base: Nome dos arquivos sem extensão (ex.: "POs")
+        formatos: Chaves de EXPORTADORES
+        log_message: Callback de log da interface (opcional)
+        exportadores: {formato: Exportador} reaproveitados entre as chamadas de
+            uma execução (gravações periódicas), para que as chaves já gravadas
+            não sejam relidas dos arquivos a cada lote; preenchido aqui
+        ao_gravar: Chamado com (formato, caminho) assim que cada formato
+            conclui a gravação, antes do fechamento dos seguintes
+
+    Returns:
+        {formato: caminho do arquivo gerado, ou None se falhou}
+    """
+    if exportadores is None:
+        exportadores = {}
+
+    ativos = {}
+    resultado = {}
+    for formato in formatos:
+        exportador = exportadores.get(formato) or EXPORTADORES[formato](diretorio, nome_base)
+        try:
+            exportador.abrir()
+            ativos[formato] = exportador
+            exportadores[formato] = exportador
+        except Exception as e:
+            resultado[formato] = None
+            _log_falha(formato, e, log_message)
+            _cancelar(exportador)
+            # O próximo lote começa de um exportador novo
+            exportadores.pop(formato, None)
+
+    for registro in registros(dados_por_po):
+        for formato, exportador in list(ativos.items()):
+            try:
+                exportador.escrever(registro)
+            except Exception as e:
+                del ativos[formato]
+                resultado[formato] = None
+                _log_falha(formato, e, log_message)
+                _cancelar(exportador)
+
+    for formato, exportador in ativos.items():
+        try:
+            exportador.fechar()
+        except Exception as e:
+            resultado[formato] = None
+            _log_falha(formato, e, log_message)
+            _cancelar(exportador)
+            continue
+
+        resultado[formato] = exportador.caminho
+        if ao_gravar:
+            ao_gravar(formato, exportador.caminho)
+
+    return {formato: resultado[formato] for formato in formatos}
+
+
+def _cancelar(exportador):
+    try:
+        exportador.cancelar()
+    except Exception:
+        pass
+
+
+def _log_falha(formato, erro, log_message):
+    if log_message:
+        log_message(f"[<vermelho>ERRO</vermelho>] Falha ao exportar {formato.upper()}: {erro}")
+    else:
+        log.error("Falha ao exportar %s: %s", formato.upper(), erro)
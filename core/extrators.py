@@ -1,34 +1,167 @@
 import os
 import re
 from datetime import datetime
-import pdfplumber
-from config import colorize_terminal, OCR_DPI_OPTIONS
-from core.ocr_utils import extrair_texto_ocr
+from config import OCR_DPI_OPTIONS, OCR_MIN_CARACTERES_PAGINA
+from core.cache import calcular_chave, obter_cache
+from core.controle import verificar_cancelamento
+from core.log import obter_logger
+from core.metricas import contar, medir
+from core.ocr_utils import OCRIndisponivel, extrair_textos_ocr_por_pagina
+
+log = obter_logger(__name__)
+
+# Campos sem os quais a extração é considerada incompleta
+CAMPOS_OBRIGATORIOS = ['numero_nf', 'pos_nf', 'linhas_nf']
+
+
+class LinhaPedido(dict):
+    """Linha de pedido (po, linha, valor, descricao) montada fora de uma regex.
+
+    Expõe ``group`` como um ``re.Match`` para que process_pdf trate igualmente
+    as linhas do padrão preciso, do analisador alternativo e do cache.
+    """
+
+    def group(self, nome):
+        return self.get(nome)
+
+    def groupdict(self):
+        return dict(self)
+
+
+# Padrões compilados uma única vez na importação
+_RE_NF_NOME = re.compile(r'NF[.\s]*(\d+)', re.IGNORECASE)
+_RE_NF_NUMERO_DA_NOTA = re.compile(r'numero\s+da\s+nota[^\d]*(\d{4,})', re.IGNORECASE)
+_RE_NF_NOTA = re.compile(r'\bnota\s*[.:]?\s*(\d{4,})', re.IGNORECASE)
+_RE_NF_GENERICO = re.compile(r'\b(?!0{4,})\d{4,}\b')
+
+_RE_PO_NOME = re.compile(r'\bPO\s+([^\n\r]+)', re.IGNORECASE)
+_RE_SEIS_DIGITOS = re.compile(r'\b\d{6}\b')
+_RE_PO_CONTEUDO = re.compile(r'\bPO\s+(\d{6})\b', re.IGNORECASE)
+
+# (padrão, palavras-chave onde o padrão pode começar), em ordem de prioridade
+_RE_DATAS = [
+    (re.compile(r'(?:data\s+e\s+hora\s+da\s+emiss[ao]\s*|emiss[ao]\s*:\s*)(\d{2}/\d{2}/\d{4})', re.IGNORECASE),
+     ('data', 'emiss')),
+    (re.compile(r'(?:data\s*:\s*|emiss[ao]\s*em\s*)(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})', re.IGNORECASE),
+     ('data', 'emiss')),
+    (re.compile(r'\b(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})\b', re.IGNORECASE),
+     None),
+]
+
+# O prefixo opcional "(?:/)?\s*(?:PO\s+)?" do padrão original não captura nada
+# e só antecipa o início do match; sem ele os grupos encontrados são os mesmos
+_RE_LINHA_PRECISA = re.compile(
+    r'(?P<po>\d{6})\s+LINHA\s+(?P<linha>\d+)\s+VALOR\s+(?P<valor>[\d.,]+)\s*/\s*(?P<descricao>[^\n\r]*)',
+    re.IGNORECASE
+)
+
+# Padrão alternativo original (referência do analisador linear abaixo):
+#   (?:/)?\s*(?:PO\s+)?(?P<po>\d{6})[\s\S]*?(?:linha|item)[\s:]*(?P<linha>\d+)[\s\S]*?
+#   (?:valor|vlr?|total)[\s:]*[\$R]*(?P<valor>[\d.,]+)(?:[\s/;-]*(?P<descricao>[^\n\r]*))?
+# Os trechos [\s\S]*? fazem a regex retroceder pelo documento inteiro a cada
+# número de seis dígitos quando não há "valor"; ela é decomposta nas partes
+# limitadas abaixo, cada uma buscada sempre para frente
+_RE_ALT_PO = re.compile(r'\d{6}')
+_RE_ALT_LINHA = re.compile(r'(?:linha|item)[\s:]*(?P<linha>\d+)', re.IGNORECASE)
+_RE_ALT_VALOR = re.compile(r'(?:valor|vlr?|total)[\s:]*[\$R]*(?P<valor>[\d.,]+)', re.IGNORECASE)
+_RE_ALT_DESCRICAO = re.compile(r'[\s/;-]*(?P<descricao>[^\n\r]*)')
+
+# Caracteres que re.IGNORECASE iguala a letras ASCII das palavras-chave, mas
+# que str.lower() não converte (ex.: 'ı' -> 'i', 'ſ' -> 's')
+_RE_CARACTERES_DOBRAVEIS = re.compile('[\u0130\u0131\u017f\u212a]')
+
+
+class TextoIndexado:
+    """
+    Texto de uma nota com as posições das palavras-chave dos padrões.
+
+    O texto é convertido para minúsculas uma única vez e as palavras-chave são
+    localizadas com ``str.find``; cada padrão é testado apenas nas posições em
+    que pode começar, em vez de percorrer o texto inteiro a cada campo. Os
+    resultados são os mesmos de ``padrao.search``/``padrao.finditer``.
+    """
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.minusculo = texto.lower()
+        # Se lower() mudar o comprimento ou houver caracteres "dobráveis", as
+        # posições não são confiáveis e os padrões percorrem o texto inteiro
+        self.indexado = (
+            len(self.minusculo) == len(texto)
+            and not _RE_CARACTERES_DOBRAVEIS.search(texto)
+        )
+        self._posicoes = {}
+
+    def contem(self, *palavras: str) -> bool:
+        """Indica se alguma das palavras (minúsculas) aparece no texto."""
+        return not self.indexado or any(palavra in self.minusculo for palavra in palavras)
+
+    def posicoes(self, *palavras: str) -> list[int]:
+        """Posições, em ordem, em que alguma das palavras começa."""
+        todas = set()
+        for palavra in palavras:
+            if palavra not in self._posicoes:
+                encontradas = []
+                pos = self.minusculo.find(palavra)
+                while pos != -1:
+                    encontradas.append(pos)
+                    pos = self.minusculo.find(palavra, pos + 1)
+                self._posicoes[palavra] = encontradas
+            todas.update(self._posicoes[palavra])
+        return sorted(todas)
+
+    def primeira(self, padrao: re.Pattern, palavras: tuple = None):
+        """Equivalente a ``padrao.search(texto)`` para padrões que começam por uma das palavras."""
+        if not palavras or not self.indexado:
+            return padrao.search(self.texto)
+
+        for pos in self.posicoes(*palavras):
+            match = padrao.match(self.texto, pos)
+            if match:
+                return match
+        return None
+
+    def todas(self, padrao: re.Pattern, palavras: tuple = None) -> list[re.Match]:
+        """Equivalente a ``list(padrao.finditer(texto))`` para padrões que começam por uma das palavras."""
+        if not palavras or not self.indexado:
+            return list(padrao.finditer(self.texto))
+
+        matches = []
+        fim = 0
+        for pos in self.posicoes(*palavras):
+            if pos < fim:
+                continue
+            match = padrao.match(self.texto, pos)
+            if match:
+                matches.append(match)
+                fim = match.end()
+        return matches
+
+
+def _indexar(texto) -> TextoIndexado:
+    return texto if isinstance(texto, TextoIndexado) else TextoIndexado(texto)
 
 
 def extrair_nf_do_nome_arquivo(nome_arquivo: str) -> str:
-    match = re.search(r'NF[.\s]*(\d+)', nome_arquivo, re.IGNORECASE)
+    match = _RE_NF_NOME.search(nome_arquivo)
     return match.group(1) if match else ""
 
 
 def extrair_nf_do_conteudo_arquivo(texto):
-    patterns = [
-        r'numero\s+da\s+nota[^\d]*(\d{4,})',
-        r'\bnota\s*[.:]?\s*(\d{4,})',
-    ]
+    texto = _indexar(texto)
 
-    for pattern in patterns:
-        match = re.search(pattern, texto, re.IGNORECASE)
+    for pattern, palavras in ((_RE_NF_NUMERO_DA_NOTA, ('numero',)), (_RE_NF_NOTA, ('nota',))):
+        match = texto.primeira(pattern, palavras)
         if match:
             num = match.group(1).strip()
             if num.isdigit() and len(num) >= 4:
                 return num
 
-    matches = re.findall(r'\b(?!0{4,})\d{4,}\b', texto)
-    return matches[0] if matches else ""
+    match = _RE_NF_GENERICO.search(texto.texto)
+    return match.group(0) if match else ""
 
 
-def extrair_numero_nf(nome_arquivo: str, texto: str) -> str:
+def extrair_numero_nf(nome_arquivo: str, texto) -> str:
     nf_nome = extrair_nf_do_nome_arquivo(nome_arquivo)
     if not nf_nome:
         nf_nome = extrair_nf_do_conteudo_arquivo(texto)
@@ -37,20 +170,20 @@ def extrair_numero_nf(nome_arquivo: str, texto: str) -> str:
 
 
 def extrair_pos_do_nome_arquivo(nome_arquivo: str) -> list[str]:
-    match = re.search(r'\bPO\s+([^\n\r]+)', nome_arquivo, re.IGNORECASE)
+    match = _RE_PO_NOME.search(nome_arquivo)
     if not match:
         return []
 
     trecho = match.group(1)
-    return list(dict.fromkeys(re.findall(r'\b\d{6}\b', trecho)))
+    return list(dict.fromkeys(_RE_SEIS_DIGITOS.findall(trecho)))
 
 
-def extrair_pos_do_conteudo_arquivo(texto: str) -> list[str]:
-    matches = re.findall(r'\bPO\s+(\d{6})\b', texto, re.IGNORECASE)
-    return list(dict.fromkeys(matches))
+def extrair_pos_do_conteudo_arquivo(texto) -> list[str]:
+    matches = _indexar(texto).todas(_RE_PO_CONTEUDO, ('po',))
+    return list(dict.fromkeys(match.group(1) for match in matches))
 
 
-def extrair_pos(nome_arquivo: str, texto: str) -> list[str]:
+def extrair_pos(nome_arquivo: str, texto) -> list[str]:
     pos_nome = extrair_pos_do_nome_arquivo(nome_arquivo)
     pos_conteudo = extrair_pos_do_conteudo_arquivo(texto)
 
@@ -60,15 +193,11 @@ def extrair_pos(nome_arquivo: str, texto: str) -> list[str]:
     return pos_nome
 
 
-def extrair_data_emissao(texto: str) -> str:
-    patterns = [
-        r'(?:data\s+e\s+hora\s+da\s+emiss[ao]\s*|emiss[ao]\s*:\s*)(\d{2}/\d{2}/\d{4})',
-        r'(?:data\s*:\s*|emiss[ao]\s*em\s*)(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})',
-        r'\b(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})\b'
-    ]
+def extrair_data_emissao(texto) -> str:
+    texto = _indexar(texto)
 
-    for pattern in patterns:
-        match = re.search(pattern, texto, re.IGNORECASE)
+    for pattern, palavras in _RE_DATAS:
+        match = texto.primeira(pattern, palavras)
         if match:
             data = match.group(1).replace('-', '/').replace('.', '/')
             try:
@@ -79,97 +208,351 @@ def extrair_data_emissao(texto: str) -> str:
     return ""
 
 
-def extrair_linhas_pedido(texto: str):
-    padrao_preciso = re.compile(
-        r'(?:/)?\s*(?:PO\s+)?(?P<po>\d{6})\s+LINHA\s+(?P<linha>\d+)\s+VALOR\s+(?P<valor>[\d.,]+)\s*/\s*(?P<descricao>[^\n\r]*)',
-        re.IGNORECASE
-    )
+def extrair_linhas_pedido(texto):
+    texto = _indexar(texto)
+
+    # Os dois padrões exigem as palavras-chave: sem elas não há o que procurar
+    matches = []
+    if texto.contem('linha') and texto.contem('valor'):
+        matches = texto.todas(_RE_LINHA_PRECISA)
+    if matches:
+        return matches
+
+    if texto.contem('linha', 'item') and texto.contem('valor', 'vl', 'total'):
+        return extrair_linhas_alternativas(texto.texto)
+    return []
+
+
+def extrair_linhas_alternativas(texto: str) -> list[LinhaPedido]:
+    """
+    Analisador em tempo linear equivalente ao padrão alternativo de linhas.
+
+    Na regex original, o início de cada match é sempre o primeiro número de
+    seis dígitos a partir da posição de busca: se "linha/item" ou "valor" não
+    existem depois dele, também não existem depois de nenhum número seguinte.
+    Assim cada linha é obtida por buscas que só avançam no texto: PO, depois
+    o primeiro "linha/item <n>", depois o primeiro "valor/vlr/total <v>" e a
+    descrição até o fim da linha.
+
+    Args:
+        texto: Texto extraído do documento
+
+    Returns:
+        Linhas encontradas, com os mesmos grupos da regex original
+    """
+    linhas = []
+    pos = 0
+    while True:
+        po = _RE_ALT_PO.search(texto, pos)
+        if not po:
+            break
+
+        linha = _RE_ALT_LINHA.search(texto, po.end())
+        if not linha:
+            break
+
+        valor = _RE_ALT_VALOR.search(texto, linha.end())
+        if not valor:
+            break
+
+        descricao = _RE_ALT_DESCRICAO.match(texto, valor.end())
+        linhas.append(LinhaPedido(
+            po=po.group(0),
+            linha=linha.group('linha'),
+            valor=valor.group('valor'),
+            descricao=descricao.group('descricao')
+        ))
+        pos = descricao.end()
+
+    return linhas
+
+
+def extrair_campos(filepath: str, texto: str) -> dict:
+    """
+    Extrai todos os campos da nota a partir de um único índice do texto.
+
+    Args:
+        filepath: Caminho do arquivo (NF e POs também são lidos do nome)
+        texto: Texto extraído do documento
+
+    Returns:
+        Dicionário com numero_nf, data_nf, pos_nf e linhas_nf
+    """
+    indexado = TextoIndexado(texto)
+    return {
+        'numero_nf': extrair_numero_nf(filepath, indexado) or '',
+        'data_nf': extrair_data_emissao(indexado) or '',
+        'pos_nf': extrair_pos(filepath, indexado) or [],
+        'linhas_nf': extrair_linhas_pedido(indexado) or [],
+    }
 
-    padrao_alternativo = re.compile(
-        r'(?:/)?\s*(?:PO\s+)?(?P<po>\d{6})[\s\S]*?(?:linha|item)[\s:]*(?P<linha>\d+)[\s\S]*?'
-        r'(?:valor|vlr?|total)[\s:]*[\$R]*(?P<valor>[\d.,]+)'
-        r'(?:[\s/;-]*(?P<descricao>[^\n\r]*))?',
-        re.IGNORECASE
-    )
 
-    matches = list(padrao_preciso.finditer(texto))
-    return matches if matches else list(padrao_alternativo.finditer(texto))
+def extrair_texto_pdf(filepath: str) -> str:
+    return "\n".join(extrair_textos_paginas_pdf(filepath)).strip()
+
 
+def extrair_textos_paginas_pdf(filepath: str) -> list[str]:
+    import pdfplumber  # importado na primeira extração, não na abertura do programa
 
-def extrair_texto_pdf(filepath: str) -> str:
-    print(colorize_terminal(
-        f"[<roxo>DEBUG</roxo>] Tentando: Extração por Leitura Simples")
-    )
+    log.debug("Tentando: Extração por Leitura Simples")
     try:
-        with pdfplumber.open(filepath) as pdf:
-            return "\n".join(
-                page.extract_text(x_tolerance=2, y_tolerance=2) or ""
-                for page in pdf.pages
-            ).strip()
+        with medir("texto_pdf"), pdfplumber.open(filepath) as pdf:
+            textos = []
+            for page in pdf.pages:
+                verificar_cancelamento()
+                textos.append(page.extract_text(x_tolerance=2, y_tolerance=2) or "")
+        contar("paginas", len(textos))
+        return textos
     except Exception as e:
-        print(colorize_terminal(f"[<vermelho>ERRO</vermelho>] Falha no processamento como PDF\n{e}"))
-        return ""
+        log.error("Falha no processamento como PDF de %s: %s", os.path.basename(filepath), e)
+        return []
+
+
+def paginas_sem_texto(textos_paginas: list[str]) -> list[int]:
+    """Retorna os números (base 1) das páginas cuja camada de texto é vazia ou insuficiente."""
+    return [
+        num_pagina
+        for num_pagina, texto in enumerate(textos_paginas, 1)
+        if len(texto.strip()) < OCR_MIN_CARACTERES_PAGINA
+    ]
+
+
+def paginas_para_ocr(textos_paginas: list[str]) -> list[int] | None:
+    """
+    Páginas que podem passar pelo OCR quando a leitura simples não basta.
+
+    As páginas sem camada de texto suficiente e a primeira, onde fica o
+    cabeçalho (número da nota, POs); as demais páginas digitais mantêm o
+    texto do pdfplumber. None (todas as páginas) se nenhuma página fornece
+    campo algum: a camada de texto é ilegível (ex.: fontes sem mapeamento).
+    """
+    if not any(texto_tem_campos(texto) for texto in textos_paginas):
+        return None
+    return sorted(set(paginas_sem_texto(textos_paginas)) | {1})
+
+
+def dados_completos(dados: dict) -> bool:
+    return bool(dados) and all(dados.get(campo) for campo in CAMPOS_OBRIGATORIOS)
+
+
+class EscalonamentoOCR:
+    """
+    Extração por OCR escalonando o DPI apenas nas páginas que ainda falham.
+
+    Cada página é renderizada e processada no máximo uma vez por DPI. Uma
+    página cujo texto (da camada de texto em ``textos_base`` ou de um DPI
+    anterior) já fornece linhas de pedido não passa pelo OCR; só as demais sobem de resolução (se todas já forneceram e ainda
+    falta o número da nota ou as POs, apenas a primeira). O estado é compartilhado entre
+    chamadas de ``executar``, de modo que uma segunda rodada sobre mais
+    páginas reaproveita o que já foi processado.
+
+    Se o Poppler ou o Tesseract não estão instalados, o escalonamento para
+    na primeira tentativa: nenhum DPI daria resultado diferente.
+
+    Attributes:
+        textos: Melhor texto obtido por página {número da página: texto}
+        custo: Páginas renderizadas e passadas de OCR (chamadas ao motor,
+            inclusive detecção e recortes de regiões) do documento
+        indisponivel: Motivo, se o OCR não pôde ser feito
+    """
+
+    def __init__(self, filepath: str, textos_base: list[str] = None, dpis: list[int] = None):
+        self.filepath = filepath
+        self.textos = dict(enumerate(textos_base or [], 1))
+        self.dpis = dpis or list(range(
+            OCR_DPI_OPTIONS['inicial'],
+            OCR_DPI_OPTIONS['max'] + 1,
+            OCR_DPI_OPTIONS['passo']
+        ))
+        self.processadas = set()  # (página, dpi) já renderizadas e processadas
+        # Páginas que já forneceram linhas de pedido, inclusive pelo pdfplumber
+        self.resolvidas = {
+            num_pagina for num_pagina, texto in self.textos.items() if extrair_linhas_pedido(texto)
+        }
+        self.sem_regioes = set()  # páginas que, sem resolver, não repetem a detecção de regiões
+        self.custo = {'renderizacoes': 0, 'ocr': 0, 'dpis': []}
+        self.dados = {}
+        self.indisponivel = None
+
+    def texto(self) -> str:
+        return "\n".join(self.textos[num_pagina] for num_pagina in sorted(self.textos)).strip()
+
+    def executar(self, candidatas: list[int] = None) -> dict:
+        """
+        Escalona o DPI sobre as páginas candidatas até obter os campos obrigatórios.
+
+        Args:
+            candidatas: Páginas (base 1) que podem passar pelo OCR; None considera todas
+
+        Returns:
+            Dados extraídos do texto combinado das páginas
+        """
+        for dpi in self.dpis:
+            verificar_cancelamento()
+            if self.indisponivel:
+                break
+            pendentes = self._pendentes(candidatas, dpi)
+            if pendentes is not None and not pendentes:
+                continue
+
+            try:
+                textos_ocr = extrair_textos_ocr_por_pagina(
+                    self.filepath, dpi=dpi, paginas=pendentes, validar_regioes=texto_tem_campos,
+                    paginas_sem_regioes=self.sem_regioes, custo=self.custo
+                )
+            except OCRIndisponivel as e:
+                self.indisponivel = str(e)
+                contar("ocr_indisponivel")
+                log.warning("OCR indisponível para %s: %s", os.path.basename(self.filepath), e)
+                break
+
+            for num_pagina in (pendentes or textos_ocr):
+                self.processadas.add((num_pagina, dpi))
+
+            for num_pagina, texto in textos_ocr.items():
+                if num_pagina not in self.textos or _pontuacao(texto) >= _pontuacao(self.textos[num_pagina]):
+                    self.textos[num_pagina] = texto
+                if extrair_linhas_pedido(texto):
+                    self.resolvidas.add(num_pagina)
+                else:
+                    # As regiões (se usadas) não bastaram: nos próximos DPIs, a página inteira
+                    self.sem_regioes.add(num_pagina)
+
+            self.custo['dpis'].append(dpi)
+            self.dados = extrair_dados_texto(self.filepath, self.texto())
+
+            if dados_completos(self.dados):
+                log.debug("[<verde>SUCESSO</verde>] Dados Extraídos com SUCESSO")
+                break
+
+        return self.dados
+
+    def _pendentes(self, candidatas: list[int], dpi: int):
+        """Páginas a processar no DPI informado; None quando o número de páginas ainda é desconhecido."""
+        paginas = candidatas if candidatas is not None else sorted(self.textos)
+        if not paginas:
+            return None
+
+        pendentes = [p for p in paginas if p not in self.resolvidas]
+        if not pendentes:
+            # Todas as páginas já forneceram linhas de pedido e ainda falta o
+            # número da nota ou as POs: só a primeira candidata, onde fica o
+            # cabeçalho, sobe de DPI; as demais não voltam ao OCR
+            pendentes = paginas[:1]
+
+        return [p for p in pendentes if (p, dpi) not in self.processadas]
+
+
+def _pontuacao(texto: str) -> tuple:
+    """Qualidade do texto de uma página, usada para escolher entre os resultados de cada DPI."""
+    return (
+        len(extrair_linhas_pedido(texto)),
+        len(extrair_pos_do_conteudo_arquivo(texto)),
+        bool(extrair_data_emissao(texto)),
+        len(texto.strip())
+    )
+
+
+def texto_tem_campos(texto: str, servicos: bool = False) -> bool:
+    """
+    Indica se o texto de uma página (ou região) fornece algum dos campos da nota.
+
+    Com ``servicos`` (as regiões incluem o bloco de serviços), exige linhas de
+    pedido: sem elas o recorte perdeu parte do bloco e a página inteira deve
+    ser processada.
+    """
+    if servicos:
+        return bool(extrair_linhas_pedido(texto))
+    return any(_pontuacao(texto)[:3])
 
 
 def extrair_dados_recursivamente(
         filepath: str,
-        dpi_atual: int = None,
-        dados_parciais: dict = None,
         dpi_inicial: int = OCR_DPI_OPTIONS['inicial'],
         dpi_maximo: int = OCR_DPI_OPTIONS['max'],
         dpi_incremento: int = OCR_DPI_OPTIONS['passo']
 ):
-    if dados_parciais is None:
-        dados_parciais = {
-            'numero_nf': '',
-            'data_nf': '',
-            'pos_nf': '',
-            'linhas_nf': []
-        }
+    """Extrai os dados do documento inteiro por OCR, aumentando o DPI até obter os campos obrigatórios."""
+    escalonamento = EscalonamentoOCR(filepath, dpis=list(range(dpi_inicial, dpi_maximo + 1, dpi_incremento)))
+    dados = escalonamento.executar()
+    dados['custo_ocr'] = escalonamento.custo
+    return dados
 
-    if not all(dados_parciais.values()):
-        dpi_atual = dpi_inicial if dpi_atual is None else dpi_atual + dpi_incremento
-        if dpi_atual <= dpi_maximo:
-            dados_parciais = extrair_dados_texto(filepath, extrair_texto_ocr(filepath, dpi=dpi_atual))
-            campos_obrigatorios = ['numero_nf', 'pos_nf', 'linhas_nf']
 
-            if not all(dados_parciais[campo] for campo in campos_obrigatorios):
-                extrair_dados_recursivamente(filepath, dpi_atual, dados_parciais)
-            else:
-                print(colorize_terminal(
-                    f"[<roxo>DEBUG</roxo>] [<verde>SUCESSO</verde>] Dados Extraídos com SUCESSO"
-                ))
-                return dados_parciais
+def extrair_dados(filepath: str, usar_cache: bool = True):
+    chave = None
+    cache = obter_cache() if usar_cache else None
+    if cache is not None:
+        try:
+            with medir("cache"):
+                chave = calcular_chave(filepath)
+                dados_cache = cache.obter(chave)
+            # Entradas incompletas (gravadas antes de o cache aceitar só extrações
+            # completas) são ignoradas e refeitas
+            if dados_cache is not None and dados_completos(dados_cache):
+                contar("cache_acertos")
+                log.debug("[<verde>CACHE</verde>] Dados recuperados do cache: %s", filepath)
+                return desserializar_dados(dados_cache)
+        except Exception as e:
+            log.warning("Falha ao consultar cache: %s", e)
+
+    textos_pdf = extrair_textos_paginas_pdf(filepath)
+    dados = extrair_dados_texto(filepath, "\n".join(textos_pdf).strip())
+    if not dados_completos(dados):
+        log.debug("Extração por leitura simples incompleta, escalonando para OCR")
+
+        escalonamento = EscalonamentoOCR(filepath, textos_pdf)
+
+        # OCR apenas das páginas sem camada de texto (ex.: anexos digitalizados)
+        paginas_ocr = paginas_sem_texto(textos_pdf)
+        if paginas_ocr and len(paginas_ocr) < len(textos_pdf):
+            dados = escalonamento.executar(paginas_ocr) or dados
+
+        # Demais páginas que podem fornecer os campos (o cabeçalho, ou todas se
+        # a camada de texto é ilegível), reaproveitando as já processadas
+        if not dados_completos(dados) and not escalonamento.indisponivel:
+            dados = escalonamento.executar(paginas_para_ocr(textos_pdf)) or dados
+
+        dados['custo_ocr'] = escalonamento.custo
+        contar("escalonamentos_dpi", len(escalonamento.custo['dpis']))
+        log.debug(
+            "Custo OCR: <azul>%d</azul> renderizações, <azul>%d</azul> passadas de OCR, DPIs %s",
+            escalonamento.custo['renderizacoes'], escalonamento.custo['ocr'], escalonamento.custo['dpis']
+        )
+
+    # Só extrações completas vão para o cache: uma falha de OCR ou um texto
+    # vazio pode ser transitório (Tesseract ausente, arquivo ainda em cópia) e
+    # não deve se repetir nas próximas execuções sem nova tentativa
+    if chave is not None and dados_completos(dados):
+        try:
+            cache.gravar(chave, serializar_dados(dados))
+        except Exception as e:
+            log.warning("Falha ao gravar cache: %s", e)
 
-    return dados_parciais
+    return dados
 
 
-def extrair_dados(filepath: str):
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] extrators.py <- extrair_dados"))
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] extrair_dados -> extrair_dados_texto"))
-    dados = extrair_dados_texto(filepath, extrair_texto_pdf(filepath))
-    if not all(dados.values()):
-        campos_obrigatorios = ['numero_nf', 'pos_nf', 'linhas_nf']
-        if not all(dados[campo] for campo in campos_obrigatorios):
-            print(colorize_terminal(
-                f"[<vermelho>FALHA</vermelho>] Falha na extração por leitura simples"
-            ))
-            dados = extrair_dados_recursivamente(filepath)
+def serializar_dados(dados: dict) -> dict:
+    """Converte o resultado de extrair_dados para um formato serializável em JSON."""
+    serializado = dict(dados)
+    serializado['linhas_nf'] = [
+        linha.groupdict()
+        for linha in dados.get('linhas_nf', [])
+    ]
+    return serializado
 
 
-    return dados
+def desserializar_dados(dados: dict) -> dict:
+    """Restaura o resultado de extrair_dados a partir de serializar_dados."""
+    restaurado = dict(dados)
+    restaurado['linhas_nf'] = [LinhaPedido(linha) for linha in dados.get('linhas_nf', [])]
+    return restaurado
 
 
 def extrair_dados_texto(filepath, texto):
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] extrators.py <- extrair_dados_texto"))
     try:
-        dados = {
-            'numero_nf': extrair_numero_nf(filepath, texto) or '',
-            'data_nf': extrair_data_emissao(texto) or '',
-            'pos_nf': extrair_pos(filepath, texto) or [],
-            'linhas_nf': extrair_linhas_pedido(texto) or [],
-        }
-        return dados
+        with medir("analise"):
+            return extrair_campos(filepath, texto)
     except Exception as e:
-        print(colorize_terminal(f"[<vermelho>ERRO</vermelho>] Falha ao extrair dados:\n{str(e)}"))
+        log.error("Falha ao extrair dados de %s: %s", os.path.basename(filepath), e)
         return {}
@@ -1,8 +1,42 @@
 import os
 import shutil
 from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from config import DEFAULT_XLSX_FILENAME
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from config import DEFAULT_XLSX_FILENAME, XLSX_CABECALHOS, XLSX_LARGURAS_COLUNAS
+from core.log import obter_logger
+from core.xlsx_incremental import anexar_incremental, carregar_manifesto, gravar_manifesto
+
+log = obter_logger(__name__)
+
+# Estilos das planilhas de PO
+
+# Definir estilos de borda
+thin_border = Border(left=Side(style='thin'),
+                     right=Side(style='thin'),
+                     top=Side(style='thin'),
+                     bottom=Side(style='thin'))
+
+# Cores pré-definidas
+amarelo_titulo = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+cinza_cabecalho = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+azul_linha = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
+amarelo_duplicado = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
+vermelho_novo = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
+
+# Fonte padrão Arial
+fonte_normal = Font(name='Arial', size=12)
+fonte_cabecalho = Font(name='Arial', size=12, bold=True)
+fonte_titulo = Font(name='Arial', size=14, bold=True)
+
+# Formatos numéricos
+formato_inteiro = '0'
+formato_moeda = '"R$" #,##0.00'  # Formato customizado para moeda brasileira
+formato_data = 'dd/mm/yyyy'
+formato_texto = '@'  # Formato de texto no Excel
+
+# Formato numérico de cada coluna de dados
+FORMATOS_COLUNAS = [formato_inteiro, formato_data, formato_inteiro, formato_texto, formato_moeda]
 
 
 def criar_diretorio_se_nao_existir(caminho):
@@ -20,15 +54,54 @@ def mover_arquivo(origem, destino_dir):
         shutil.move(origem, destino)
         return True
     except Exception as e:
-        print(f"Erro ao mover arquivo {origem}: {e}")
+        log.error("Erro ao mover arquivo %s: %s", origem, e)
         return False
 
 
-def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME):
-    """Salva os dados em um arquivo Excel com formatação específica."""
+def indexar_linhas(ws, num_colunas, min_row=4):
+    """
+    Indexa as linhas de dados de uma planilha pelos seus valores.
+
+    Args:
+        ws: Planilha
+        num_colunas: Quantidade de colunas da chave (linhas menores são completadas com None)
+        min_row: Primeira linha de dados (após título e cabeçalhos)
+
+    Returns:
+        Dicionário {tupla de valores: [números das linhas em ordem]}
+    """
+    indice = {}
+    for num_linha, row in enumerate(ws.iter_rows(min_row=min_row, max_col=num_colunas, values_only=True), min_row):
+        chave = tuple(row) + (None,) * (num_colunas - len(row))
+        indice.setdefault(chave, []).append(num_linha)
+    return indice
+
+
+def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME, streaming=True, incremental=True):
+    """Salva os dados em um arquivo Excel com formatação específica.
+
+    Quando o arquivo ainda não existe (e ``streaming`` é True) o workbook é
+    gerado em modo write-only por salvar_xlsx_streaming. Quando já existe e
+    tem um manifesto válido (e ``incremental`` é True), as linhas são anexadas
+    por anexar_incremental sem carregar o workbook; nos demais casos ele é
+    carregado, alterado e salvo por inteiro.
+    """
     try:
         caminho_completo = os.path.join(diretorio, nome_arquivo)
 
+        if streaming and not os.path.exists(caminho_completo):
+            salvar_xlsx_streaming(caminho_completo, dados)
+            return True
+
+        if incremental and os.path.exists(caminho_completo):
+            manifesto = carregar_manifesto(caminho_completo)
+            novos_dados = {
+                po_num: [(novo_item, converter_valores(novo_item)) for novo_item in map(_novo_item, linhas)]
+                for po_num, linhas in dados.items()
+            }
+            if manifesto and anexar_incremental(caminho_completo, novos_dados, manifesto):
+                return True
+
         # Verifica se o arquivo já existe
         if os.path.exists(caminho_completo):
             wb = load_workbook(caminho_completo)
@@ -36,29 +109,8 @@ def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME):
             wb = Workbook()
             wb.remove(wb.active)  # Remove planilha padrão
 
-        # Definir estilos de borda
-        thin_border = Border(left=Side(style='thin'),
-                             right=Side(style='thin'),
-                             top=Side(style='thin'),
-                             bottom=Side(style='thin'))
-
-        # Cores pré-definidas
-        amarelo_titulo = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-        cinza_cabecalho = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-        azul_linha = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-        amarelo_duplicado = PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")
-        vermelho_novo = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-
-        # Fonte padrão Arial
-        fonte_normal = Font(name='Arial', size=12)
-        fonte_cabecalho = Font(name='Arial', size=12, bold=True)
-        fonte_titulo = Font(name='Arial', size=14, bold=True)
-
-        # Formatos numéricos
-        formato_inteiro = '0'
-        formato_moeda = '"R$" #,##0.00'  # Formato customizado para moeda brasileira
-        formato_data = 'dd/mm/yyyy'
-        formato_texto = '@'  # Formato de texto no Excel
+        # Índice de cada planilha alterada, reaproveitado no manifesto
+        indices = {}
 
         # Processar cada PO
         for po_num, linhas in dados.items():
@@ -86,8 +138,7 @@ def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME):
                 ws["A2"].fill = cinza_cabecalho
 
                 # Cabeçalhos das colunas (linha 3)
-                headers = ["N. Nota", "Data", "Linha da PO", "Descrição", "Valor"]
-                for col_num, header in enumerate(headers, 1):
+                for col_num, header in enumerate(XLSX_CABECALHOS, 1):
                     cell = ws.cell(row=3, column=col_num, value=header)
                     cell.font = fonte_cabecalho
                     cell.alignment = Alignment(horizontal="center", vertical="center")
@@ -100,41 +151,27 @@ def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME):
                 ws.row_dimensions[3].height = 20
 
                 # Ajuste de largura das colunas
-                ws.column_dimensions["A"].width = 20  # N. Nota
-                ws.column_dimensions["B"].width = 20  # Data
-                ws.column_dimensions["C"].width = 20  # Linha da PO
-                ws.column_dimensions["D"].width = 50  # Descrição
-                ws.column_dimensions["E"].width = 20  # Valor
+                for coluna, largura in XLSX_LARGURAS_COLUNAS.items():
+                    ws.column_dimensions[coluna].width = largura
 
             # Preparar dados para inserção
-            novos_dados = []
-            for linha in linhas:
-                novo_item = [
-                    linha.get("nota", ""),
-                    linha.get("data_emissao", ""),
-                    linha.get("linha", ""),
-                    linha.get("descricao", ""),
-                    linha.get("valor", 0),
-                ]
-                novos_dados.append(novo_item)
+            novos_dados = [_novo_item(linha) for linha in linhas]
+
+            # Índice das linhas existentes, construído uma vez por planilha
+            num_colunas = max(ws.max_column, 5)
+            indice = indexar_linhas(ws, num_colunas)
+            proxima_linha = ws.max_row + 1
 
             # Verificar duplicatas e inserir novos dados
             for novo_item in novos_dados:
                 # Verifica se já existe uma linha igual
-                duplicata = False
-                for row in ws.iter_rows(min_row=4, values_only=True):
-                    if row == tuple(novo_item):
-                        duplicata = True
-                        # Marca a linha existente como duplicada
-                        for row_cells in ws.iter_rows(min_row=4):
-                            if tuple(cell.value for cell in row_cells) == tuple(novo_item):
-                                for cell in row_cells:
-                                    cell.fill = amarelo_duplicado
-                                break
-                        break
-
-                # Determina a próxima linha disponível
-                proxima_linha = ws.max_row + 1
+                linhas_iguais = indice.get(tuple(novo_item) + (None,) * (num_colunas - len(novo_item)))
+                duplicata = bool(linhas_iguais)
+                if duplicata:
+                    # Marca a (primeira) linha existente como duplicada
+                    for row_cells in ws.iter_rows(min_row=linhas_iguais[0], max_row=linhas_iguais[0]):
+                        for cell in row_cells:
+                            cell.fill = amarelo_duplicado
 
                 # Insere o novo item
                 for col_num, value in enumerate(novo_item, 1):
@@ -178,6 +215,14 @@ def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME):
                 # Ajusta altura da linha para 40 pixels
                 ws.row_dimensions[proxima_linha].height = 40
 
+                # Registra a linha inserida com os valores já convertidos
+                chave = tuple(ws.cell(row=proxima_linha, column=col).value for col in range(1, len(novo_item) + 1))
+                chave += (None,) * (num_colunas - len(chave))
+                indice.setdefault(chave, []).append(proxima_linha)
+                proxima_linha += 1
+
+            indices[sheet_name] = {"colunas": num_colunas, "proxima_linha": proxima_linha, "indice": indice}
+
             # Aplicar bordas às células já existentes (linhas 1-3)
             for row in ws.iter_rows(min_row=1, max_row=3):
                 for cell in row:
@@ -186,10 +231,200 @@ def salvar_em_xlsx(diretorio, dados, nome_arquivo=DEFAULT_XLSX_FILENAME):
         # Reordenar as planilhas por número de PO
         wb._sheets.sort(key=lambda ws: int(ws.title.split('_')[1]) if ws.title.startswith('PO_') else 0)
 
+        estilos = ids_estilos(wb.worksheets[0]) if wb.worksheets else None
+
         # Salvar o arquivo
         wb.save(caminho_completo)
+
+        if estilos:
+            # Planilhas não alteradas nesta execução também entram no manifesto
+            for ws in wb.worksheets:
+                if ws.title not in indices:
+                    num_colunas = max(ws.max_column, 5)
+                    indices[ws.title] = {
+                        "colunas": num_colunas,
+                        "proxima_linha": ws.max_row + 1,
+                        "indice": indexar_linhas(ws, num_colunas),
+                    }
+            _gravar_manifesto_seguro(caminho_completo, estilos, indices)
         return True
 
     except Exception as e:
-        print(f"Erro ao salvar arquivo Excel: {e}")
-        return False
\ No newline at end of file
+        log.error("Erro ao salvar arquivo Excel: %s", e)
+        return False
+
+
+def _novo_item(linha):
+    """Valores de uma linha de pedido na ordem das colunas da planilha."""
+    return [
+        linha.get("nota", ""),
+        linha.get("data_emissao", ""),
+        linha.get("linha", ""),
+        linha.get("descricao", ""),
+        linha.get("valor", 0),
+    ]
+
+
+def _gravar_manifesto_seguro(caminho_completo, estilos, planilhas):
+    """Grava o manifesto do XLSX; uma falha aqui só desativa o modo incremental na próxima execução."""
+    try:
+        gravar_manifesto(caminho_completo, estilos, planilhas)
+    except Exception as e:
+        log.debug("Manifesto do XLSX não gravado: %s", e)
+
+
+def ids_estilos(ws):
+    """
+    Registra no workbook os estilos das células de PO e retorna seus ids (índices em cellXfs).
+
+    Usado pelo manifesto do modo incremental; deve ser chamado antes de salvar o workbook.
+    """
+    centro = Alignment(horizontal="center", vertical="center")
+
+    def estilo(fonte=None, fundo=None, alinhamento=None, formato=None):
+        cell = WriteOnlyCell(ws)
+        cell.border = thin_border
+        if fonte:
+            cell.font = fonte
+        if fundo:
+            cell.fill = fundo
+        if alinhamento:
+            cell.alignment = alinhamento
+        if formato:
+            cell.number_format = formato
+        return cell.style_id
+
+    alinhamento_dado = Alignment(horizontal="center", vertical="center", wrapText=True)
+    fundos = {'impar': azul_linha, 'par': None, 'duplicado': amarelo_duplicado, 'novo': vermelho_novo}
+    return {
+        'titulo': estilo(fonte_titulo, amarelo_titulo, centro),
+        'servicos': estilo(fonte_titulo, cinza_cabecalho, centro),
+        'cabecalho': estilo(fonte_cabecalho, azul_linha, centro),
+        'borda': estilo(),
+        'dados': {
+            nome_fundo: [estilo(fonte_normal, fundo, alinhamento_dado, formato) for formato in FORMATOS_COLUNAS]
+            for nome_fundo, fundo in fundos.items()
+        },
+    }
+
+
+def converter_valores(novo_item):
+    """Converte os valores de uma linha como são gravados nas células (nota/linha inteiras, valor float)."""
+    convertidos = list(novo_item)
+    for indice in (0, 2):  # N. Nota e Linha da PO
+        valor = convertidos[indice]
+        if isinstance(valor, str) and valor.isdigit():
+            convertidos[indice] = int(valor)
+
+    valor = convertidos[4]
+    if isinstance(valor, str):
+        # Remove possíveis pontos de milhar e converte vírgula para ponto
+        try:
+            convertidos[4] = float(valor.replace('.', '').replace(',', '.'))
+        except ValueError:
+            pass
+    return convertidos
+
+
+def registrar_estilos(wb):
+    """
+    Registra no workbook os estilos nomeados das planilhas de PO.
+
+    Returns:
+        Dicionário com os nomes dos estilos: 'titulo', 'servicos', 'cabecalho',
+        'borda' e ('dado', coluna, fundo) para fundo em 'impar', 'par',
+        'duplicado' e 'novo'
+    """
+    alinhamento_centro = Alignment(horizontal="center", vertical="center")
+    alinhamento_dado = Alignment(horizontal="center", vertical="center", wrapText=True)
+
+    estilos = {
+        'titulo': NamedStyle("po_titulo", font=fonte_titulo, fill=amarelo_titulo,
+                             alignment=alinhamento_centro, border=thin_border),
+        'servicos': NamedStyle("po_servicos", font=fonte_titulo, fill=cinza_cabecalho,
+                               alignment=alinhamento_centro, border=thin_border),
+        'cabecalho': NamedStyle("po_cabecalho", font=fonte_cabecalho, fill=azul_linha,
+                                alignment=alinhamento_centro, border=thin_border),
+        'borda': NamedStyle("po_borda", border=thin_border),
+    }
+
+    fundos = {'impar': azul_linha, 'par': PatternFill(), 'duplicado': amarelo_duplicado, 'novo': vermelho_novo}
+    for col_num, formato in enumerate(FORMATOS_COLUNAS, 1):
+        for nome_fundo, fundo in fundos.items():
+            estilos[('dado', col_num, nome_fundo)] = NamedStyle(
+                f"po_dado_{col_num}_{nome_fundo}", font=fonte_normal, fill=fundo, border=thin_border,
+                alignment=alinhamento_dado, number_format=formato
+            )
+
+    for estilo in estilos.values():
+        wb.add_named_style(estilo)
+
+    return {chave: estilo.name for chave, estilo in estilos.items()}
+
+
+def salvar_xlsx_streaming(caminho_completo, dados):
+    """
+    Gera um workbook novo em modo write-only, com estilos nomeados.
+
+    Produz as mesmas planilhas de salvar_em_xlsx sem manter o workbook em
+    memória: as linhas são gravadas à medida que são geradas. Como uma linha
+    gravada não pode ser alterada, as duplicatas dentro dos novos dados são
+    identificadas antes da escrita de cada planilha.
+    """
+    wb = Workbook(write_only=True)
+    estilos = registrar_estilos(wb)
+    indices = {}
+
+    # As planilhas já são criadas na ordem por número de PO
+    for po_num in sorted(dados, key=lambda po: int(po) if str(po).isdigit() else 0):
+        ws = wb.create_sheet(f"PO_{po_num}")
+
+        for coluna, largura in XLSX_LARGURAS_COLUNAS.items():
+            ws.column_dimensions[coluna].width = largura
+        ws.row_dimensions[1].height = 30
+        ws.row_dimensions[2].height = 30
+        ws.row_dimensions[3].height = 20
+        ws.merged_cells.add("A1:E1")
+        ws.merged_cells.add("A2:E2")
+
+        def celula(valor, estilo):
+            cell = WriteOnlyCell(ws, value=valor)
+            cell.style = estilos[estilo]
+            return cell
+
+        ws.append([celula(f"PO_{po_num}", 'titulo')] + [celula(None, 'borda') for _ in range(4)])
+        ws.append([celula("DESCRIÇÃO DE SERVIÇOS", 'servicos')] + [celula(None, 'borda') for _ in range(4)])
+        ws.append([celula(cabecalho, 'cabecalho') for cabecalho in XLSX_CABECALHOS])
+
+        # Mesma regra de duplicata do modo em memória: a linha nova (valores
+        # originais) é comparada às linhas já gravadas (valores convertidos)
+        linhas = []
+        fundos = []
+        indice = {}
+        for num_linha, novo_item in enumerate(map(_novo_item, dados[po_num]), 4):
+            convertidos = converter_valores(novo_item)
+
+            iguais = indice.get(tuple(novo_item))
+            if iguais:
+                fundos[iguais[0] - 4] = 'duplicado'
+                fundos.append('novo')
+            else:
+                fundos.append('par' if num_linha % 2 == 0 else 'impar')
+
+            linhas.append(convertidos)
+            indice.setdefault(tuple(convertidos), []).append(num_linha)
+
+        for num_linha, (convertidos, fundo) in enumerate(zip(linhas, fundos), 4):
+            ws.row_dimensions[num_linha].height = 40
+            ws.append([
+                celula(valor, ('dado', col_num, fundo))
+                for col_num, valor in enumerate(convertidos, 1)
+            ])
+
+        indices[ws.title] = {"colunas": 5, "proxima_linha": 4 + len(linhas), "indice": indice}
+
+    ids = ids_estilos(wb.worksheets[0]) if wb.worksheets else None
+    wb.save(caminho_completo)
+
+    if ids:
+        _gravar_manifesto_seguro(caminho_completo, ids, indices)
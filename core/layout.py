@@ -0,0 +1,86 @@
+import re
+from typing import List, Tuple
+
+from config import OCR_ROI_DPI_DETECCAO, OCR_ROI_COBERTURA_MAX
+from core.log import obter_logger
+
+log = obter_logger(__name__)
+
+# Palavras que marcam o cabeçalho da nota (número e emissão). Cada palavra do
+# OCR precisa ser a âncora inteira (aceitando ":" ou "." no fim): prefixos
+# casariam com "dados", "nome", "novo" e espalhariam faixas pela página
+ANCORAS_CABECALHO = re.compile(r"^(nota|n[º°]|no?\.|emiss[aã]o|data)[:.]?$", re.IGNORECASE)
+
+# Palavras que marcam o bloco de discriminação dos serviços (PO / LINHA / VALOR);
+# "serviços" fica de fora, por aparecer também no cabeçalho e nos impostos
+ANCORAS_SERVICOS = re.compile(
+    r"^(po|linha|item|valor|vlr|discrimina[cç][aã]o|descri[cç][aã]o)[:.]?$", re.IGNORECASE
+)
+
+# Margens das faixas em fração da altura da página: (acima, abaixo)
+MARGEM_CABECALHO = (0.02, 0.03)
+MARGEM_SERVICOS = (0.02, 0.12)
+
+
+def detectar_regioes(img, dpi: int, motor) -> Tuple[List[Tuple[int, int]], bool]:
+    """
+    Localiza as faixas horizontais da página com os dados da nota.
+
+    A detecção roda sobre uma cópia reduzida da página (OCR_ROI_DPI_DETECCAO),
+    procurando as palavras-âncora do cabeçalho e do bloco de serviços. Cada
+    âncora gera uma faixa na largura total da página, para não cortar as linhas
+    "PO xxxxxx LINHA n VALOR x / descrição".
+
+    Args:
+        img: Página renderizada em alta resolução
+        dpi: Resolução de ``img``
+        motor: Motor de OCR usado na detecção
+
+    Returns:
+        (faixas, servicos): faixas (topo, base) em pixels de ``img``, ordenadas
+        de cima para baixo, vazia se a detecção falhar ou não trouxer economia;
+        servicos indica se alguma âncora do bloco de serviços foi encontrada
+    """
+    fator = max(1, round(dpi / OCR_ROI_DPI_DETECCAO))
+    reduzida = img.reduce(fator) if fator > 1 else img
+    try:
+        palavras = motor.palavras(reduzida)
+    finally:
+        if reduzida is not img:
+            reduzida.close()
+
+    altura = img.height
+    faixas = []
+    servicos = False
+    for texto, (_, topo, _, alt) in palavras:
+        if ANCORAS_SERVICOS.match(texto):
+            acima, abaixo = MARGEM_SERVICOS
+            servicos = True
+        elif ANCORAS_CABECALHO.match(texto):
+            acima, abaixo = MARGEM_CABECALHO
+        else:
+            continue
+
+        inicio = max(0, int(topo * fator - acima * altura))
+        fim = min(altura, int((topo + alt) * fator + abaixo * altura))
+        faixas.append((inicio, fim))
+
+    faixas = _mesclar_faixas(faixas)
+
+    cobertura = sum(fim - inicio for inicio, fim in faixas) / altura if altura else 1
+    if not faixas or cobertura > OCR_ROI_COBERTURA_MAX:
+        log.debug("Regiões não detectadas (cobertura %.0f%%), usando página inteira", cobertura * 100)
+        return [], servicos
+
+    return faixas, servicos
+
+
+def _mesclar_faixas(faixas: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Une faixas sobrepostas ou adjacentes."""
+    mescladas = []
+    for inicio, fim in sorted(faixas):
+        if mescladas and inicio <= mescladas[-1][1]:
+            mescladas[-1] = (mescladas[-1][0], max(fim, mescladas[-1][1]))
+        else:
+            mescladas.append((inicio, fim))
+    return mescladas
@@ -0,0 +1,266 @@
+"""
+Log central do ConsolidadorOS, sobre o módulo ``logging``.
+
+Os módulos obtêm um logger com ``obter_logger(__name__)`` e registram com
+formatação preguiçosa (``log.debug("Dados: %s", resultado)``): a mensagem só
+é montada se algum destino aceitar o nível, então DEBUG desligado custa
+apenas a comparação de nível.
+
+Destinos (configurar_log / adicionar_sink):
+    - terminal (saída de erro): tags <cor> viram cores ANSI só em terminais
+    - arquivo rotativo: tags removidas, com nível, processo e módulo
+    - interface (GUI): recebe o texto com as tags, que a própria interface colore
+
+As mensagens da interface (log_message) passam por ``espelhar`` para também
+chegarem ao terminal e ao arquivo. Os processos de extração enviam seus
+registros ao processo principal por uma fila (encaminhar_processos), que os
+entrega aos mesmos destinos.
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import re
+import sys
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Union
+
+from config import (
+    LOG_ARQUIVO,
+    LOG_ARQUIVO_COPIAS,
+    LOG_ARQUIVO_MAX_BYTES,
+    LOG_NIVEL,
+    LOG_NIVEL_ARQUIVO,
+    colorize_terminal,
+    remover_tags
+)
+
+# Logger raiz da aplicação; bibliotecas (pdfminer, PIL...) ficam de fora
+RAIZ = "consolidador"
+
+# Prefixo de cada nível nas saídas; as mensagens da interface já trazem o seu
+PREFIXOS = {
+    logging.DEBUG: "[<roxo>DEBUG</roxo>] ",
+    logging.INFO: "",
+    logging.WARNING: "[<amarelo>AVISO</amarelo>] ",
+    logging.ERROR: "[<vermelho>ERRO</vermelho>] ",
+    logging.CRITICAL: "[<vermelho>ERRO</vermelho>] ",
+}
+
+_raiz = logging.getLogger(RAIZ)
+_raiz.propagate = False
+# Sem configurar_log (ex.: scripts importando core), avisos e erros ainda
+# aparecem na saída de erro, pelo handler de último recurso do logging
+_raiz.setLevel(logging.WARNING)
+
+# Handlers de terminal e arquivo instalados por configurar_log (substituídos a cada chamada)
+_handlers_configurados = []
+
+
+def obter_logger(nome: str) -> logging.Logger:
+    """Logger de um módulo, abaixo da raiz da aplicação (ex.: obter_logger(__name__))."""
+    return logging.getLogger(f"{RAIZ}.{nome}")
+
+
+def _nivel(nivel: Union[int, str]) -> int:
+    if isinstance(nivel, int):
+        return nivel
+    valor = logging.getLevelName(str(nivel).strip().upper())
+    return valor if isinstance(valor, int) else logging.INFO
+
+
+class FormatadorTags(logging.Formatter):
+    """
+    Formata o registro com o prefixo do nível e trata as tags <cor>.
+
+    Args:
+        modo: "ansi" (cores do terminal), "remover" (texto puro) ou "manter" (interface)
+        fmt: Formato do logging.Formatter; ``%(message)s`` recebe o texto já com prefixo
+    """
+
+    def __init__(self, modo: str, fmt: str = "%(message)s", datefmt: Optional[str] = None):
+        super().__init__(fmt, datefmt)
+        self.modo = modo
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        prefixo = "" if getattr(record, "interface", False) else PREFIXOS.get(record.levelno, "")
+        # record.message é recalculado por format() a cada destino
+        record.message = prefixo + record.message.strip()
+        texto = super().formatMessage(record)
+        if self.modo == "ansi":
+            return colorize_terminal(texto)
+        if self.modo == "remover":
+            return remover_tags(texto)
+        return texto
+
+
+class SinkInterface(logging.Handler):
+    """
+    Destino que repassa os registros a uma função (ex.: log_message da GUI).
+
+    Ignora as mensagens que vieram da própria interface (espelhar), que ela
+    já exibiu.
+    """
+
+    def __init__(self, callback: Callable[[str], None], nivel: Union[int, str] = logging.WARNING):
+        super().__init__(_nivel(nivel))
+        self.callback = callback
+        self.setFormatter(FormatadorTags("manter"))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not getattr(record, "interface", False) and super().filter(record)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.callback(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def _atualizar_nivel_raiz():
+    """A raiz aceita o menor nível entre os destinos: abaixo dele, nem a mensagem é montada."""
+    niveis = [handler.level for handler in _raiz.handlers]
+    _raiz.setLevel(min(niveis) if niveis else logging.WARNING)
+
+
+def configurar_log(
+        nivel: Union[int, str] = LOG_NIVEL,
+        arquivo: Optional[Union[str, os.PathLike]] = LOG_ARQUIVO,
+        nivel_arquivo: Union[int, str] = LOG_NIVEL_ARQUIVO,
+        terminal: bool = True
+):
+    """
+    Configura os destinos de terminal e de arquivo rotativo.
+
+    Pode ser chamada de novo (ex.: a CLI depois de ler os argumentos): os
+    destinos anteriores são substituídos; os da interface (adicionar_sink)
+    são mantidos.
+
+    Args:
+        nivel: Nível mínimo do terminal
+        arquivo: Caminho do arquivo de log; None desativa
+        nivel_arquivo: Nível mínimo do arquivo
+        terminal: Se False, não escreve no terminal (ex.: executável sem console)
+    """
+    for handler in _handlers_configurados:
+        _raiz.removeHandler(handler)
+        handler.close()
+    _handlers_configurados.clear()
+
+    # Executáveis sem console (PyInstaller --windowed) não têm saída de erro
+    if terminal and sys.stderr is not None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setLevel(_nivel(nivel))
+        colorido = hasattr(sys.stderr, "isatty") and sys.stderr.isatty()
+        handler.setFormatter(FormatadorTags("ansi" if colorido else "remover", "[%(asctime)s] %(message)s", "%H:%M:%S"))
+        _handlers_configurados.append(handler)
+
+    if arquivo:
+        try:
+            os.makedirs(os.path.dirname(os.fspath(arquivo)) or ".", exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                arquivo, maxBytes=LOG_ARQUIVO_MAX_BYTES, backupCount=LOG_ARQUIVO_COPIAS,
+                encoding="utf-8", delay=True
+            )
+        except OSError as e:
+            obter_logger(__name__).warning("Arquivo de log indisponível (%s): %s", arquivo, e)
+        else:
+            handler.setLevel(_nivel(nivel_arquivo))
+            handler.setFormatter(FormatadorTags(
+                "remover", "%(asctime)s %(levelname)-7s [%(processName)s] %(name)s: %(message)s"
+            ))
+            _handlers_configurados.append(handler)
+
+    for handler in _handlers_configurados:
+        _raiz.addHandler(handler)
+    _atualizar_nivel_raiz()
+
+
+def adicionar_sink(callback: Callable[[str], None], nivel: Union[int, str] = logging.WARNING) -> SinkInterface:
+    """Adiciona um destino de interface; devolve o handler para remover_sink."""
+    handler = SinkInterface(callback, nivel)
+    _raiz.addHandler(handler)
+    _atualizar_nivel_raiz()
+    return handler
+
+
+def remover_sink(handler: logging.Handler):
+    _raiz.removeHandler(handler)
+    _atualizar_nivel_raiz()
+
+
+# Rótulos das mensagens da interface ([<vermelho>ERRO</vermelho>]...) e o nível correspondente
+_ROTULO = re.compile(r"\[<(\w+)>([A-Za-zÀ-ú]+)</\1>\]")
+_NIVEIS_ROTULOS = {"ERRO": logging.ERROR, "FALHA": logging.WARNING, "AVISO": logging.WARNING}
+
+
+def _nivel_mensagem(mensagem: str) -> int:
+    """Nível de uma mensagem da interface, pelo rótulo que ela traz."""
+    for _, rotulo in _ROTULO.findall(mensagem):
+        nivel = _NIVEIS_ROTULOS.get(rotulo.upper())
+        if nivel:
+            return nivel
+    return logging.INFO
+
+
+def espelhar(log_message: Callable[[str], None]) -> Callable[[str], None]:
+    """
+    Envolve o log_message da interface para que cada mensagem também seja
+    registrada no log (terminal e arquivo). Envolver de novo não duplica.
+    """
+    if getattr(log_message, "espelhado", False):
+        return log_message
+
+    logger = obter_logger("interface")
+
+    def log_espelhado(message: str):
+        log_message(message)
+        nivel = _nivel_mensagem(message)
+        if logger.isEnabledFor(nivel):
+            logger.log(nivel, "%s", message, extra={"interface": True})
+
+    log_espelhado.espelhado = True
+    return log_espelhado
+
+
+class _Reemitir(logging.Handler):
+    """Entrega um registro vindo de outro processo ao logger de origem, neste processo."""
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        logger = logging.getLogger(record.name)
+        if not logger.disabled:
+            logger.handle(record)
+        return True
+
+
+@contextmanager
+def encaminhar_processos() -> Iterator[tuple]:
+    """
+    Recebe os registros dos processos de extração enquanto o bloco durar.
+
+    Produz os argumentos de inicializar_log_processo (fila e nível), a serem
+    repassados ao inicializador do pool. Só um processo escreve no arquivo,
+    o que mantém a rotação segura.
+    """
+    fila = multiprocessing.Queue()
+    ouvinte = logging.handlers.QueueListener(fila, _Reemitir())
+    ouvinte.start()
+    try:
+        yield fila, _raiz.level
+    finally:
+        ouvinte.stop()
+        fila.close()
+        fila.join_thread()
+
+
+def inicializar_log_processo(fila, nivel: int):
+    """
+    Configura o log de um processo de extração: os registros do nível do
+    processo principal para cima seguem pela fila; os handlers herdados (fork)
+    são descartados.
+    """
+    for handler in list(_raiz.handlers):
+        _raiz.removeHandler(handler)
+    _handlers_configurados.clear()
+    _raiz.addHandler(logging.handlers.QueueHandler(fila))
+    _raiz.setLevel(nivel)
@@ -0,0 +1,184 @@
+import csv
+import heapq
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from config import METRICAS_DOCUMENTOS_LENTOS
+
+# Coletor do documento em processamento na thread atual (None fora de coletar())
+_local = threading.local()
+
+
+class MetricasDocumento:
+    """
+    Tempos e contadores das etapas de um documento.
+
+    Attributes:
+        etapas: {etapa: [segundos, chamadas]}
+        contadores: {contador: quantidade} (páginas, escalonamentos de DPI...)
+        segundos: Tempo total do documento
+    """
+
+    def __init__(self):
+        self.etapas: Dict[str, List] = {}
+        self.contadores: Dict[str, int] = {}
+        self.segundos = 0.0
+
+    def registrar(self, etapa: str, segundos: float):
+        acumulado = self.etapas.setdefault(etapa, [0.0, 0])
+        acumulado[0] += segundos
+        acumulado[1] += 1
+
+    def contar(self, contador: str, quantidade: int = 1):
+        self.contadores[contador] = self.contadores.get(contador, 0) + quantidade
+
+    def para_dict(self) -> Dict:
+        """Formato serializável, devolvido pelos processos de extração."""
+        return {
+            "segundos": self.segundos,
+            "etapas": {etapa: {"segundos": s, "chamadas": n} for etapa, (s, n) in self.etapas.items()},
+            "contadores": dict(self.contadores),
+        }
+
+
+@contextmanager
+def coletar() -> Iterator[MetricasDocumento]:
+    """Ativa um coletor para o documento processado dentro do bloco (na thread atual)."""
+    anterior = getattr(_local, "metricas", None)
+    metricas = _local.metricas = MetricasDocumento()
+    inicio = time.perf_counter()
+    try:
+        yield metricas
+    finally:
+        metricas.segundos = time.perf_counter() - inicio
+        _local.metricas = anterior
+
+
+@contextmanager
+def medir(etapa: str):
+    """Acumula o tempo do bloco na etapa do documento atual; sem coletor ativo não faz nada."""
+    metricas = getattr(_local, "metricas", None)
+    if metricas is None:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas.registrar(etapa, time.perf_counter() - inicio)
+
+
+def contar(contador: str, quantidade: int = 1):
+    """Incrementa um contador do documento atual, se houver coletor ativo."""
+    metricas = getattr(_local, "metricas", None)
+    if metricas is not None:
+        metricas.contar(contador, quantidade)
+
+
+class MetricasExecucao:
+    """
+    Métricas de uma execução de process_directory.
+
+    Soma as etapas e contadores dos documentos (MetricasDocumento.para_dict,
+    vindos dos processos de extração) às etapas medidas no próprio escritor
+    (mover, exportar) e mantém os ``documentos_lentos`` documentos mais
+    demorados para o relatório. Etapas e contadores também podem ser
+    registrados por outras threads do pipeline (ex.: a triagem).
+    """
+
+    def __init__(self, documentos_lentos: int = METRICAS_DOCUMENTOS_LENTOS):
+        self.documentos_lentos = documentos_lentos
+        self.etapas: Dict[str, List] = {}
+        self.contadores: Dict[str, int] = {}
+        self.documentos = 0
+        self._lentos = []  # heap de (segundos, ordem, registro)
+        self._trava = threading.Lock()
+
+    def _registrar(self, etapa: str, segundos: float, chamadas: int = 1):
+        with self._trava:
+            acumulado = self.etapas.setdefault(etapa, [0.0, 0])
+            acumulado[0] += segundos
+            acumulado[1] += chamadas
+
+    def contar(self, contador: str, quantidade: int = 1):
+        """Incrementa um contador da execução."""
+        with self._trava:
+            self.contadores[contador] = self.contadores.get(contador, 0) + quantidade
+
+    @contextmanager
+    def medir(self, etapa: str):
+        """Acumula o tempo do bloco em uma etapa da execução (fora dos documentos)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._registrar(etapa, time.perf_counter() - inicio)
+
+    def adicionar_documento(self, arquivo: str, status: Optional[str], metricas: Optional[Dict]):
+        """Soma as métricas de um documento; None (resultado reaproveitado do diário) é ignorado."""
+        if not metricas:
+            return
+
+        self.documentos += 1
+        for etapa, medida in metricas["etapas"].items():
+            self._registrar(etapa, medida["segundos"], medida["chamadas"])
+        for contador, quantidade in metricas["contadores"].items():
+            self.contar(contador, quantidade)
+
+        if self.documentos_lentos <= 0:
+            return
+        registro = {
+            "arquivo": arquivo,
+            "status": status or "erro",
+            "segundos": round(metricas["segundos"], 4),
+            "contadores": metricas["contadores"],
+            "etapas": {etapa: round(medida["segundos"], 4) for etapa, medida in metricas["etapas"].items()},
+        }
+        item = (metricas["segundos"], self.documentos, registro)
+        if len(self._lentos) < self.documentos_lentos:
+            heapq.heappush(self._lentos, item)
+        else:
+            heapq.heappushpop(self._lentos, item)
+
+    def resumo(self) -> Dict:
+        """{'etapas': {etapa: {'segundos', 'chamadas'}}, 'contadores': {...}}, etapas da mais lenta à mais rápida."""
+        with self._trava:
+            etapas = sorted(self.etapas.items(), key=lambda item: item[1][0], reverse=True)
+            contadores = dict(self.contadores)
+        return {
+            "etapas": {etapa: {"segundos": round(s, 4), "chamadas": n} for etapa, (s, n) in etapas},
+            "contadores": contadores,
+        }
+
+    def mais_lentos(self) -> List[Dict]:
+        """Registros dos documentos mais demorados, do mais lento ao mais rápido."""
+        return [registro for _, _, registro in sorted(self._lentos, reverse=True)]
+
+    def gravar_relatorio(self, caminho: str):
+        """
+        Grava o resumo e os documentos mais lentos: JSON se caminho terminar em
+        .json, senão CSV (uma linha por documento, uma coluna por etapa e contador).
+        """
+        lentos = self.mais_lentos()
+
+        if caminho.lower().endswith(".json"):
+            with open(caminho, "w", encoding="utf-8") as arquivo:
+                json.dump({**self.resumo(), "documentos": self.documentos, "mais_lentos": lentos},
+                          arquivo, ensure_ascii=False, indent=2)
+            return
+
+        etapas = sorted({etapa for registro in lentos for etapa in registro["etapas"]})
+        contadores = sorted({contador for registro in lentos for contador in registro["contadores"]})
+        with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+            writer = csv.writer(arquivo)
+            writer.writerow(["arquivo", "status", "segundos", *contadores, *(f"{etapa}_s" for etapa in etapas)])
+            for registro in lentos:
+                writer.writerow([
+                    registro["arquivo"], registro["status"], registro["segundos"],
+                    *(registro["contadores"].get(contador, 0) for contador in contadores),
+                    *(registro["etapas"].get(etapa, 0) for etapa in etapas),
+                ])
@@ -0,0 +1,385 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config import (
+    DEFAULT_FORMATOS_EXPORTACAO,
+    DEFAULT_WORKERS,
+    MONITOR_ESPERA_MAXIMA_SEGUNDOS,
+    MONITOR_ESTABILIZACAO_SEGUNDOS,
+    MONITOR_INTERVALO_POLLING_SEGUNDOS,
+    MONITOR_INTERVALO_SEGUNDOS,
+    PASTA_PROCESSADAS,
+    PASTA_REVISAR,
+    TRIAGEM_ATIVA,
+    TRIAGEM_WORKERS_TEXTO
+)
+from core.controle import ControleExecucao
+from core.log import espelhar, obter_logger
+from core.processor import eh_arquivo_pra_processamento, process_directory
+
+log = obter_logger(__name__)
+
+# Constantes do inotify (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+_MASCARA = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_ONLYDIR
+_EVENTO = struct.Struct("iIII")
+
+
+def _pastas_ignoradas(base_dir: str) -> Set[str]:
+    """Pastas de destino dos PDFs processados, que não são monitoradas."""
+    return {os.path.join(base_dir, pasta) for pasta in (PASTA_PROCESSADAS, PASTA_REVISAR)}
+
+
+def _percorrer_pdfs(diretorio: str, ignoradas: Set[str]):
+    """PDFs de diretorio (recursivo), fora das pastas ignoradas: (caminho, os.stat_result)."""
+    try:
+        entradas = list(os.scandir(diretorio))
+    except OSError:
+        return
+
+    for entrada in entradas:
+        try:
+            if entrada.is_dir(follow_symlinks=False):
+                if entrada.path not in ignoradas:
+                    yield from _percorrer_pdfs(entrada.path, ignoradas)
+            elif entrada.name.lower().endswith(".pdf"):
+                yield entrada.path, entrada.stat()
+        except OSError:
+            continue
+
+
+class ObservadorPolling:
+    """
+    Detecta PDFs novos ou alterados comparando tamanho e data de modificação
+    entre varreduras periódicas de base_dir. Funciona em qualquer sistema.
+    """
+
+    nome = "polling"
+
+    def __init__(self, base_dir: str, intervalo: float = MONITOR_INTERVALO_POLLING_SEGUNDOS):
+        self.base_dir = base_dir
+        self.intervalo = intervalo
+        self.ignoradas = _pastas_ignoradas(base_dir)
+        self.assinaturas = self._varrer()
+        self.proxima_varredura = time.monotonic() + intervalo
+
+    def _varrer(self) -> Dict[str, Tuple[int, int]]:
+        return {
+            caminho: (stat.st_size, stat.st_mtime_ns)
+            for caminho, stat in _percorrer_pdfs(self.base_dir, self.ignoradas)
+        }
+
+    def eventos(self, timeout: float) -> List[str]:
+        """Espera até timeout segundos e devolve os PDFs alterados desde a última varredura."""
+        espera = self.proxima_varredura - time.monotonic()
+        if espera > timeout:
+            time.sleep(timeout)
+            return []
+        if espera > 0:
+            time.sleep(espera)
+
+        anteriores, self.assinaturas = self.assinaturas, self._varrer()
+        self.proxima_varredura = time.monotonic() + self.intervalo
+        return [
+            caminho for caminho, assinatura in self.assinaturas.items()
+            if anteriores.get(caminho) != assinatura
+        ]
+
+    def fechar(self):
+        pass
+
+
+class ObservadorInotify:
+    """
+    Detecta PDFs criados, alterados ou movidos para dentro de base_dir pelo
+    inotify do Linux (via libc, sem dependências), com uma vigia por pasta.
+    Pastas criadas depois são vigiadas assim que aparecem; se a fila do kernel
+    transbordar, a árvore inteira é relatada de novo.
+    """
+
+    nome = "inotify"
+
+    def __init__(self, base_dir: str):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify disponível apenas no Linux")
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            erro = ctypes.get_errno()
+            raise OSError(erro, os.strerror(erro))
+
+        self.base_dir = base_dir
+        self.ignoradas = _pastas_ignoradas(base_dir)
+        self.pastas: Dict[int, str] = {}
+        try:
+            self._vigiar_arvore(base_dir, obrigatoria=True)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _vigiar(self, pasta: str, obrigatoria: bool = False) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(pasta), _MASCARA)
+        if wd < 0:
+            erro = ctypes.get_errno()
+            if obrigatoria:
+                raise OSError(erro, f"inotify_add_watch: {os.strerror(erro)}", pasta)
+            log.warning("Pasta não monitorada (%s): %s", os.strerror(erro), pasta)
+            return False
+        self.pastas[wd] = pasta
+        return True
+
+    def _vigiar_arvore(self, pasta: str, obrigatoria: bool = False):
+        if not self._vigiar(pasta, obrigatoria):
+            return
+        for raiz, subpastas, _ in os.walk(pasta):
+            subpastas[:] = [nome for nome in subpastas if os.path.join(raiz, nome) not in self.ignoradas]
+            for nome in subpastas:
+                self._vigiar(os.path.join(raiz, nome))
+
+    def eventos(self, timeout: float) -> List[str]:
+        """Espera até timeout segundos por eventos e devolve os arquivos afetados."""
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return []
+
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        arquivos = []
+        posicao = 0
+        while posicao + _EVENTO.size <= len(dados):
+            wd, mascara, _, tamanho = _EVENTO.unpack_from(dados, posicao)
+            posicao += _EVENTO.size
+            nome = os.fsdecode(dados[posicao:posicao + tamanho].rstrip(b"\0"))
+            posicao += tamanho
+
+            if mascara & _IN_Q_OVERFLOW:
+                # Eventos perdidos: relata tudo que existe (o filtro de
+                # estabilidade descarta os arquivos que não mudaram)
+                arquivos.extend(caminho for caminho, _ in _percorrer_pdfs(self.base_dir, self.ignoradas))
+                continue
+            if mascara & _IN_IGNORED:
+                self.pastas.pop(wd, None)
+                continue
+
+            pasta = self.pastas.get(wd)
+            if pasta is None or not nome:
+                continue
+            caminho = os.path.join(pasta, nome)
+
+            if mascara & _IN_ISDIR:
+                # Pasta nova (ou movida para dentro): passa a ser vigiada e os
+                # PDFs que já chegaram com ela são relatados
+                if mascara & (_IN_CREATE | _IN_MOVED_TO) and caminho not in self.ignoradas:
+                    self._vigiar_arvore(caminho)
+                    arquivos.extend(caminho_pdf for caminho_pdf, _ in _percorrer_pdfs(caminho, self.ignoradas))
+            else:
+                arquivos.append(caminho)
+
+        return arquivos
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+def criar_observador(base_dir: str, polling: bool = False):
+    """inotify quando disponível; senão (ou se polling=True), varredura periódica."""
+    if not polling:
+        try:
+            return ObservadorInotify(base_dir)
+        except (OSError, AttributeError) as e:
+            log.warning("inotify indisponível (%s), usando polling", e)
+    return ObservadorPolling(base_dir)
+
+
+class Estabilizacao:
+    """
+    Filtro de arquivos ainda em gravação (scanner, cópia pela rede).
+
+    Um PDF só é liberado depois de ficar ``segundos`` sem mudar de tamanho ou
+    data de modificação, de poder ser aberto para leitura e de ter o marcador
+    %%EOF no fim. Um PDF estável sem o marcador é liberado depois de
+    ``espera_maxima`` segundos (a extração o envia para revisão se estiver
+    corrompido).
+    """
+
+    def __init__(
+            self,
+            segundos: float = MONITOR_ESTABILIZACAO_SEGUNDOS,
+            espera_maxima: float = MONITOR_ESPERA_MAXIMA_SEGUNDOS
+    ):
+        self.segundos = segundos
+        self.espera_maxima = espera_maxima
+        # {caminho: ((tamanho, mtime_ns), instante da última mudança)}
+        self.pendentes: Dict[str, Tuple[Optional[Tuple[int, int]], float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.pendentes)
+
+    def tocar(self, caminho: str):
+        """Registra uma alteração no arquivo, reiniciando sua espera."""
+        self.pendentes[caminho] = (None, time.monotonic())
+
+    def prontos(self) -> List[str]:
+        """Retira e devolve os arquivos que terminaram de ser gravados."""
+        agora = time.monotonic()
+        liberados = []
+
+        for caminho, (assinatura, desde) in list(self.pendentes.items()):
+            try:
+                stat = os.stat(caminho)
+            except OSError:
+                # Removido ou movido antes de estabilizar
+                del self.pendentes[caminho]
+                continue
+
+            atual = (stat.st_size, stat.st_mtime_ns)
+            if atual != assinatura:
+                self.pendentes[caminho] = (atual, agora)
+                continue
+
+            parado = agora - desde
+            if parado < self.segundos:
+                continue
+
+            completo = _pdf_completo(caminho, stat.st_size)
+            if completo or (completo is not None and parado >= self.espera_maxima):
+                del self.pendentes[caminho]
+                liberados.append(caminho)
+
+        return liberados
+
+
+def _pdf_completo(caminho: str, tamanho: int) -> Optional[bool]:
+    """
+    Se o PDF termina com o marcador %%EOF (procurado no último 1 KB).
+
+    Returns:
+        True/False, ou None se o arquivo ainda não pode ser lido (bloqueado
+        pelo programa que o grava, no Windows)
+    """
+    try:
+        with open(caminho, "rb") as arquivo:
+            arquivo.seek(max(0, tamanho - 1024))
+            return b"%%EOF" in arquivo.read()
+    except OSError:
+        return None
+
+
+def monitorar_diretorio(
+        base_dir: str,
+        termo_nome: str,
+        termos_exclusao: List[str],
+        xlsx_output_dir: str,
+        xlsx_filename: str,
+        update_progress: Callable,
+        log_message: Callable,
+        parar: threading.Event,
+        workers: int = DEFAULT_WORKERS,
+        usar_cache: bool = True,
+        formatos: List[str] = DEFAULT_FORMATOS_EXPORTACAO,
+        polling: bool = False,
+        controle: Optional[ControleExecucao] = None,
+        triagem: bool = TRIAGEM_ATIVA,
+        workers_texto: Optional[int] = TRIAGEM_WORKERS_TEXTO
+) -> Dict:
+    """
+    Modo contínuo: processa os PDFs de base_dir e continua monitorando a pasta.
+
+    Primeiro processa o que já existe (process_directory completo); depois, a
+    cada PDF novo que passa pelo filtro de nomes e termina de ser gravado
+    (Estabilizacao), executa process_directory apenas sobre ele e os que
+    chegaram junto, acrescentando as linhas às saídas existentes (XLSX
+    incremental). O observador é criado antes da primeira passada, para que
+    os arquivos que chegarem durante ela não se percam.
+
+    Args:
+        base_dir: Pasta raiz monitorada
+        termo_nome, termos_exclusao: Filtro de nomes (eh_arquivo_pra_processamento)
+        xlsx_output_dir, xlsx_filename, formatos: Saídas, como em process_directory
+        update_progress, log_message: Callbacks da interface
+        parar: Evento que encerra o monitoramento
+        workers, usar_cache: Como em process_directory
+        polling: Força a varredura periódica mesmo com inotify disponível
+        controle: Pausa/cancelamento das passadas (process_directory); o
+            cancelamento também encerra o monitoramento
+        triagem, workers_texto: Faixas de extração, como em process_directory
+
+    Returns:
+        Resumo somado de todas as passadas, no formato de process_directory
+    """
+    log_message = espelhar(log_message)
+    observador = criar_observador(base_dir, polling)
+    estabilizacao = Estabilizacao()
+    ignoradas = _pastas_ignoradas(base_dir)
+    totais = {}
+
+    def processar(arquivos=None):
+        resumo = process_directory(
+            base_dir, termo_nome, termos_exclusao, xlsx_output_dir, xlsx_filename,
+            update_progress, log_message,
+            workers=workers if arquivos is None else min(workers, len(arquivos)),
+            usar_cache=usar_cache, formatos=formatos, arquivos=arquivos, controle=controle,
+            triagem=triagem, workers_texto=workers_texto
+        )
+        _acumular(totais, resumo)
+
+    try:
+        processar()
+
+        log_message(f"<azul>Monitorando a pasta ({observador.nome})...</azul>")
+        log.debug("Monitorando %s (%s)", base_dir, observador.nome)
+
+        while not parar.is_set() and not (controle is not None and controle.cancelado):
+            for caminho in observador.eventos(MONITOR_INTERVALO_SEGUNDOS):
+                if (caminho.lower().endswith(".pdf")
+                        and os.path.dirname(caminho) not in ignoradas
+                        and eh_arquivo_pra_processamento(caminho, termo_nome, termos_exclusao)):
+                    estabilizacao.tocar(caminho)
+
+            if len(estabilizacao):
+                prontos = estabilizacao.prontos()
+                if prontos:
+                    log_message(f"<azul>Novos arquivos:</azul> <roxo>{len(prontos)}</roxo>")
+                    processar(sorted(prontos))
+    finally:
+        observador.fechar()
+        log_message("<azul>Monitoramento encerrado</azul>")
+
+    return totais
+
+
+def _acumular(totais: Dict, resumo: Dict):
+    """Soma o resumo de uma passada de process_directory aos totais do monitoramento."""
+    for chave, valor in resumo.items():
+        if chave == "exportacao":
+            exportacao = totais.setdefault("exportacao", {})
+            for formato, caminho in valor.items():
+                exportacao[formato] = caminho if caminho and exportacao.get(formato, caminho) else None
+        elif isinstance(valor, dict):
+            # Etapas e contadores das métricas: soma campo a campo
+            _acumular(totais.setdefault(chave, {}), valor)
+        elif isinstance(valor, bool):
+            totais[chave] = totais.get(chave, False) or valor
+        else:
+            totais[chave] = totais.get(chave, 0) + valor
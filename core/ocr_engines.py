@@ -0,0 +1,211 @@
+import importlib.util
+import os
+import queue
+import re
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Optional, List, Tuple
+
+from config import OCR_CONFIG, OCR_LANG, OCR_BACKEND, OCR_MOTORES_POR_PROCESSO
+from core.log import obter_logger
+
+# Binding opcional para a API C do Tesseract: carrega os modelos uma única vez
+# por motor, sem subprocesso nem arquivo temporário por página. Como o
+# pytesseract, só é importado quando o primeiro motor é criado
+TESSEROCR_DISPONIVEL = importlib.util.find_spec("tesserocr") is not None
+
+log = obter_logger(__name__)
+
+# Executável do Tesseract usado pelo pytesseract (None: "tesseract" do PATH)
+_tesseract_cmd: Optional[str] = None
+
+
+def definir_tesseract_cmd(cmd: Optional[str]):
+    """Define o executável do Tesseract do processo atual, antes ou depois de importar o pytesseract."""
+    global _tesseract_cmd
+    _tesseract_cmd = cmd
+    if cmd:
+        importado = sys.modules.get("pytesseract")
+        if importado is not None:
+            importado.pytesseract.tesseract_cmd = cmd
+
+
+def obter_tesseract_cmd() -> str:
+    """Retorna o executável do Tesseract configurado no processo atual."""
+    return _tesseract_cmd or "tesseract"
+
+
+def importar_pytesseract():
+    """Importa o pytesseract (e o PIL) na primeira utilização, com o executável definido."""
+    import pytesseract
+
+    if _tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = _tesseract_cmd
+    return pytesseract
+
+
+class MotorOCR(ABC):
+    """Interface dos motores de OCR."""
+
+    nome = ""
+
+    @abstractmethod
+    def reconhecer(self, img) -> str:
+        """Retorna o texto reconhecido na imagem."""
+
+    @abstractmethod
+    def palavras(self, img) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        """Retorna as palavras reconhecidas com suas caixas (x, y, largura, altura)."""
+
+    def fechar(self):
+        pass
+
+
+class MotorPytesseract(MotorOCR):
+    """Motor baseado no pytesseract: um processo do tesseract por imagem."""
+
+    nome = "pytesseract"
+
+    def __init__(self):
+        self.pytesseract = importar_pytesseract()
+
+    def reconhecer(self, img) -> str:
+        return self.pytesseract.image_to_string(img, lang=OCR_LANG, config=OCR_CONFIG)
+
+    def palavras(self, img) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        dados = self.pytesseract.image_to_data(
+            img, lang=OCR_LANG, config=OCR_CONFIG, output_type=self.pytesseract.Output.DICT
+        )
+        return [
+            (texto.strip(), (x, y, w, h))
+            for texto, x, y, w, h in zip(dados["text"], dados["left"], dados["top"], dados["width"], dados["height"])
+            if texto.strip()
+        ]
+
+
+class MotorTesserocr(MotorOCR):
+    """Motor persistente via tesserocr, com os modelos de OCR_LANG carregados na criação."""
+
+    nome = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+
+        self.tesserocr = tesserocr
+        psm = re.search(r"--psm\s+(\d+)", OCR_CONFIG)
+        oem = re.search(r"--oem\s+(\d+)", OCR_CONFIG)
+
+        kwargs = {"lang": OCR_LANG}
+        if os.environ.get("TESSDATA_PREFIX"):
+            kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+        if psm:
+            kwargs["psm"] = int(psm.group(1))
+        if oem:
+            kwargs["oem"] = int(oem.group(1))
+
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+
+    def reconhecer(self, img) -> str:
+        self.api.SetImage(img)
+        return self.api.GetUTF8Text()
+
+    def palavras(self, img) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        self.api.SetImage(img)
+        self.api.Recognize()
+
+        resultado = []
+        nivel = self.tesserocr.RIL.WORD
+        for palavra in self.tesserocr.iterate_level(self.api.GetIterator(), nivel):
+            texto = (palavra.GetUTF8Text(nivel) or "").strip()
+            caixa = palavra.BoundingBox(nivel)
+            if texto and caixa:
+                x1, y1, x2, y2 = caixa
+                resultado.append((texto, (x1, y1, x2 - x1, y2 - y1)))
+        return resultado
+
+    def fechar(self):
+        self.api.End()
+
+
+def backend_efetivo(backend: str = OCR_BACKEND) -> str:
+    """Motor que criar_motor usa para o backend configurado, conforme o que está instalado."""
+    if backend in ("auto", "tesserocr") and TESSEROCR_DISPONIVEL:
+        return MotorTesserocr.nome
+    return MotorPytesseract.nome
+
+
+def criar_motor(backend: str = OCR_BACKEND) -> MotorOCR:
+    """
+    Cria um motor de OCR para o backend informado.
+
+    Args:
+        backend: "auto" (tesserocr se disponível), "tesserocr" ou "pytesseract"
+
+    Returns:
+        Motor de OCR; usa pytesseract se o backend persistente não puder ser criado
+    """
+    if backend_efetivo(backend) == MotorTesserocr.nome:
+        try:
+            return MotorTesserocr()
+        except Exception as e:
+            log.warning("tesserocr indisponível, usando pytesseract: %s", e)
+    elif backend == "tesserocr":
+        log.warning("tesserocr não instalado, usando pytesseract")
+
+    return MotorPytesseract()
+
+
+class PoolMotoresOCR:
+    """
+    Pool de motores de OCR de longa duração.
+
+    Os motores são criados sob demanda até ``tamanho`` e reutilizados entre
+    páginas e documentos do mesmo processo.
+    """
+
+    def __init__(self, tamanho: int = OCR_MOTORES_POR_PROCESSO, backend: str = OCR_BACKEND):
+        self.tamanho = max(1, tamanho)
+        self.backend = backend
+        self.livres = queue.Queue()
+        self.criados = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def motor(self):
+        """Empresta um motor do pool, devolvendo-o ao final do bloco ``with``."""
+        try:
+            motor = self.livres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                criar = self.criados < self.tamanho
+                if criar:
+                    self.criados += 1
+
+            if criar:
+                motor = criar_motor(self.backend)
+                log.debug("Motor de OCR criado: <azul>%s</azul>", motor.nome)
+            else:
+                motor = self.livres.get()
+
+        try:
+            yield motor
+        finally:
+            self.livres.put(motor)
+
+    def fechar(self):
+        while not self.livres.empty():
+            self.livres.get_nowait().fechar()
+            self.criados -= 1
+
+
+_pool: Optional[PoolMotoresOCR] = None
+
+
+def obter_pool_ocr() -> PoolMotoresOCR:
+    """Retorna o pool de motores do processo atual, criando-o no primeiro uso."""
+    global _pool
+    if _pool is None:
+        _pool = PoolMotoresOCR()
+    return _pool
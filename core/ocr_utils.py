@@ -1,34 +1,66 @@
+import json
 import os
-import pytesseract
+import re
+import shutil
+import signal
+import sys
 
-from typing import Tuple, Optional, List, LiteralString
-
-from PIL import ImageEnhance
-from pdf2image import convert_from_path, pdf2image
+from typing import Callable, Tuple, Optional, List, Dict, Iterator, LiteralString, Set, TYPE_CHECKING
 
 from config import (
-    OCR_CONFIG,
-    OCR_LANG,
+    DEPENDENCIAS_CACHE_PATH,
     OCR_DPI_OPTIONS,
+    OCR_MEMORIA_MAX_MB,
+    OCR_FATOR_MEMORIA,
+    OCR_JANELA_MAX_PAGINAS,
+    OCR_ROI_ATIVO,
     POPPLER_PATHS,
     TESSERACT_PATHS,
-    TESSDATA_PATHS, colorize_terminal
+    TESSDATA_PATHS
+)
+from core.controle import ControleExecucao, instalar, verificar_cancelamento
+from core.layout import detectar_regioes
+from core.log import inicializar_log_processo, obter_logger
+from core.metricas import contar, medir
+from core.ocr_engines import (
+    MotorTesserocr,
+    definir_tesseract_cmd,
+    importar_pytesseract,
+    obter_pool_ocr,
+    obter_tesseract_cmd
 )
 
-def check_dependencies() -> Tuple[List[str], Optional[str]]:
+# pdf2image, PIL e NumPy (core.preprocessamento) são importados no primeiro
+# OCR: a abertura do programa e a verificação das dependências não dependem deles
+if TYPE_CHECKING:
+    from PIL import Image
+
+log = obter_logger(__name__)
+
+
+class OCRIndisponivel(RuntimeError):
+    """O Poppler ou o Tesseract não estão instalados: nenhuma página pode passar pelo OCR."""
+
+
+def check_dependencies(tesseract: Optional[str] = None, poppler: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
     """Verifica e configura as dependências do sistema (Tesseract e Poppler).
 
+    Args:
+        tesseract: Executável do Tesseract, testado antes dos caminhos padrão
+        poppler: Pasta dos binários do Poppler, testada antes dos caminhos padrão
+
     Returns:
         Tuple[List[str], Optional[str]]:
             - Lista de mensagens de erro (vazia se tudo estiver OK)
-            - Caminho do Poppler configurado (None se não encontrado)
+            - Caminho do Poppler configurado (None se não encontrado ou se
+              os binários estão no PATH)
     """
     errors = []
     poppler_path = None
 
     # Configura Tesseract
     try:
-        configurar_tesseract()
+        configurar_tesseract(tesseract)
     except FileNotFoundError as e:
         errors.append(f"Erro no Tesseract: {e}")
     except RuntimeError as e:
@@ -38,10 +70,7 @@ def check_dependencies() -> Tuple[List[str], Optional[str]]:
 
     # Configura Poppler
     try:
-        configurar_poppler()
-        poppler_path = os.environ.get('POPPLER_PATH')
-        if not poppler_path:
-            errors.append("POPPLER_PATH foi configurado mas está vazio")
+        poppler_path = configurar_poppler(poppler)
     except FileNotFoundError as e:
         errors.append(f"Erro no Poppler: {e}")
     except Exception as e:
@@ -50,80 +79,267 @@ def check_dependencies() -> Tuple[List[str], Optional[str]]:
     return errors, poppler_path
 
 
-def configurar_tesseract():
+def configurar_tesseract(caminho: Optional[str] = None):
     """Configura o caminho do Tesseract OCR e verifica se está funcionando.
 
+    Testa ``caminho`` (se informado), os caminhos de TESSERACT_PATHS e, por
+    último, o ``tesseract`` do PATH (instalação pelo gerenciador de pacotes
+    no Linux).
+
+    O executável, a pasta tessdata e a versão encontrados são guardados em
+    DEPENDENCIAS_CACHE_PATH; nas próximas aberturas são reaproveitados sem
+    listar a tessdata nem executar ``tesseract --version``, enquanto o mtime
+    do executável e da pasta não mudar.
+
     Raises:
         FileNotFoundError: Se o Tesseract ou arquivos *.traineddata não forem encontrados.
         RuntimeError: Se o Tesseract não puder ser inicializado.
     """
+    sondagem = _carregar_sondagem()
+    candidatos = [path for path in [caminho, *TESSERACT_PATHS, shutil.which("tesseract")] if path]
+
     # Configura caminho do Tesseract
-    for path in TESSERACT_PATHS:
-        if os.path.exists(path):
-            pytesseract.pytesseract.tesseract_cmd = path
-            break
-    else:
-        raise FileNotFoundError(
-            f"Tesseract não encontrado. Paths testados: {TESSERACT_PATHS}"
-        )
+    tesseract = _entrada_valida(sondagem, "tesseract", candidatos, os.path.exists)
+    if tesseract is None:
+        for path in candidatos:
+            if os.path.exists(path):
+                tesseract = _nova_entrada(path, candidatos)
+                break
+        else:
+            raise FileNotFoundError(
+                f"Tesseract não encontrado. Paths testados: {candidatos} (e o PATH)"
+            )
+    definir_tesseract_cmd(tesseract["caminho"])
 
     # Configura caminho dos dados treinados
-    for path in TESSDATA_PATHS:
-        if path and os.path.isdir(path):
+    tessdata = _entrada_valida(sondagem, "tessdata", TESSDATA_PATHS, _tem_traineddata)
+    if tessdata is None:
+        for path in TESSDATA_PATHS:
             # Verifica se há pelo menos um arquivo '.traineddata'
-            traineddata_files = [
-                f for f in os.listdir(path) if f.endswith(".traineddata")
-            ]
-            if traineddata_files:
-                os.environ["TESSDATA_PREFIX"] = path
+            if _tem_traineddata(path):
+                tessdata = _nova_entrada(path, TESSDATA_PATHS)
                 break
-    else:
-        raise FileNotFoundError(
-            f"Nenhum arquivo .traineddata encontrado. Paths testados: {TESSDATA_PATHS}"
-        )
+        else:
+            raise FileNotFoundError(
+                f"Nenhum arquivo .traineddata encontrado. Paths testados: {TESSDATA_PATHS}"
+            )
+    os.environ["TESSDATA_PREFIX"] = tessdata["caminho"]
 
     # Valida instalação
+    if "versao" not in tesseract:
+        try:
+            tesseract["versao"] = str(importar_pytesseract().get_tesseract_version())
+        except Exception as e:
+            raise RuntimeError(f"Erro ao validar Tesseract: {e}")
+
+    if sondagem.get("tesseract") != tesseract or sondagem.get("tessdata") != tessdata:
+        _gravar_sondagem({**sondagem, "tesseract": tesseract, "tessdata": tessdata})
+    log.debug("Tesseract %s: %s (tessdata: %s)", tesseract["versao"], tesseract["caminho"], tessdata["caminho"])
+
+
+def _tem_traineddata(path: str) -> bool:
+    return bool(path) and os.path.isdir(path) and any(f.endswith(".traineddata") for f in os.listdir(path))
+
+
+def _mtime(path: str) -> Optional[int]:
     try:
-        pytesseract.get_tesseract_version()
-    except Exception as e:
-        raise RuntimeError(f"Erro ao validar Tesseract: {e}")
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _nova_entrada(path: str, candidatos: List[str]) -> Dict:
+    return {"caminho": path, "mtime_ns": _mtime(path), "candidatos": list(candidatos)}
 
 
-def configurar_poppler():
+def _entrada_valida(sondagem: Dict, chave: str, candidatos: List[str], encontrado: Callable[[str], bool]) -> Optional[Dict]:
+    """
+    Entrada da sondagem anterior, se ainda vale.
+
+    Vale quando a lista de candidatos é a mesma, o caminho escolhido tem o
+    mesmo mtime (um executável atualizado ou modelos adicionados/removidos
+    o alteram) e nenhum candidato de maior prioridade passou a existir.
+    """
+    entrada = sondagem.get(chave)
+    if (not isinstance(entrada, dict)
+            or entrada.get("candidatos") != list(candidatos)
+            or entrada.get("caminho") not in candidatos
+            or entrada.get("mtime_ns") is None
+            or _mtime(entrada["caminho"]) != entrada["mtime_ns"]):
+        return None
+
+    anteriores = candidatos[:candidatos.index(entrada["caminho"])]
+    if any(encontrado(path) for path in anteriores):
+        return None
+    return dict(entrada)
+
+
+def _carregar_sondagem() -> Dict:
+    try:
+        with open(DEPENDENCIAS_CACHE_PATH, encoding="utf-8") as arquivo:
+            sondagem = json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+    return sondagem if isinstance(sondagem, dict) else {}
+
+
+def _gravar_sondagem(sondagem: Dict):
+    temporario = f"{DEPENDENCIAS_CACHE_PATH}.tmp"
+    try:
+        os.makedirs(os.path.dirname(DEPENDENCIAS_CACHE_PATH), exist_ok=True)
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(sondagem, arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, DEPENDENCIAS_CACHE_PATH)
+    except OSError as e:
+        # Sem o cache, a próxima abertura apenas repete a verificação
+        log.debug("Não foi possível gravar %s: %s", DEPENDENCIAS_CACHE_PATH, e)
+
+
+def inicializar_worker_ocr(
+        tesseract_cmd: str,
+        fila_log=None,
+        nivel_log: Optional[int] = None,
+        controle: Optional[ControleExecucao] = None
+):
+    """Inicializador dos processos do pool de extração.
+
+    No Windows os workers são criados por *spawn* e não herdam o
+    ``tesseract_cmd`` configurado em ``configurar_tesseract``; as variáveis de
+    ambiente (POPPLER_PATH, TESSDATA_PREFIX) já são herdadas.
+
+    Args:
+        tesseract_cmd: Caminho do executável do Tesseract do processo pai
+        fila_log: Fila de core.log.encaminhar_processos; os registros do
+            worker seguem por ela para os destinos do processo pai
+        nivel_log: Nível de log do processo pai
+        controle: Pausa/cancelamento da execução, verificado entre páginas e passadas de OCR
+    """
+    definir_tesseract_cmd(tesseract_cmd)
+    if fila_log is not None:
+        inicializar_log_processo(fila_log, nivel_log)
+    instalar(controle)
+    if controle is not None:
+        # O Ctrl+C chega a todo o grupo de processos: quem cancela é o processo
+        # principal, pelo controle, e o worker para no próximo ponto de verificação
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def configurar_poppler(caminho: Optional[str] = None) -> Optional[str]:
     """Configura o caminho do Poppler e retorna o path configurado.
 
+    Testa ``caminho`` (se informado), a variável POPPLER_PATH e os caminhos
+    de POPPLER_PATHS; a pasta escolhida fica em POPPLER_PATH, herdada pelos
+    processos de extração. Sem nenhuma delas, vale o ``pdftoppm`` do PATH
+    (poppler-utils no Linux).
+
+    Args:
+        caminho: Pasta dos binários do Poppler (ou o próprio pdftoppm)
+
     Returns:
-        str: Caminho do Poppler configurado.
+        Optional[str]: Caminho do Poppler configurado, ou None se os binários
+        forem usados a partir do PATH.
 
     Raises:
         FileNotFoundError: Se o Poppler não for encontrado.
     """
-    if "POPPLER_PATH" in os.environ and os.path.exists(os.environ["POPPLER_PATH"]):
-        return os.environ["POPPLER_PATH"]
+    if caminho and os.path.isfile(caminho):
+        caminho = os.path.dirname(caminho)
 
-    # Testa os caminhos padrão
-    for path in POPPLER_PATHS:
-        if path and os.path.exists(path):
+    for path in (caminho, os.environ.get("POPPLER_PATH"), *POPPLER_PATHS):
+        if path and _tem_pdftoppm(path):
             os.environ["POPPLER_PATH"] = path
             return path
 
+    # Um POPPLER_PATH inválido não pode esconder o Poppler do PATH
+    os.environ.pop("POPPLER_PATH", None)
+    if shutil.which("pdftoppm"):
+        return None
+
     raise FileNotFoundError(
-        f"Poppler não encontrado. Paths testados: {POPPLER_PATHS}\n"
-        "Baixe o Poppler em: https://github.com/oschwartz10612/poppler-windows/releases"
+        f"Poppler não encontrado. Paths testados: {[path for path in (caminho, *POPPLER_PATHS) if path]} (e o PATH)\n"
+        "No Linux, instale o pacote poppler-utils; no Windows, baixe o Poppler em: "
+        "https://github.com/oschwartz10612/poppler-windows/releases"
     )
 
 
-def extrair_texto_ocr(filepath: str, dpi: int = OCR_DPI_OPTIONS['inicial']) -> None | LiteralString | str:
+def _tem_pdftoppm(path: str) -> bool:
+    """Se a pasta contém o pdftoppm do sistema atual (ignora a pasta do Windows no Linux e vice-versa)."""
+    return os.path.isfile(os.path.join(path, "pdftoppm.exe" if os.name == "nt" else "pdftoppm"))
+
+
+def caminho_poppler() -> Optional[str]:
+    """
+    Poppler a usar na renderização: a pasta configurada em POPPLER_PATH ou
+    None para o do PATH.
+
+    Raises:
+        OCRIndisponivel: Se o Poppler não está em nenhum dos dois
+    """
+    poppler_path = os.environ.get("POPPLER_PATH")
+    if poppler_path and _tem_pdftoppm(poppler_path):
+        return poppler_path
+    if shutil.which("pdftoppm"):
+        return None
+    raise OCRIndisponivel("Poppler não encontrado (POPPLER_PATH ou pdftoppm no PATH)")
+
+
+def extrair_texto_ocr(
+        filepath: str,
+        dpi: int = OCR_DPI_OPTIONS['inicial'],
+        paginas: Optional[List[int]] = None
+) -> None | LiteralString | str:
     """
     Extrai texto de um arquivo (PDF/imagem) usando OCR.
 
     Args:
         filepath: Caminho do arquivo a ser processado
         dpi: Resolução para processamento (valor entre 'inicial' e 'max' de OCR_DPI_OPTIONS)
+        paginas: Números das páginas (base 1) a processar; None processa todas
 
     Returns:
         Texto extraído ou string vazia em caso de falha
     """
+    textos = extrair_textos_ocr_por_pagina(filepath, dpi, paginas)
+    return "\n".join(filter(None, textos.values()))
+
+
+def extrair_textos_ocr_por_pagina(
+        filepath: str,
+        dpi: int = OCR_DPI_OPTIONS['inicial'],
+        paginas: Optional[List[int]] = None,
+        validar_regioes: Optional[Callable[[str, bool], bool]] = None,
+        paginas_sem_regioes: Optional[Set[int]] = None,
+        custo: Optional[Dict[str, int]] = None
+) -> Dict[int, str]:
+    """
+    Extrai o texto de cada página de um arquivo usando OCR.
+
+    Args:
+        filepath: Caminho do arquivo a ser processado
+        dpi: Resolução para processamento (valor entre 'inicial' e 'max' de OCR_DPI_OPTIONS)
+        paginas: Números das páginas (base 1) a processar; None processa todas
+        validar_regioes: Se informado (e as regiões estão ativas para o motor,
+            ver usar_regioes), processa apenas as regiões
+            detectadas e usa a página inteira quando o texto delas não for válido;
+            recebe o texto das regiões e se o bloco de serviços foi detectado
+        paginas_sem_regioes: Páginas processadas inteiras, sem a detecção de regiões
+            (as que já falharam nas regiões em um DPI anterior)
+        custo: Se informado, soma as páginas renderizadas em 'renderizacoes' e
+            cada chamada ao motor (reconhecer, palavras) em 'ocr'
+
+    Returns:
+        Dicionário {número da página: texto}, vazio em caso de falha
+
+    Raises:
+        OCRIndisponivel: Se o Poppler ou o Tesseract não estão instalados;
+            nenhum outro DPI ou página teria resultado diferente
+    """
+    from pdf2image.exceptions import PDFPageCountError
+    from core.preprocessamento import preprocessar
+
+    # Configurações do Poppler (pasta configurada ou PATH)
+    poppler_path = caminho_poppler()
+
     try:
         # Validação inicial
         if not os.path.exists(filepath):
@@ -132,62 +348,191 @@ def extrair_texto_ocr(filepath: str, dpi: int = OCR_DPI_OPTIONS['inicial']) -> N
         # Garante que o DPI está dentro dos limites
         dpi_efetivo = min(max(dpi, OCR_DPI_OPTIONS['inicial']), OCR_DPI_OPTIONS['max'])
 
-        # Configurações do Poppler
-        poppler_path = os.environ.get('POPPLER_PATH')
-        if not poppler_path:
-            raise RuntimeError("Caminho do Poppler não configurado")
-
         # Processamento do PDF/Imagem
-        print(colorize_terminal(
-            f"[<roxo>DEBUG</roxo>] {f'Tentando: Extração por OCR com {dpi} DPI'}")
-        )
-        imagens = convert_from_path(
-            filepath,
-            poppler_path=poppler_path,
-            dpi=dpi_efetivo,
-            grayscale=True,
-            fmt='png',
-            thread_count=min(2, os.cpu_count() or 1),  # Limita a 2 threads, mas considera CPUs disponíveis
-            strict=True  # Para tratar erros no PDF
-        )
-
-        texto_total = []
-
-        for img in imagens:
-            try:
-                # Pré-processamento da imagem
-                img = (
-                    img.convert('L')
-                    .point(lambda x: 0 if x < 180 else 255)
-                )
+        log.debug("Tentando: Extração por OCR com %d DPI%s", dpi, f" nas páginas {paginas}" if paginas else "")
 
-                # Aplica contraste
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(1.5)
+        textos = {}
+        for num_pagina, img in renderizar_paginas(filepath, dpi_efetivo, paginas, poppler_path, custo):
+            verificar_cancelamento()
 
-                # OCR
-                texto = pytesseract.image_to_string(
-                    img,
-                    lang=OCR_LANG,
-                    config=OCR_CONFIG
-                )
+            # Pré-processamento da imagem (perfil OCR_PERFIL)
+            with medir("preprocessamento"):
+                processada = preprocessar(img)
 
-                texto_total.append(texto.strip())
+            try:
+                # OCR com um motor persistente do pool do processo
+                with medir(f"ocr[{dpi_efetivo}dpi]"), obter_pool_ocr().motor() as motor:
+                    if custo is not None:
+                        motor = _MotorContado(motor, custo)
+                    texto = None
+                    if (validar_regioes is not None and usar_regioes(motor)
+                            and num_pagina not in (paginas_sem_regioes or ())):
+                        texto = _ocr_regioes(processada, dpi_efetivo, motor, validar_regioes)
+                    if texto is None:
+                        texto = motor.reconhecer(processada)
+
+                textos[num_pagina] = texto.strip()
+                contar("paginas_ocr")
 
             finally:
-                img.close()  # liberação de recursos
+                processada.close()  # liberação de recursos
 
-        print(colorize_terminal(f"[<roxo>DEBUG</roxo>] [<verde>SUCESSO</verde>] Texto extraído por OCR"))
-        return "\n".join(filter(None, texto_total))
+        log.debug("[<verde>SUCESSO</verde>] Texto extraído por OCR")
+        return textos
 
-    except pdf2image.exceptions.PDFPageCountError:
+    except PDFPageCountError:
         error_msg = "O arquivo PDF está corrompido ou vazio"
     except PermissionError:
         error_msg = "Sem permissão para acessar o arquivo"
     except Exception as e:
+        if _tesseract_ausente(e):
+            raise OCRIndisponivel(f"Tesseract não encontrado: {e}") from e
         error_msg = f"Erro no processamento OCR: {str(e)}"
 
-    print(colorize_terminal(f"[<vermelho>FALHA</vermelho>] Texto extraído por OCR\n{error_msg}"))
-    return ""
+    log.error("Falha no OCR de %s: %s", os.path.basename(filepath), error_msg)
+    return {}
 
 
+def _tesseract_ausente(erro: Exception) -> bool:
+    """Se a falha do OCR é o executável do Tesseract ausente (pytesseract)."""
+    pytesseract = sys.modules.get("pytesseract")
+    return pytesseract is not None and isinstance(erro, pytesseract.TesseractNotFoundError)
+
+
+def usar_regioes(motor) -> bool:
+    """
+    Se o OCR por regiões vale para o motor: com OCR_ROI_ATIVO "auto", só com
+    o tesserocr, em que a detecção e os recortes não abrem um processo cada.
+    """
+    if OCR_ROI_ATIVO == "auto":
+        return motor.nome == MotorTesserocr.nome
+    return bool(OCR_ROI_ATIVO)
+
+
+class _MotorContado:
+    """Repassa as chamadas a um motor do pool, somando cada passada de OCR em custo['ocr']."""
+
+    def __init__(self, motor, custo: Dict[str, int]):
+        self.motor = motor
+        self.custo = custo
+        self.nome = motor.nome
+
+    def reconhecer(self, img) -> str:
+        self.custo['ocr'] += 1
+        return self.motor.reconhecer(img)
+
+    def palavras(self, img) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        self.custo['ocr'] += 1
+        return self.motor.palavras(img)
+
+
+def _ocr_regioes(img, dpi: int, motor, validar: Callable[[str, bool], bool]) -> Optional[str]:
+    """OCR apenas das regiões detectadas; None quando a página inteira deve ser processada."""
+    try:
+        faixas, servicos = detectar_regioes(img, dpi, motor)
+    except Exception as e:
+        log.warning("Falha na detecção de regiões: %s", e)
+        return None
+
+    if not faixas:
+        return None
+
+    textos = []
+    for topo, base in faixas:
+        recorte = img.crop((0, topo, img.width, base))
+        try:
+            textos.append(motor.reconhecer(recorte).strip())
+        finally:
+            recorte.close()
+
+    texto = "\n".join(filter(None, textos))
+    if not validar(texto, servicos):
+        log.debug("Regiões sem dados válidos, usando página inteira")
+        return None
+
+    return texto
+
+
+def renderizar_paginas(
+        filepath: str,
+        dpi: int,
+        paginas: Optional[List[int]],
+        poppler_path: Optional[str],
+        custo: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[int, "Image.Image"]]:
+    """
+    Renderiza as páginas de um PDF em janelas pequenas, uma imagem por vez.
+
+    O tamanho da janela é calculado a partir de OCR_MEMORIA_MAX_MB, de modo
+    que o pico de memória não depende da quantidade de páginas do documento.
+    Cada imagem é fechada assim que o consumidor solicita a próxima.
+
+    Args:
+        filepath: Caminho do PDF
+        dpi: Resolução de renderização
+        paginas: Números das páginas (base 1); None renderiza todas
+        poppler_path: Diretório dos binários do Poppler (None: os do PATH)
+        custo: Se informado, soma em custo['renderizacoes'] as páginas renderizadas
+
+    Returns:
+        Iterador de (número da página, imagem)
+    """
+    from pdf2image import convert_from_path, pdfinfo_from_path
+
+    with medir("rasterizacao"):
+        info = pdfinfo_from_path(filepath, poppler_path=poppler_path)
+    if paginas is None:
+        paginas = list(range(1, info["Pages"] + 1))
+
+    janela = _tamanho_janela(dpi, info.get("Page size", ""))
+
+    for primeira, ultima in _agrupar_intervalos(paginas):
+        for inicio in range(primeira, ultima + 1, janela):
+            fim = min(inicio + janela - 1, ultima)
+            with medir("rasterizacao"):
+                imagens = convert_from_path(
+                    filepath,
+                    poppler_path=poppler_path,
+                    dpi=dpi,
+                    first_page=inicio,
+                    last_page=fim,
+                    grayscale=True,
+                    fmt='png',
+                    thread_count=min(2, os.cpu_count() or 1),  # Limita a 2 threads, mas considera CPUs disponíveis
+                    strict=True  # Para tratar erros no PDF
+                )
+            contar("paginas_rasterizadas", len(imagens))
+            if custo is not None:
+                custo['renderizacoes'] += len(imagens)
+
+            while imagens:
+                img = imagens.pop(0)
+                try:
+                    yield inicio, img
+                finally:
+                    img.close()
+                inicio += 1
+
+
+def _tamanho_janela(dpi: int, tamanho_pagina: str) -> int:
+    """Quantidade de páginas renderizadas por vez que cabe em OCR_MEMORIA_MAX_MB."""
+    # "Page size" do pdfinfo: "595.276 x 841.89 pts (A4)"; assume A4 se ausente
+    medidas = re.findall(r"[\d.]+", tamanho_pagina)[:2]
+    largura_pts, altura_pts = (float(m) for m in medidas) if len(medidas) == 2 else (595.0, 842.0)
+
+    # Imagem em tons de cinza: 1 byte por pixel
+    bytes_pagina = (largura_pts / 72 * dpi) * (altura_pts / 72 * dpi)
+    bytes_disponiveis = OCR_MEMORIA_MAX_MB * 1024 * 1024 / OCR_FATOR_MEMORIA
+
+    return max(1, min(OCR_JANELA_MAX_PAGINAS, int(bytes_disponiveis // bytes_pagina)))
+
+
+def _agrupar_intervalos(paginas: List[int]) -> List[Tuple[int, int]]:
+    """Agrupa números de página em intervalos contíguos: [1, 2, 3, 7] -> [(1, 3), (7, 7)]."""
+    intervalos = []
+    for pagina in sorted(set(paginas)):
+        if intervalos and pagina == intervalos[-1][1] + 1:
+            intervalos[-1] = (intervalos[-1][0], pagina)
+        else:
+            intervalos.append((pagina, pagina))
+    return intervalos
@@ -0,0 +1,207 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from config import PIPELINE_FLUSH_DOCUMENTOS, PIPELINE_FLUSH_SEGUNDOS
+from core.log import obter_logger
+
+log = obter_logger(__name__)
+
+# Marca de fim da fila de uma etapa
+_FIM = object()
+
+
+class _ErroEtapa:
+    """Exceção do produtor, repassada ao consumidor pela fila."""
+
+    def __init__(self, erro: BaseException):
+        self.erro = erro
+
+
+def _colocar(fila: queue.Queue, parar: threading.Event, item) -> bool:
+    """Coloca item na fila, esperando enquanto estiver cheia; False se o consumidor parou."""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def em_thread(itens: Iterable, tamanho_fila: int, nome: str = "etapa") -> Iterator:
+    """
+    Executa ``itens`` como uma etapa do pipeline, em uma thread produtora.
+
+    Os itens passam por uma fila limitada: quando o consumidor atrasa, o
+    produtor fica bloqueado em vez de acumular resultados na memória. Uma
+    exceção do produtor é relançada no consumidor. Ao encerrar (fim, break,
+    exceção, close), ``itens`` é fechado na thread produtora e o consumidor
+    espera por ela, como em intercalar: o item em andamento (ex.: a extração
+    de um PDF) já terminou quando ele segue. Por isso o produtor não pode
+    ficar bloqueado indefinidamente depois que o consumidor parar.
+
+    Args:
+        itens: Iterável consumido na thread produtora
+        tamanho_fila: Quantidade máxima de itens aguardando o consumidor
+        nome: Nome da thread, para depuração
+
+    Returns:
+        Iterador com os mesmos itens, na mesma ordem
+    """
+    fila = queue.Queue(maxsize=max(1, tamanho_fila))
+    parar = threading.Event()
+
+    def colocar(item) -> bool:
+        return _colocar(fila, parar, item)
+
+    def produzir():
+        try:
+            for item in itens:
+                if not colocar(item):
+                    break
+        except BaseException as e:
+            colocar(_ErroEtapa(e))
+        finally:
+            try:
+                fechar = getattr(itens, "close", None)
+                if fechar is not None:
+                    fechar()
+            finally:
+                colocar(_FIM)
+
+    thread = threading.Thread(target=produzir, name=f"pipeline-{nome}", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                return
+            if isinstance(item, _ErroEtapa):
+                raise item.erro
+            yield item
+    finally:
+        parar.set()
+        thread.join()
+
+
+def intercalar(fontes: Iterable[Iterable], tamanho_fila: int, nome: str = "etapa") -> Iterator:
+    """
+    Junta várias etapas em uma, entregando os itens na ordem em que ficam prontos.
+
+    Cada fonte é consumida em uma thread própria e mantém a sua ordem; entre
+    fontes, uma fonte lenta não atrasa as demais. Uma exceção de qualquer
+    fonte é relançada no consumidor. Ao encerrar (fim, break, exceção), cada
+    fonte é fechada na própria thread e o consumidor espera por elas, de modo
+    que os recursos das fontes (ex.: um pool de processos) já foram liberados
+    quando ele segue. Por isso uma fonte não pode ficar bloqueada
+    indefinidamente depois que o consumidor parar.
+
+    Args:
+        fontes: Iteráveis consumidos em paralelo
+        tamanho_fila: Quantidade máxima de itens aguardando o consumidor
+        nome: Prefixo do nome das threads, para depuração
+
+    Returns:
+        Iterador com os itens de todas as fontes
+    """
+    fila = queue.Queue(maxsize=max(1, tamanho_fila))
+    parar = threading.Event()
+
+    def produzir(itens):
+        try:
+            for item in itens:
+                if not _colocar(fila, parar, item):
+                    break
+        except BaseException as e:
+            _colocar(fila, parar, _ErroEtapa(e))
+        finally:
+            try:
+                fechar = getattr(itens, "close", None)
+                if fechar is not None:
+                    fechar()
+            finally:
+                _colocar(fila, parar, _FIM)
+
+    threads = [
+        threading.Thread(target=produzir, args=(fonte,), name=f"pipeline-{nome}-{indice}", daemon=True)
+        for indice, fonte in enumerate(fontes)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        ativas = len(threads)
+        while ativas:
+            item = fila.get()
+            if item is _FIM:
+                ativas -= 1
+            elif isinstance(item, _ErroEtapa):
+                raise item.erro
+            else:
+                yield item
+    finally:
+        parar.set()
+        for thread in threads:
+            thread.join()
+
+
+class GravacaoPeriodica:
+    """
+    Escritor único do pipeline: acumula as linhas por PO e as grava em lotes.
+
+    A gravação acontece a cada ``documentos`` documentos ou ``segundos``
+    segundos (o que vier primeiro), e no fim da execução. As ações registradas
+    junto com um documento (ex.: mover o PDF) só rodam depois que as linhas
+    dele foram gravadas, para que um arquivo movido sempre tenha seus dados na
+    saída.
+    """
+
+    def __init__(
+            self,
+            gravar: Callable[[Dict[str, List[Dict]]], None],
+            documentos: int = PIPELINE_FLUSH_DOCUMENTOS,
+            segundos: float = PIPELINE_FLUSH_SEGUNDOS
+    ):
+        self.gravar = gravar
+        self.documentos = max(1, documentos)
+        self.segundos = segundos
+
+        self.dados_por_po = {}
+        self.pendencias = []
+        self.documentos_pendentes = 0
+        self.ultima_gravacao = time.monotonic()
+
+        self.linhas_gravadas = 0
+        self.gravacoes = 0
+
+    def adicionar(self, linhas_por_po: Dict[str, List[Dict]], apos_gravar: Optional[Callable[[], None]] = None):
+        """Registra o resultado de um documento e grava se o lote venceu."""
+        for po, linhas in linhas_por_po.items():
+            self.dados_por_po.setdefault(po, []).extend(linhas)
+        if apos_gravar:
+            self.pendencias.append(apos_gravar)
+        self.documentos_pendentes += 1
+
+        if (self.documentos_pendentes >= self.documentos
+                or time.monotonic() - self.ultima_gravacao >= self.segundos):
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava o lote atual e executa as ações pendentes dos documentos gravados."""
+        dados, self.dados_por_po = self.dados_por_po, {}
+        pendencias, self.pendencias = self.pendencias, []
+        documentos, self.documentos_pendentes = self.documentos_pendentes, 0
+        self.ultima_gravacao = time.monotonic()
+
+        if dados:
+            linhas = sum(len(linhas_po) for linhas_po in dados.values())
+            log.debug("Gravando lote: %d documento(s), %d linha(s)", documentos, linhas)
+            self.gravar(dados)
+            self.linhas_gravadas += linhas
+            self.gravacoes += 1
+
+        for acao in pendencias:
+            acao()
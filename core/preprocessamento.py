@@ -0,0 +1,111 @@
+import numpy as np
+from PIL import Image
+
+from config import OCR_PERFIL, OCR_PERFIS_PREPROCESSAMENTO
+
+# Ângulos (graus) avaliados na correção de inclinação
+_ANGULOS_DESKEW = np.arange(-5.0, 5.01, 0.5)
+
+
+def preprocessar(img: Image.Image, perfil: str = OCR_PERFIL) -> Image.Image:
+    """
+    Prepara uma página para o OCR operando sobre um único array NumPy.
+
+    Escala de cinza, contraste e limiarização são funções ponto a ponto e são
+    compostas em uma única operação in-place sobre o array; remoção de ruído e
+    correção de inclinação são opcionais, conforme o perfil.
+
+    Args:
+        img: Página renderizada
+        perfil: Chave de OCR_PERFIS_PREPROCESSAMENTO
+
+    Returns:
+        Nova imagem em modo 'L' pronta para o OCR
+    """
+    config = OCR_PERFIS_PREPROCESSAMENTO[perfil]
+
+    cinza = img if img.mode == 'L' else img.convert('L')
+    pixels = np.array(cinza, dtype=np.uint8)
+    if cinza is not img:
+        cinza.close()
+
+    tabela = _tabela_pontual(pixels, config.get('contraste'), config.get('limiar'))
+    if config.get('limiar') is not None:
+        # Contraste seguido de limiar é monotônico: equivale a um único limiar
+        # sobre o valor original, aplicado com uma comparação em vez da tabela
+        limiar_efetivo = int(np.argmax(tabela == 255)) if tabela[-1] == 255 else 256
+        np.greater_equal(pixels, limiar_efetivo, out=pixels.view(np.bool_))
+        pixels *= 255
+    else:
+        np.take(tabela, pixels, out=pixels)
+
+    if config.get('remover_ruido'):
+        _remover_pixels_isolados(pixels)
+
+    resultado = Image.fromarray(pixels, mode='L')
+
+    if config.get('corrigir_inclinacao'):
+        angulo = estimar_inclinacao(pixels)
+        if angulo:
+            rotacionada = resultado.rotate(angulo, resample=Image.NEAREST, fillcolor=255)
+            resultado.close()
+            resultado = rotacionada
+
+    return resultado
+
+
+def _tabela_pontual(pixels: np.ndarray, contraste: float = None, limiar: int = None) -> np.ndarray:
+    """Compõe contraste e limiar em uma tabela de consulta uint8."""
+    valores = np.arange(256, dtype=np.float32)
+
+    if contraste:
+        # Mesmo cálculo de ImageEnhance.Contrast: interpola a partir da média
+        media = int(pixels.mean() + 0.5)
+        valores = media + (valores - media) * contraste
+        np.clip(valores, 0, 255, out=valores)
+
+    if limiar is not None:
+        valores = np.where(valores < limiar, 0, 255)
+
+    return valores.astype(np.uint8)
+
+
+def _remover_pixels_isolados(pixels: np.ndarray):
+    """Clareia pixels pretos sem vizinhos pretos (ruído sal e pimenta) em uma imagem binarizada."""
+    preto = pixels == 0
+    vizinhos = np.zeros(pixels.shape, dtype=np.uint8)
+    vizinhos[1:, :] += preto[:-1, :]
+    vizinhos[:-1, :] += preto[1:, :]
+    vizinhos[:, 1:] += preto[:, :-1]
+    vizinhos[:, :-1] += preto[:, 1:]
+    pixels[preto & (vizinhos == 0)] = 255
+
+
+def estimar_inclinacao(pixels: np.ndarray, amostras: int = 20000) -> float:
+    """
+    Estima a inclinação do texto pelo perfil de projeção horizontal.
+
+    Args:
+        pixels: Página binarizada (0 = tinta)
+        amostras: Quantidade máxima de pixels de tinta considerados
+
+    Returns:
+        Ângulo em graus que alinha as linhas de texto (0 se indeterminado)
+    """
+    ys, xs = np.nonzero(pixels == 0)
+    if ys.size < 100:
+        return 0.0
+
+    if ys.size > amostras:
+        passo = ys.size // amostras
+        ys, xs = ys[::passo], xs[::passo]
+
+    melhor_angulo, melhor_variancia = 0.0, -1.0
+    for angulo in _ANGULOS_DESKEW:
+        rad = np.deg2rad(angulo)
+        linhas = (ys * np.cos(rad) - xs * np.sin(rad)).astype(np.int32)
+        variancia = np.bincount(linhas - linhas.min()).var()
+        if variancia > melhor_variancia:
+            melhor_angulo, melhor_variancia = float(angulo), variancia
+
+    return melhor_angulo
@@ -1,45 +1,72 @@
+import logging
 import os
-import time
-from typing import Callable, List, Dict
-from config import colorize_terminal
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Set, Sized, Tuple
+from config import (
+    DEFAULT_WORKERS, DEFAULT_FORMATOS_EXPORTACAO, PIPELINE_FILA_ARQUIVOS,
+    PASTA_PROCESSADAS, PASTA_REVISAR, METRICAS_DOCUMENTOS_LENTOS, TRIAGEM_ATIVA, TRIAGEM_WORKERS_TEXTO
+)
+from core.controle import ControleExecucao, ExecucaoCancelada, ativar
+from core.exportadores import exportar
 from core.extrators import extrair_dados
-from core.file_utils import mover_arquivo, salvar_em_xlsx
+from core.diario import DiarioProcessamento, EXPORTADO, EXTRAIDO, MOVIDO, caminho_diario
+from core.log import encaminhar_processos, espelhar, obter_logger
+from core.metricas import MetricasExecucao, coletar
+from core.ocr_utils import inicializar_worker_ocr, obter_tesseract_cmd
+from core.pipeline import GravacaoPeriodica, em_thread, intercalar
+from core.triagem import FAIXAS, OCR, TEXTO, Triagem, triar
 
+log = obter_logger(__name__)
 
-def process_xlsx(
+
+def process_export(
         dados_por_po: Dict[str, List[Dict]],
         xlsx_output_dir: str,
         xlsx_filename: str,
-        log_message: Callable
-):
-    log_message(f"<azul>Gerando Arquivo xlsx... </azul>: {xlsx_filename}")
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] processor.py <- process_xlsx"))
+        log_message: Callable,
+        formatos: List[str] = DEFAULT_FORMATOS_EXPORTACAO,
+        exportadores: Optional[Dict] = None,
+        ao_gravar: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Exporta dados_por_po nos formatos escolhidos, com o nome do XLSX (sem extensão) como base.
+
+    ``exportadores`` e ``ao_gravar`` são repassados a core.exportadores.exportar:
+    process_directory usa o mesmo dicionário de exportadores em todos os lotes
+    da execução e registra no diário cada formato assim que ele é gravado.
+
+    Returns:
+        {formato: caminho gerado, ou None se falhou}; vazio se não havia dados
+    """
+    nome_base = os.path.splitext(xlsx_filename)[0]
+    log_message(f"<azul>Gerando Arquivos ({', '.join(formatos)})... </azul>: {nome_base}")
 
-    # Debug: Check if dados_por_po has content
     if not dados_por_po:
-        print(colorize_terminal("\n[<roxo>DEBUG</roxo>] process_xlsx <- dados_por_po\n"
-                                "[<vermelho>ERRO</vermelho>] Nenhum dado encontrado em dados_por_po\n"))
         log_message("[<vermelho>ERRO</vermelho>] Nenhum dado válido para exportar")
-        return
+        return {}
 
-    # Debug: Show POs found
-    print(colorize_terminal(f"\n[<roxo>DEBUG</roxo>] process_xlsx <- dados_por_po\n"
-                            f"[<verde>OK</verde>] Dados encontrados em dados_por_po com SUCESSO\n"
-                            f"\t-== Sumário ==-"
-                            f"\t\tPOs encontrados: {len(dados_por_po)}"))
-    for po, linhas in dados_por_po.items():
-        print(f"\t\tPO {po}: {len(linhas)} linhas")
-
-    print(colorize_terminal(f"\t-== Descritivo ==-"
-                            f"\t\t{dados_por_po}"))
+    # Apenas o sumário por PO: o conteúdo completo já está nos arquivos gerados
+    log.debug("process_export: <azul>%d</azul> PO(s)", len(dados_por_po))
+    if log.isEnabledFor(logging.DEBUG):
+        for po, linhas in dados_por_po.items():
+            log.debug("\tPO %s: %d linha(s)", po, len(linhas))
 
     try:
-        if salvar_em_xlsx(xlsx_output_dir, dados_por_po, xlsx_filename):
-            log_message(f"[<verde>SUCESSO</verde>] Arquivo {xlsx_filename} gerado...\n\n")
-        else:
-            log_message("[<vermelho>FALHA</vermelho>] Erro ao salvar arquivo XLSX")
+        gerados = exportar(dados_por_po, xlsx_output_dir, nome_base, formatos, log_message, exportadores, ao_gravar)
     except Exception as e:
-        log_message(f"[<vermelho>ERRO</vermelho>] Falha ao gerar XLSX: {str(e)}")
+        log_message(f"[<vermelho>ERRO</vermelho>] Falha ao exportar: {str(e)}")
+        return {formato: None for formato in formatos}
+
+    for formato, caminho in gerados.items():
+        if caminho:
+            log_message(f"[<verde>SUCESSO</verde>] Arquivo {os.path.basename(caminho)} gerado...\n\n")
+        else:
+            log_message(f"[<vermelho>FALHA</vermelho>] Erro ao salvar arquivo {formato.upper()}")
+    return gerados
 
 
 def process_directory(
@@ -50,111 +77,573 @@ def process_directory(
         xlsx_filename: str,
         update_progress: Callable,
         log_message: Callable,
-        batch_size: int = 10
-):
-    log_message("<azul>Iniciando...</azul>")
-
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] processor.py <- process_directory"))
+        batch_size: int = 10,
+        workers: int = DEFAULT_WORKERS,
+        usar_cache: bool = True,
+        formatos: List[str] = DEFAULT_FORMATOS_EXPORTACAO,
+        arquivos: Optional[Iterable[str]] = None,
+        relatorio_metricas: Optional[str] = None,
+        documentos_lentos: int = METRICAS_DOCUMENTOS_LENTOS,
+        controle: Optional[ControleExecucao] = None,
+        triagem: bool = TRIAGEM_ATIVA,
+        workers_texto: Optional[int] = TRIAGEM_WORKERS_TEXTO
+) -> Dict:
+    """
+    Processa os PDFs de base_dir em um pipeline de quatro etapas.
+
+    Descoberta (os.walk) -> extração (process_pdf) -> escritor único (este
+    laço), ligadas por filas. Os resultados chegam na ordem da descoberta. Com
+    ``triagem`` (e ao menos 2 ``workers``), uma etapa de triagem
+    (core.triagem) separa os PDFs com camada de texto dos digitalizados, e os
+    ``workers`` são divididos entre uma faixa de texto e uma de OCR
+    (dividir_workers); um documento digital não espera o OCR dos
+    digitalizados descobertos antes dele, mas os resultados passam a chegar
+    na ordem em que ficam prontos. O escritor grava os resultados em lotes
+    (GravacaoPeriodica) e só move cada PDF depois que suas linhas foram
+    gravadas.
+
+    Cada etapa é registrada no DiarioProcessamento da saída; se a execução
+    anterior foi interrompida, esta retoma de onde ela parou, sem extrair ou
+    exportar de novo o que já tinha sido feito.
+
+    Se ``arquivos`` for informado (ex.: PDFs novos detectados pelo monitor da
+    pasta), apenas eles passam pelo filtro de nomes e são processados, sem
+    percorrer base_dir.
+
+    O tempo de cada etapa (texto do PDF, rasterização, pré-processamento, OCR
+    por DPI, análise, mover, exportar) é somado em MetricasExecucao e exibido
+    no resumo; se ``relatorio_metricas`` for informado (.json ou .csv), os
+    ``documentos_lentos`` documentos mais demorados são gravados nele.
+
+    Com ``controle``, a execução pode ser pausada e cancelada entre
+    documentos, páginas e passadas de OCR, inclusive nos processos do pool.
+    Ao cancelar, o que já foi extraído é gravado e movido normalmente; os
+    documentos interrompidos ficam na pasta e o diário é mantido, para que a
+    próxima execução continue de onde esta parou.
+
+    update_progress e log_message são chamados da thread do escritor; a
+    interface deve apenas publicar os eventos (gui.canal.CanalInterface).
+    ``batch_size`` não é mais usado: a pausa a cada lote, que dava tempo
+    à interface de se atualizar, deixou de ser necessária.
 
-    arquivos_pdf = coletar_arquivos_pdf(
-        base_dir=base_dir,
-        termo_nome=termo_nome,
-        termos_exclusao=termos_exclusao,
-        log_message=log_message,
-    )
+    Returns:
+        Resumo da execução: contadores de process_stats ('sucesso', 'falha',
+        'falhas'), 'arquivos' encontrados, 'linhas_gravadas', 'gravacoes' (lotes),
+        'exportacao' ({formato: caminho, ou None se alguma gravação falhou}),
+        'etapas' ({etapa: {'segundos', 'chamadas'}}), 'contadores' (páginas,
+        escalonamentos de DPI...) e 'cancelado'
+    """
+    log_message = espelhar(log_message)
+    log_message("<azul>Iniciando...</azul>")
 
-    total = len(arquivos_pdf)
+    diario = DiarioProcessamento.abrir(caminho_diario(xlsx_output_dir, xlsx_filename), base_dir)
+    resultados_salvos = diario.resultados_extraidos()
+    if diario.retomando:
+        estados = diario.contagem()
+        log_message(
+            f"[<amarelo>RETOMADA</amarelo>] Execução anterior interrompida: "
+            f"<roxo>{estados[MOVIDO]}</roxo> arquivo(s) concluído(s), "
+            f"<roxo>{estados[EXTRAIDO] + estados[EXPORTADO]}</roxo> já extraído(s)"
+        )
 
-    print(colorize_terminal(
-        f"[<roxo>{total}</roxo>] Arquivos PDFs encontrados"))
+    # Destinos dos arquivos movidos nesta execução (e nas interrompidas), para
+    # que a descoberta, que roda em paralelo, não os encontre de novo
+    movidos = diario.concluidos()
 
-    dados_por_po = {}
     estatisticas = {
         'sucesso': 0,
         'falha': 0,
         'falhas': 0
     }
+    metricas = MetricasExecucao(documentos_lentos)
+
+    # Arquivos com linhas no lote atual: são registrados como exportados todos
+    # juntos, a cada formato gravado e antes de o primeiro deles ser movido
+    no_lote = []
+
+    # Resultado da exportação na execução: {formato: caminho, ou None se algum lote falhou}
+    exportacao = {}
+    # Exportadores reaproveitados por todos os lotes da execução
+    exportadores = {}
+
+    def exportar_lote(dados: Dict[str, List[Dict]], formatos_lote: List[str], arquivos: List[str]) -> Dict[str, Optional[str]]:
+        # Cada formato é registrado para os arquivos do lote assim que é gravado:
+        # uma interrupção durante os formatos seguintes não repete os anteriores
+        gerados = process_export(
+            dados, xlsx_output_dir, xlsx_filename, log_message, formatos_lote, exportadores,
+            ao_gravar=lambda formato, caminho: diario.registrar_exportados(arquivos, [formato])
+        )
+        for formato, caminho in gerados.items():
+            exportacao[formato] = caminho if caminho and exportacao.get(formato, caminho) else None
+        return gerados
+
+    def gravar_lote(dados: Dict[str, List[Dict]]):
+        arquivos, no_lote[:] = list(no_lote), []
+        with metricas.medir("exportar"):
+            exportar_lote(dados, formatos, arquivos)
+
+    escritor = GravacaoPeriodica(gravar_lote)
+
+    def mover(filepath: str, pasta_destino: str, aviso: bool = False):
+        from core.file_utils import mover_arquivo  # openpyxl só é carregado quando há o que gravar
+
+        destino_dir = os.path.join(base_dir, pasta_destino)
+        destino = os.path.join(destino_dir, os.path.basename(filepath))
+        movidos.update((filepath, destino))
+        with metricas.medir("mover"):
+            mover_arquivo(filepath, destino_dir)
+        diario.registrar_movido(filepath, destino)
+
+        if aviso:
+            nome_curto = os.path.basename(filepath)
+            log_message(f"[<amarelo>Aviso</amarelo>] {nome_curto} movido para a pasta: '{destino_dir}'")
+        else:
+            log.debug("Movido para a pasta: '%s'", pasta_destino)
+
+    # Arquivos que a execução interrompida chegou a exportar: completa os
+    # formatos que faltaram e move, sem passar de novo pelo pipeline
+    retomar_exportados(diario, formatos, exportar_lote, mover)
+
+    # Os já movidos (e os que acabaram de ser) são ignorados pela descoberta
+    descoberta = Descoberta(
+        base_dir, termo_nome, termos_exclusao, ignorar=movidos, log_message=log_message,
+        ao_descobrir=diario.registrar_descoberto, arquivos=arquivos
+    )
+
+    if triagem and workers < 2:
+        log.debug("Triagem ignorada: com %d worker(s) não há como dividir as faixas", workers)
+        triagem = False
+
+    if triagem:
+        # Cada faixa entrega os resultados na ordem dos seus arquivos; entre as
+        # faixas, o que ficar pronto primeiro
+        resultados = extrair_por_faixas(
+            descoberta, workers, workers_texto, usar_cache, resultados_salvos, controle, metricas
+        )
+    else:
+        # Os resultados chegam sempre na ordem dos arquivos, independente de qual
+        # worker termina primeiro, garantindo a mesma saída de uma execução serial
+        resultados = extrair_arquivos(descoberta, workers, usar_cache, resultados_salvos, controle)
+    cancelado = False
+
+    # Em caso de interrupção ou cancelamento, o que já foi processado ainda é gravado
+    try:
+        with ativar(controle):
+            try:
+                for global_idx, (filepath, resultado, status_nf, erro, metricas_doc) in enumerate(resultados, 1):
+                    if controle is not None:
+                        controle.verificar()
+
+                    if filepath not in resultados_salvos:
+                        diario.registrar_extraido(filepath, resultado, status_nf, erro)
+                    metricas.adicionar_documento(filepath, status_nf, metricas_doc)
+
+                    # O total cresce enquanto a descoberta ainda percorre as pastas
+                    total = descoberta.total
+                    update_progress(global_idx, total)
+
+                    log_message(
+                        f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] {os.path.basename(filepath)}")
+                    log_message(
+                        f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] <amarelo>Processando...</amarelo>")
+
+                    # Inicio do processamento
+                    try:
+                        if erro is not None:
+                            raise RuntimeError(erro)
+
+                        log.debug("Dados: %s", resultado)
+
+                        # Atualiza contadores estatísticos
+                        if status_nf in estatisticas:
+                            estatisticas[status_nf] += 1
+
+                        if status_nf != "sucesso":
+                            estatisticas["falhas"] += 1
+
+                        # Log resultado do processamento
+                        linhas_por_po = linhas_do_resultado(resultado)
+
+                        status_msg = f'[<verde>{status_nf.upper()}</verde>]' if status_nf == 'sucesso' else f'[<vermelho>{status_nf.upper()}</vermelho>]'
+                        log_message(
+                            f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] {status_msg}")
+
+                        # Mover arquivo para pastas, depois que suas linhas forem gravadas
+                        pasta_destino = PASTA_PROCESSADAS if status_nf == "sucesso" else PASTA_REVISAR
+                        if linhas_por_po:
+                            no_lote.append(filepath)
+                        escritor.adicionar(linhas_por_po, partial(mover, filepath, pasta_destino))
+
+                    except Exception as e:
+                        estatisticas["falhas"] += 1
+                        nome_curto = os.path.basename(filepath)
+
+                        log_message(f"[<vermelho>ERRO</vermelho>] {nome_curto}: {str(e)}")
+
+                        escritor.adicionar({}, partial(mover, filepath, PASTA_REVISAR, aviso=True))
+            finally:
+                # Encerra a extração (e o pool) ainda com o controle ativo: a
+                # extração em série para na próxima verificação de cancelamento
+                # e a thread dela termina antes de process_directory seguir
+                resultados.close()
+    except ExecucaoCancelada:
+        cancelado = True
+        log_message("[<amarelo>AVISO</amarelo>] Cancelado: gravando o que já foi processado...")
+    finally:
+        # A extração já foi encerrada: grava o último lote
+        escritor.descarregar()
+        diario.fechar()
+
+    if cancelado:
+        # Mantém o diário: a próxima execução retoma os documentos que faltaram
+        log_message("<amarelo>Processamento Cancelado</amarelo>")
+    else:
+        # Só uma execução que chegou ao fim descarta o diário
+        diario.concluir()
+        log_message("<azul>Processamento Finalizado...</azul>")
+
+    if not escritor.gravacoes:
+        # Mantém o aviso de "nenhum dado" de process_export
+        process_export({}, xlsx_output_dir, xlsx_filename, log_message, formatos)
+    log.debug("Linhas gravadas: %d em %d lote(s)", escritor.linhas_gravadas, escritor.gravacoes)
+
+    process_stats(estatisticas, log_message, metricas)
+
+    if relatorio_metricas:
+        try:
+            metricas.gravar_relatorio(relatorio_metricas)
+            log_message(f"Relatório de métricas: <azul>{relatorio_metricas}</azul>")
+        except OSError as e:
+            log_message(f"[<vermelho>ERRO</vermelho>] Falha ao gravar o relatório de métricas: {e}")
+
+    return {
+        **estatisticas,
+        'cancelado': cancelado,
+        'arquivos': descoberta.total,
+        'linhas_gravadas': escritor.linhas_gravadas,
+        'gravacoes': escritor.gravacoes,
+        'exportacao': exportacao,
+        **metricas.resumo()
+    }
 
-    for batch_start in range(0, total, batch_size):
-        batch_files = arquivos_pdf[batch_start:batch_start + batch_size]
 
-        for idx, filepath in enumerate(batch_files, 1):
-            global_idx = batch_start + idx
-            update_progress(global_idx, total)
+def linhas_do_resultado(resultado: Optional[Dict]) -> Dict[str, List[Dict]]:
+    """Linhas processadas de um resultado de process_pdf, agrupadas por PO no formato de exportação."""
+    linhas_por_po = {}
+    if isinstance(resultado, dict) and 'linhas' in resultado:
+        for linha in resultado['linhas']:
+            if linha.get('processado'):
+                po = linha["po"]
+                dados = {
+                    'nota': resultado.get('numero_nf'),
+                    'data_emissao': resultado.get('data_nf'),
+                    'linha': linha['linha'],
+                    'descricao': linha['descricao'],
+                    'valor': linha['valor']
+                }
+                linhas_por_po.setdefault(po, []).append(dados)
+    return linhas_por_po
+
+
+def retomar_exportados(
+        diario: DiarioProcessamento,
+        formatos: List[str],
+        exportar_formatos: Callable[[Dict, List[str], List[str]], Dict[str, Optional[str]]],
+        mover: Callable
+):
+    """
+    Conclui os arquivos que uma execução interrompida exportou mas não moveu.
 
-            log_message(
-                f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] {os.path.basename(filepath)}")
-            log_message(
-                f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] <amarelo>Processando...</amarelo>")
+    As linhas de cada arquivo são exportadas apenas nos formatos em que ainda
+    não estão (agrupando os arquivos com os mesmos formatos faltantes);
+    exportar_formatos registra cada formato gravado no diário, e depois o
+    arquivo é movido, como no fim do pipeline.
+    """
+    grupos = {}
+    for filepath, info in diario.exportados_sem_mover().items():
+        faltantes = tuple(formato for formato in formatos if formato not in info.get("formatos", set()))
+        grupos.setdefault(faltantes, []).append((filepath, info))
 
-            print(colorize_terminal(
-                f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] {os.path.basename(filepath)}"))
+    for faltantes, arquivos in grupos.items():
+        dados = {}
+        for filepath, info in arquivos:
+            for po, linhas in linhas_do_resultado(info.get("resultado")).items():
+                dados.setdefault(po, []).extend(linhas)
 
-            # Inicio do processamento
-            try:
-                resultado, status_nf = process_pdf(filepath)
-                print(colorize_terminal(f"\nDados:\n{resultado}"))
+        if dados and faltantes:
+            exportar_formatos(dados, list(faltantes), [filepath for filepath, _ in arquivos])
 
-                # Atualiza contadores estatísticos
-                if status_nf in estatisticas:
-                    estatisticas[status_nf] += 1
+        for filepath, info in arquivos:
+            pasta_destino = PASTA_PROCESSADAS if info.get("status") == "sucesso" else PASTA_REVISAR
+            mover(filepath, pasta_destino)
 
-                if status_nf != "sucesso":
-                    estatisticas["falhas"] += 1
 
-                # Log resultado do processamento
-                if isinstance(resultado, dict) and 'linhas' in resultado:
-                    for linha in resultado['linhas']:
-                        if linha.get('processado'):
-                            po = linha["po"]
-                            dados = {
-                                'nota': resultado.get('numero_nf'),
-                                'data_emissao': resultado.get('data_nf'),
-                                'linha': linha['linha'],
-                                'descricao': linha['descricao'],
-                                'valor': linha['valor']
-                            }
-                            dados_por_po.setdefault(po, []).append(dados)
+class Descoberta:
+    """
+    Etapa de descoberta do pipeline: percorre base_dir (ou filtra a lista
+    ``arquivos``, se informada) em uma thread e entrega os PDFs válidos por uma
+    fila limitada, enquanto a extração já começa.
 
-                status_msg = f'[<verde>{status_nf.upper()}</verde>]' if status_nf == 'sucesso' else f'[<vermelho>{status_nf.upper()}</vermelho>]'
-                log_message(
-                    f"[<azul>{global_idx}</azul>/<roxo>{total}</roxo>] {status_msg}")
+    Attributes:
+        total: Arquivos encontrados até o momento (definitivo ao fim da iteração)
+    """
 
-                print(colorize_terminal(f"Status: '{status_msg}'"))
+    def __init__(
+            self,
+            base_dir: str,
+            termo_nome: str,
+            termos_exclusao: List[str],
+            ignorar: Optional[Set[str]] = None,
+            log_message: Optional[Callable[[str], None]] = None,
+            ao_descobrir: Optional[Callable[[str], None]] = None,
+            tamanho_fila: int = PIPELINE_FILA_ARQUIVOS,
+            arquivos: Optional[Iterable[str]] = None
+    ):
+        self.base_dir = base_dir
+        self.termo_nome = termo_nome
+        self.termos_exclusao = termos_exclusao
+        self.ignorar = ignorar if ignorar is not None else set()
+        self.log_message = log_message
+        self.ao_descobrir = ao_descobrir
+        self.tamanho_fila = tamanho_fila
+        self.arquivos = arquivos
+        self.total = 0
+
+    def _percorrer(self) -> Iterator[str]:
+        if self.log_message:
+            self.log_message("<azul>Buscando arquivos...</azul>")
+
+        if self.arquivos is None:
+            candidatos = iterar_arquivos_pdf(self.base_dir, self.termo_nome, self.termos_exclusao)
+        else:
+            candidatos = (
+                caminho for caminho in self.arquivos
+                if eh_arquivo_pra_processamento(caminho, self.termo_nome, self.termos_exclusao)
+            )
+
+        for caminho in candidatos:
+            if caminho not in self.ignorar:
+                self.total += 1
+                if self.ao_descobrir:
+                    self.ao_descobrir(caminho)
+                yield caminho
+
+        if self.log_message:
+            self.log_message(f"\n<roxo>{self.total}</roxo> <azul>Arquivos encontrados</azul>")
+        else:
+            log.info("<roxo>%d</roxo> Arquivos PDFs encontrados", self.total)
 
-                # Mover arquivo para pastas
-                pasta_destino = "Notas Processadas" if status_nf == "sucesso" else "Precisa Revisar"
-                mover_arquivo(filepath, os.path.join(base_dir, pasta_destino))
+    def __iter__(self) -> Iterator[str]:
+        return em_thread(self._percorrer(), self.tamanho_fila, "descoberta")
 
-                print(f"Movido para a pasta: '{pasta_destino}'\n")
 
-            except Exception as e:
-                estatisticas["falhas"] += 1
-                nome_curto = os.path.basename(filepath)
+def extrair_arquivos(
+        arquivos_pdf: Iterable[str],
+        workers: int = DEFAULT_WORKERS,
+        usar_cache: bool = True,
+        resultados_salvos: Optional[Dict[str, Tuple]] = None,
+        controle: Optional[ControleExecucao] = None
+) -> Iterator[Tuple[str, Optional[Dict], Optional[str], Optional[str], Optional[Dict]]]:
+    """
+    Etapa de extração do pipeline: executa process_pdf sobre os arquivos, em
+    série ou em um pool de processos, em uma thread própria.
 
-                log_message(f"[<vermelho>ERRO</vermelho>] {nome_curto}: {str(e)}")
-                print(colorize_terminal(f"[<vermelho>ERRO</vermelho>] {nome_curto}: {str(e)}"))
+    No pool, cada arquivo é submetido assim que chega e o futuro segue por uma
+    fila limitada (2 x workers): o consumidor recebe os resultados na ordem dos
+    arquivos e a quantidade de extrações adiantadas fica limitada.
 
-                pasta_dest = os.path.join(base_dir, "Precisa Revisar")
-                mover_arquivo(filepath, pasta_dest)
+    Args:
+        arquivos_pdf: Caminhos dos arquivos a processar (lista ou etapa anterior)
+        workers: Quantidade de processos do pool (<= 1 executa em série)
+        usar_cache: Se False, ignora o cache de extração
+        resultados_salvos: {filepath: (resultado, status_nf, erro)} já extraídos
+            (diário de uma execução interrompida), entregues sem nova extração
+            e sem métricas
+        controle: Pausa/cancelamento repassado aos processos do pool (na
+            execução em série, vale o controle ativado por process_directory)
 
-                log_message(f"[<amarelo>Aviso</amarelo>] {nome_curto} movido para a pasta: '{pasta_dest}'")
-                print(colorize_terminal(f"[<amarelo>Aviso</amarelo>] {nome_curto} movido para a pasta: '{pasta_dest}'\n"))
+    Returns:
+        Iterador de (filepath, resultado, status_nf, erro, metricas) na ordem
+        de arquivos_pdf; metricas é MetricasDocumento.para_dict() ou None
+    """
+    resultados_salvos = {filepath: (*salvo, None) for filepath, salvo in (resultados_salvos or {}).items()}
+    workers = max(1, workers or 1)
+    if isinstance(arquivos_pdf, Sized):
+        workers = max(1, min(workers, len(arquivos_pdf)))
+
+    if workers == 1:
+        yield from em_thread(
+            ((filepath, *(resultados_salvos.get(filepath) or _process_pdf_protegido(filepath, usar_cache)))
+             for filepath in arquivos_pdf),
+            tamanho_fila=2, nome="extracao"
+        )
+        return
 
-        if batch_start + batch_size < total:
-            time.sleep(0.5)
+    log.debug("Pool de extração com <azul>%d</azul> processos", workers)
+    with encaminhar_processos() as config_log, ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=inicializar_worker_ocr,
+            initargs=(obter_tesseract_cmd(), *config_log, controle)
+    ) as executor:
+        def submeter(filepath):
+            if filepath in resultados_salvos:
+                return resultados_salvos[filepath]
+            return executor.submit(_process_pdf_protegido, filepath, usar_cache)
+
+        submetidos = em_thread(
+            ((filepath, submeter(filepath)) for filepath in arquivos_pdf),
+            tamanho_fila=2 * workers, nome="extracao"
+        )
+        try:
+            for filepath, saida in submetidos:
+                yield (filepath, *(saida if isinstance(saida, tuple) else saida.result()))
+        finally:
+            # Consumidor parou antes do fim (cancelamento, erro): os pendentes nem começam
+            submetidos.close()
+            executor.shutdown(wait=True, cancel_futures=True)
 
-    log_message("<azul>Processamento Finalizado...</azul>")
-    print(f'Dados de Saida:\n{dados_por_po}')
 
-    process_xlsx(dados_por_po, xlsx_output_dir,xlsx_filename, log_message)
-    process_stats(estatisticas, log_message)
+# Marca de fim da triagem nas filas das faixas
+_FIM_FAIXA = object()
+
+
+class _ErroTriagem:
+    """Exceção da descoberta, repassada às faixas pela fila."""
+
+    def __init__(self, erro: BaseException):
+        self.erro = erro
+
+
+def dividir_workers(workers: int, workers_texto: Optional[int] = TRIAGEM_WORKERS_TEXTO) -> Tuple[int, int]:
+    """
+    Divide os workers da execução entre as faixas de texto e de OCR.
+
+    A faixa de texto fica com ``workers_texto`` (None: um quarto dos workers)
+    e a de OCR com o restante; cada faixa tem ao menos 1 e a soma nunca
+    passa de ``workers`` (no mínimo 2).
+
+    Returns:
+        (workers da faixa de texto, workers da faixa de OCR)
+    """
+    workers = max(2, workers)
+    texto = workers // 4 if workers_texto is None else workers_texto
+    texto = min(max(1, texto), workers - 1)
+    return texto, workers - texto
+
+
+def extrair_por_faixas(
+        arquivos_pdf: Iterable[str],
+        workers: int = DEFAULT_WORKERS,
+        workers_texto: Optional[int] = TRIAGEM_WORKERS_TEXTO,
+        usar_cache: bool = True,
+        resultados_salvos: Optional[Dict[str, Tuple]] = None,
+        controle: Optional[ControleExecucao] = None,
+        metricas: Optional[MetricasExecucao] = None
+) -> Iterator[Tuple[str, Optional[Dict], Optional[str], Optional[str], Optional[Dict]]]:
+    """
+    Etapa de extração com triagem: cada arquivo passa por core.triagem.triar
+    (em uma thread própria) e segue pela faixa de texto ou pela de OCR. Cada
+    faixa é um extrair_arquivos com a sua parte dos ``workers``
+    (dividir_workers), de modo que o OCR, mesmo ocupando todos os seus
+    processos, não atrasa a faixa de texto, e as duas juntas não passam de
+    ``workers``.
+
+    Dentro de uma faixa, os resultados mantêm a ordem dos arquivos; entre as
+    faixas, são entregues na ordem em que ficam prontos. Os arquivos já
+    extraídos (resultados_salvos) não são triados e vão para a faixa de texto.
+
+    Args:
+        arquivos_pdf: Caminhos dos arquivos a processar (lista ou etapa anterior)
+        workers: Processos das duas faixas juntas
+        workers_texto: Quantos deles ficam com a faixa de texto (None: automático)
+        usar_cache, resultados_salvos, controle: Como em extrair_arquivos
+        metricas: Recebe o tempo da triagem e a contagem de documentos por faixa
+
+    Returns:
+        Iterador de (filepath, resultado, status_nf, erro, metricas), como extrair_arquivos
+    """
+    resultados_salvos = resultados_salvos or {}
+    filas = {faixa: queue.Queue() for faixa in FAIXAS}
+    parar = threading.Event()
+
+    def triar_arquivos():
+        arquivos = iter(arquivos_pdf)
+        try:
+            for filepath in arquivos:
+                if parar.is_set():
+                    break
+                if filepath in resultados_salvos:
+                    resultado = Triagem(TEXTO, "já extraído")
+                else:
+                    with metricas.medir("triagem") if metricas is not None else nullcontext():
+                        resultado = triar(filepath)
+                log.debug("Triagem: %s -> %s (%s)", os.path.basename(filepath), resultado.faixa, resultado.motivo)
+                if metricas is not None:
+                    metricas.contar(f"faixa_{resultado.faixa}")
+                filas[resultado.faixa].put(filepath)
+        except BaseException as e:
+            # Erro da descoberta: encerra as duas faixas com ele
+            for fila in filas.values():
+                fila.put(_ErroTriagem(e))
+        finally:
+            fechar = getattr(arquivos, "close", None)
+            if fechar is not None:
+                fechar()
+            for fila in filas.values():
+                fila.put(_FIM_FAIXA)
+
+    def da_fila(fila: queue.Queue) -> Iterator[str]:
+        # Espera os arquivos da triagem até o fim, ou até o consumidor parar
+        while not parar.is_set():
+            try:
+                item = fila.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if item is _FIM_FAIXA:
+                return
+            if isinstance(item, _ErroTriagem):
+                raise item.erro
+            yield item
+
+    threading.Thread(target=triar_arquivos, name="pipeline-triagem", daemon=True).start()
+
+    limites = dict(zip((TEXTO, OCR), dividir_workers(workers, workers_texto)))
+    log.debug("Faixas: <azul>%d</azul> worker(s) de texto, <azul>%d</azul> de OCR", limites[TEXTO], limites[OCR])
+    faixas = intercalar(
+        [extrair_arquivos(da_fila(filas[faixa]), limites[faixa], usar_cache, resultados_salvos, controle)
+         for faixa in FAIXAS],
+        tamanho_fila=2, nome="faixa"
+    )
+    try:
+        for item in faixas:
+            yield item
+    finally:
+        # Libera as faixas que esperam a triagem antes de aguardar o encerramento delas
+        parar.set()
+        faixas.close()
+
+
+def _process_pdf_protegido(
+        filepath: str,
+        usar_cache: bool = True
+) -> Tuple[Optional[Dict], Optional[str], Optional[str], Dict]:
+    """Executa process_pdf devolvendo a exceção como texto, para que uma falha
+    em um worker não interrompa os demais arquivos do pool, junto com as
+    métricas das etapas do documento."""
+    with coletar() as metricas:
+        try:
+            resultado, status_nf = process_pdf(filepath, usar_cache)
+            erro = None
+        except Exception as e:
+            resultado, status_nf, erro = None, None, str(e)
+    return resultado, status_nf, erro, metricas.para_dict()
+
 
 def process_stats(
         estatisticas: Dict,
-        log_message: Callable
+        log_message: Callable,
+        metricas: Optional[MetricasExecucao] = None
 ):
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] processor.py <- process_stats"))
     num_success = estatisticas.get('sucesso', 0)  # Changed 'sucessos' to 'sucesso'
     num_falhas = estatisticas.get('falha', 0)
     num_total = num_success + num_falhas
@@ -169,15 +658,32 @@ def process_stats(
     log_message(
         f"Precisa de Revisão: [<vermelho>{pct_falha:.0f}%</vermelho>] [<vermelho>{num_falhas}</vermelho>/<amarelo>{num_total}</amarelo>]")
 
-    print(colorize_terminal(f'[<roxo>DEBUG</roxo>]<amarelo>=== ESTATÍSTICAS ====</amarelo>'))
-    for key, value in estatisticas.items():
-        print(colorize_terminal(f'[<roxo>DEBUG</roxo>] {key}:{value}'))
+    log.debug("Estatísticas: %s", estatisticas)
 
+    if metricas is None or not metricas.etapas:
+        return
 
-def process_pdf(filepath):
-    print(colorize_terminal(f"[<roxo>DEBUG</roxo>] processor.py <- process_pdf"))
+    # Tempo por etapa, da mais demorada à mais rápida
+    resumo = metricas.resumo()
+    log_message("<amarelo>=== TEMPO POR ETAPA ===</amarelo>")
+    for etapa, medida in resumo['etapas'].items():
+        media_ms = medida['segundos'] / medida['chamadas'] * 1000 if medida['chamadas'] else 0
+        log_message(
+            f"{etapa}: <azul>{medida['segundos']:.2f}s</azul> "
+            f"[<roxo>{medida['chamadas']}</roxo>x, {media_ms:.0f} ms]")
+    if resumo['contadores']:
+        log_message(" | ".join(f"{contador}: <roxo>{valor}</roxo>" for contador, valor in resumo['contadores'].items()))
+
+    if log.isEnabledFor(logging.DEBUG):
+        for registro in metricas.mais_lentos()[:3]:
+            log.debug("Mais lento: %s <azul>%.2fs</azul> %s",
+                      os.path.basename(registro['arquivo']), registro['segundos'], registro['etapas'])
+
+
+def process_pdf(filepath, usar_cache: bool = True):
+    log.debug("process_pdf: %s", filepath)
     # Extração inicial dos dados
-    dados_nf = extrair_dados(filepath) or {}
+    dados_nf = extrair_dados(filepath, usar_cache) or {}
     numero_nf = dados_nf.get('numero_nf', '').strip()
     data_nf = dados_nf.get('data_nf', '').strip()
     pos_nf = dados_nf.get('pos_nf', [])
@@ -209,7 +715,8 @@ def process_pdf(filepath):
                 valor = processar_valor_monetario(valor_raw)
             except (ValueError, AttributeError):
                 valor = 0.0
-                print(colorize_terminal(f"[<vermelho>ERRO</vermelho>] Valor, {valor_raw}, inválido na linha: \n{match}"))
+                log.warning("%s: valor %r inválido na linha %r",
+                            os.path.basename(filepath), valor_raw, match.group(0))
                 status_nf = 'falha'
 
             # Criação do objeto de linha
@@ -226,7 +733,7 @@ def process_pdf(filepath):
                 if po in pos_nf:  # Verifica se o PO está na lista de POs da NF
                     linhas_processadas.append(linha_processada)
                 else:
-                    print(colorize_terminal(f"[<amarelo>AVISO</amarelo>] PO {po} não encontrado na lista: {pos_nf}"))
+                    log.warning("%s: PO %s não encontrado na lista: %s", os.path.basename(filepath), po, pos_nf)
 
                     if not all(linha_processada.values()):
                         campos_obrigatorios = ['po', 'linha', 'valor']
@@ -237,11 +744,11 @@ def process_pdf(filepath):
 
                     status_nf = 'falha'
             else:
-                print(f"[<vermelho>ERRO</vermelho>] Linha incompleta: {linha_processada}")
+                log.warning("%s: linha incompleta: %s", os.path.basename(filepath), linha_processada)
                 status_nf = 'falha'
 
         except Exception as e:
-            print(f"[<vermelho>ERRO</vermelho>] Erro ao processar linha: {e}")
+            log.error("%s: erro ao processar linha: %s", os.path.basename(filepath), e)
             status_nf = 'falha'
             continue
 
@@ -257,6 +764,9 @@ def process_pdf(filepath):
         'status': status_nf
     }
 
+    if 'custo_ocr' in dados_nf:
+        resultado['custo_ocr'] = dados_nf['custo_ocr']
+
     # print(colorize_terminal(
     #     f"[<azul>INFO</azul>] === Resumo do processamento ===\n"
     #     f"Arquivo: {os.path.basename(filepath)}\n"
@@ -294,23 +804,24 @@ def coletar_arquivos_pdf(
     Returns:
         Lista de caminhos completos dos arquivos válidos
     """
-    arquivos_pdf = []
-    total_encontrados = 0
-
     log_message("<azul>Buscando arquivos...</azul>")
+    arquivos_pdf = list(iterar_arquivos_pdf(base_dir, termo_nome, termos_exclusao))
+
+    if log_message:
+        log_message(f"\n<roxo>{len(arquivos_pdf)}</roxo> <azul>Arquivos encontrados</azul>")
+
+    return arquivos_pdf
+
+
+def iterar_arquivos_pdf(base_dir: str, termo_nome: str, termos_exclusao: List[str]) -> Iterator[str]:
+    """Percorre base_dir recursivamente entregando os PDFs válidos à medida que são encontrados."""
     for root, _, files in os.walk(base_dir):
         for file in files:
             if file.lower().endswith('.pdf'):
                 caminho_completo = os.path.join(root, file)
 
                 if eh_arquivo_pra_processamento(caminho_completo, termo_nome, termos_exclusao):
-                    arquivos_pdf.append(caminho_completo)
-                    total_encontrados += 1
-
-    if log_message:
-        log_message(f"\n<roxo>{total_encontrados}</roxo> <azul>Arquivos encontrados</azul>")
-
-    return arquivos_pdf
+                    yield caminho_completo
 
 
 def eh_arquivo_pra_processamento(
@@ -0,0 +1,152 @@
+"""
+Triagem dos documentos antes da extração.
+
+Lê a estrutura do PDF com o pdfminer, sem análise de layout: a quantidade de
+páginas e, em uma amostra delas, os caracteres desenhados pelas fontes (a
+camada de texto) e a área coberta por imagens. Com isso process_directory
+envia cada documento à faixa de texto (pdfplumber, rápida) ou à faixa de OCR.
+A triagem só escolhe a fila: a extração continua decidindo, página a página,
+o que passa pelo OCR, então um documento mal classificado apenas demora mais.
+"""
+import os
+from typing import List, Optional, Tuple
+
+from config import (
+    OCR_MIN_CARACTERES_PAGINA,
+    TRIAGEM_CARACTERES_PAGINA_IMAGEM,
+    TRIAGEM_COBERTURA_IMAGEM,
+    TRIAGEM_PAGINAS_AMOSTRA,
+    TRIAGEM_PAGINAS_MAX_TEXTO
+)
+from core.log import obter_logger
+
+log = obter_logger(__name__)
+
+# Faixas de extração
+TEXTO = "texto"
+OCR = "ocr"
+FAIXAS = (TEXTO, OCR)
+
+
+class Triagem:
+    """
+    Resultado da triagem de um documento.
+
+    Attributes:
+        faixa: TEXTO ou OCR
+        motivo: Descrição curta da escolha, para o log
+        paginas: Quantidade de páginas (0 se não foi possível ler)
+        amostra: [(número da página, caracteres, fração coberta por imagens)]
+    """
+
+    def __init__(self, faixa: str, motivo: str, paginas: int = 0, amostra: Optional[List[Tuple[int, int, float]]] = None):
+        self.faixa = faixa
+        self.motivo = motivo
+        self.paginas = paginas
+        self.amostra = amostra or []
+
+    def __repr__(self):
+        return f"Triagem({self.faixa!r}, {self.motivo!r}, paginas={self.paginas})"
+
+
+class _Sonda:
+    """
+    Dispositivo do PDFPageInterpreter que só conta: caracteres dos textos
+    desenhados (inclusive os invisíveis, como a camada de um PDF digitalizado
+    pesquisável) e área das imagens, pela matriz de transformação atual.
+    """
+
+    def __init__(self):
+        self.ctm = None
+        self.caracteres = 0
+        self.area_imagens = 0.0
+
+    def set_ctm(self, ctm):
+        self.ctm = ctm
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        fonte = textstate.font
+        for item in seq:
+            if isinstance(item, bytes):
+                self.caracteres += len(fonte.decode(item)) if fonte is not None else len(item)
+
+    def render_image(self, name, stream):
+        # A imagem ocupa o quadrado unitário transformado pela matriz atual
+        a, b, c, d, _, _ = self.ctm
+        self.area_imagens += abs(a * d - b * c)
+
+    def _ignorar(self, *args, **kwargs):
+        pass
+
+    begin_tag = end_tag = do_tag = begin_page = end_page = begin_figure = end_figure = paint_path = _ignorar
+
+
+def _indices_amostra(paginas: int, amostra: int) -> List[int]:
+    """Índices (base 0) das primeiras ``amostra - 1`` páginas e da última."""
+    if paginas <= amostra:
+        return list(range(paginas))
+    return list(range(amostra - 1)) + [paginas - 1]
+
+
+def _pagina_precisa_ocr(caracteres: int, cobertura: float) -> bool:
+    if caracteres < OCR_MIN_CARACTERES_PAGINA:
+        return True
+    return cobertura >= TRIAGEM_COBERTURA_IMAGEM and caracteres < TRIAGEM_CARACTERES_PAGINA_IMAGEM
+
+
+def triar(filepath: str, amostra: int = TRIAGEM_PAGINAS_AMOSTRA) -> Triagem:
+    """
+    Classifica um PDF para a faixa de texto ou de OCR.
+
+    Vai para o OCR o documento com mais de TRIAGEM_PAGINAS_MAX_TEXTO páginas,
+    ou com alguma página da amostra sem camada de texto suficiente (menos de
+    OCR_MIN_CARACTERES_PAGINA caracteres, ou coberta por imagens e com menos
+    de TRIAGEM_CARACTERES_PAGINA_IMAGEM). PDFs que não podem ser lidos também
+    vão para o OCR, onde a demora não atrasa a faixa rápida.
+
+    Args:
+        filepath: Caminho do PDF
+        amostra: Quantidade de páginas inspecionadas
+
+    Returns:
+        Triagem com a faixa escolhida
+    """
+    # Importado na primeira triagem, como o pdfplumber na extração
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+
+    try:
+        with open(filepath, "rb") as arquivo:
+            documento = PDFDocument(PDFParser(arquivo))
+            paginas = resolve1(resolve1(documento.catalog["Pages"]).get("Count")) or 0
+            if paginas > TRIAGEM_PAGINAS_MAX_TEXTO:
+                return Triagem(OCR, f"{paginas} páginas", paginas)
+
+            indices = _indices_amostra(paginas, max(1, amostra))
+            sonda = _Sonda()
+            interpretador = PDFPageInterpreter(PDFResourceManager(caching=True), sonda)
+            resultado = []
+            for indice, pagina in enumerate(PDFPage.create_pages(documento)):
+                if indice not in indices:
+                    continue
+
+                sonda.caracteres, sonda.area_imagens = 0, 0.0
+                interpretador.process_page(pagina)
+
+                x0, y0, x1, y1 = pagina.mediabox
+                area = abs((x1 - x0) * (y1 - y0)) or 1.0
+                cobertura = min(1.0, sonda.area_imagens / area)
+                resultado.append((indice + 1, sonda.caracteres, round(cobertura, 2)))
+
+                if _pagina_precisa_ocr(sonda.caracteres, cobertura):
+                    return Triagem(OCR, f"página {indice + 1} sem camada de texto", paginas, resultado)
+    except Exception as e:
+        log.debug("Triagem de %s falhou: %s", os.path.basename(filepath), e)
+        return Triagem(OCR, f"não foi possível ler o PDF ({e})")
+
+    if not resultado:
+        return Triagem(OCR, "nenhuma página", paginas)
+    return Triagem(TEXTO, "camada de texto", paginas, resultado)
@@ -0,0 +1,443 @@
+import json
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+
+from config import XLSX_CABECALHOS, XLSX_LARGURAS_COLUNAS
+from core.log import obter_logger
+
+log = obter_logger(__name__)
+
+# Versão do formato do manifesto; manifestos de outra versão são ignorados
+MANIFESTO_VERSAO = 1
+
+# Número de colunas das planilhas de PO (N. Nota, Data, Linha da PO, Descrição, Valor)
+NUM_COLUNAS = 5
+
+TIPO_PLANILHA = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+RELACAO_PLANILHA = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+
+_RE_SHEET = re.compile(r'<sheet\b[^>]*?/>')
+_RE_RELACAO_ID = re.compile(r'\bId="rId(\d+)"')
+_RE_PARTE_PLANILHA = re.compile(r'^xl/worksheets/sheet(\d+)\.xml$')
+_RE_CELULA = re.compile(r'<c r="([A-Z]+)(\d+)"([^>]*?)(/?)>')
+_RE_ESTILO = re.compile(r'\s+s="\d+"')
+
+
+def caminho_manifesto(caminho_xlsx):
+    """Caminho do manifesto que acompanha o workbook (POs.xlsx -> POs.manifesto.json)."""
+    return os.path.splitext(caminho_xlsx)[0] + ".manifesto.json"
+
+
+def valor_em_disco(valor):
+    """Valor de uma célula como o openpyxl o devolve depois de salvar e recarregar o workbook."""
+    if valor == "":
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str):
+        return valor.replace("\r\n", "\n").replace("\r", "\n")
+    return valor
+
+
+def gravar_manifesto(caminho_xlsx, estilos, planilhas, partes=None):
+    """
+    Grava o manifesto com o índice de linhas de cada planilha do workbook.
+
+    Args:
+        caminho_xlsx: Workbook recém-salvo ao qual o manifesto se refere
+        estilos: Ids de estilo (índices em cellXfs) usados nas células de PO
+        planilhas: {título: {'colunas', 'proxima_linha', 'indice'}}, com o
+            índice no formato de indexar_linhas
+        partes: {título: parte do zip}; lidas do workbook quando omitidas
+    """
+    if partes is None:
+        with zipfile.ZipFile(caminho_xlsx) as zf:
+            partes = _partes_planilhas(zf)
+
+    estado = os.stat(caminho_xlsx)
+    manifesto = {
+        "versao": MANIFESTO_VERSAO,
+        "xlsx": {"tamanho": estado.st_size, "mtime_ns": estado.st_mtime_ns},
+        "estilos": estilos,
+        "planilhas": {
+            titulo: {
+                "parte": partes[titulo],
+                "colunas": info["colunas"],
+                "proxima_linha": info["proxima_linha"],
+                "linhas": [
+                    [[valor_em_disco(valor) for valor in chave], linhas]
+                    for chave, linhas in info["indice"].items()
+                ],
+            }
+            for titulo, info in planilhas.items() if titulo in partes
+        },
+    }
+
+    caminho = caminho_manifesto(caminho_xlsx)
+    temporario = caminho + ".tmp"
+    try:
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporario, caminho)
+    except BaseException:
+        _remover_temporario(temporario)
+        raise
+
+
+def carregar_manifesto(caminho_xlsx):
+    """
+    Lê o manifesto do workbook, se ele ainda descrever o arquivo em disco.
+
+    Returns:
+        Manifesto com os índices já convertidos para dicionários de tuplas,
+        ou None se não existir, for de outra versão ou o workbook tiver sido
+        alterado depois dele (tamanho/mtime diferentes)
+    """
+    caminho = caminho_manifesto(caminho_xlsx)
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            manifesto = json.load(arquivo)
+        estado = os.stat(caminho_xlsx)
+    except (OSError, ValueError):
+        return None
+
+    xlsx = manifesto.get("xlsx", {})
+    if (manifesto.get("versao") != MANIFESTO_VERSAO
+            or xlsx.get("tamanho") != estado.st_size
+            or xlsx.get("mtime_ns") != estado.st_mtime_ns):
+        log.debug("Manifesto do XLSX desatualizado, ignorando")
+        return None
+
+    for info in manifesto["planilhas"].values():
+        info["indice"] = {tuple(chave): linhas for chave, linhas in info.pop("linhas")}
+    return manifesto
+
+
+def anexar_incremental(caminho_xlsx, novos_dados, manifesto):
+    """
+    Anexa linhas ao workbook existente sem carregá-lo no openpyxl.
+
+    Usa o manifesto para detectar duplicatas e saber onde cada planilha termina;
+    só o XML das planilhas afetadas é lido e reescrito, as demais partes do
+    pacote são copiadas como estão. Planilhas de POs novas são geradas com o
+    mesmo layout de salvar_em_xlsx. O resultado é o mesmo do caminho em memória:
+    a primeira linha igual é marcada em amarelo e a nova linha em vermelho.
+
+    Args:
+        caminho_xlsx: Workbook descrito por ``manifesto``
+        novos_dados: {po: [(novo_item, valores_convertidos), ...]}
+        manifesto: Retorno de carregar_manifesto
+
+    Returns:
+        True se as linhas foram anexadas; False se o caso não é suportado e o
+        workbook deve passar pelo caminho completo (nada é alterado)
+    """
+    planilhas = manifesto["planilhas"]
+    estilos = manifesto["estilos"]
+
+    if any(info["colunas"] != NUM_COLUNAS for info in planilhas.values()):
+        return False
+    for linhas in novos_dados.values():
+        for _, convertidos in linhas:
+            if not all(_valor_suportado(valor) for valor in convertidos):
+                return False
+
+    # Duplicatas e posição das novas linhas, planilha por planilha
+    alteracoes = {}
+    for po_num, linhas in novos_dados.items():
+        titulo = f"PO_{po_num}"
+        info = planilhas.setdefault(titulo, {
+            "parte": None, "colunas": NUM_COLUNAS, "proxima_linha": 4, "indice": {},
+        })
+        existentes = set()
+        novas = []
+        primeira_nova = info["proxima_linha"]
+
+        for novo_item, convertidos in linhas:
+            num_linha = info["proxima_linha"]
+            iguais = info["indice"].get(tuple(novo_item))
+            if iguais:
+                if iguais[0] >= primeira_nova:
+                    novas[iguais[0] - primeira_nova][2] = "duplicado"
+                else:
+                    existentes.add(iguais[0])
+                fundo = "novo"
+            else:
+                fundo = "par" if num_linha % 2 == 0 else "impar"
+
+            novas.append([num_linha, convertidos, fundo])
+            info["indice"].setdefault(tuple(convertidos), []).append(num_linha)
+            info["proxima_linha"] += 1
+
+        alteracoes[titulo] = (existentes, novas)
+
+    with zipfile.ZipFile(caminho_xlsx) as zin:
+        substituicoes = {}
+        for titulo, (existentes, novas) in alteracoes.items():
+            parte = planilhas[titulo]["parte"]
+            if parte is None:
+                continue
+            xml = _anexar_linhas(zin.read(parte).decode("utf-8"), existentes, novas, estilos)
+            if xml is None:
+                return False
+            substituicoes[parte] = xml
+
+        novas_planilhas = sorted(
+            (titulo for titulo in alteracoes if planilhas[titulo]["parte"] is None), key=_ordem_planilha
+        )
+        if novas_planilhas:
+            if not _registrar_planilhas(zin, novas_planilhas, planilhas, substituicoes):
+                return False
+            for titulo in novas_planilhas:
+                substituicoes[planilhas[titulo]["parte"]] = _xml_planilha_nova(titulo, alteracoes[titulo][1], estilos)
+
+        temporario = caminho_xlsx + ".tmp"
+        try:
+            with zipfile.ZipFile(temporario, "w", zipfile.ZIP_DEFLATED) as zout:
+                for item in zin.infolist():
+                    conteudo = substituicoes.pop(item.filename, None)
+                    zout.writestr(item, zin.read(item) if conteudo is None else conteudo)
+                for parte, conteudo in substituicoes.items():
+                    zout.writestr(parte, conteudo)
+        except BaseException:
+            _remover_temporario(temporario)
+            raise
+
+    # Fora do bloco de leitura: no Windows o workbook aberto não pode ser substituído
+    try:
+        os.replace(temporario, caminho_xlsx)
+    except BaseException:
+        _remover_temporario(temporario)
+        raise
+
+    log.debug("XLSX incremental: %d planilha(s) atualizada(s), %d nova(s)", len(alteracoes), len(novas_planilhas))
+
+    gravar_manifesto(
+        caminho_xlsx, estilos, planilhas,
+        partes={titulo: info["parte"] for titulo, info in planilhas.items()}
+    )
+    return True
+
+
+def _remover_temporario(caminho):
+    """Apaga o arquivo temporário de uma gravação que falhou; o original fica como estava."""
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+def _partes_planilhas(zf):
+    """Mapeia o título de cada planilha à sua parte no pacote (xl/worksheets/sheetN.xml)."""
+    workbook = zf.read("xl/workbook.xml").decode("utf-8")
+    relacoes = zf.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+
+    alvos = {}
+    for relacao in re.findall(r'<Relationship\b[^>]*?/>', relacoes):
+        id_relacao = re.search(r'\bId="([^"]+)"', relacao)
+        alvo = re.search(r'\bTarget="([^"]+)"', relacao)
+        if id_relacao and alvo:
+            alvo = alvo.group(1)
+            alvos[id_relacao.group(1)] = alvo.lstrip("/") if alvo.startswith("/") else "xl/" + alvo
+
+    partes = {}
+    for sheet in _RE_SHEET.findall(workbook):
+        nome = re.search(r'\bname="([^"]*)"', sheet)
+        id_relacao = re.search(r'\br:id="([^"]+)"', sheet)
+        if nome and id_relacao and id_relacao.group(1) in alvos:
+            partes[_desescapar(nome.group(1))] = alvos[id_relacao.group(1)]
+    return partes
+
+
+def _anexar_linhas(xml, existentes, novas, estilos):
+    """Remarca as linhas duplicadas e acrescenta as novas linhas ao XML de uma planilha."""
+    # As linhas novas precisam vir depois da última linha gravada
+    ultima = xml.rfind('<row r="')
+    if novas and ultima >= 0:
+        numero = xml[ultima + 8:xml.index('"', ultima + 8)]
+        if not numero.isdigit() or int(numero) >= novas[0][0]:
+            return None
+
+    for num_linha in existentes:
+        inicio = re.search(rf'<row r="{num_linha}"[\s>/]', xml)
+        if inicio is None:
+            return None
+        fim = xml.find("</row>", inicio.start())
+        if fim < 0:
+            return None
+        trecho = _RE_CELULA.sub(lambda m: _reestilizar_celula(m, estilos), xml[inicio.start():fim])
+        xml = xml[:inicio.start()] + trecho + xml[fim:]
+
+    linhas_xml = "".join(_xml_linha(num_linha, valores, fundo, estilos) for num_linha, valores, fundo in novas)
+    if "</sheetData>" in xml:
+        xml = xml.replace("</sheetData>", linhas_xml + "</sheetData>", 1)
+    else:
+        xml, trocas = re.subn(r'<sheetData\s*/>', f"<sheetData>{linhas_xml}</sheetData>", xml, count=1)
+        if not trocas:
+            return None
+
+    if novas:
+        dimensao = f'<dimension ref="A1:{get_column_letter(NUM_COLUNAS)}{novas[-1][0]}"'
+        xml = re.sub(r'<dimension ref="[^"]*"', dimensao, xml, count=1)
+    return xml
+
+
+def _reestilizar_celula(match, estilos):
+    """Troca o estilo de uma célula existente pelo estilo de duplicata da sua coluna."""
+    coluna, linha, atributos, fechamento = match.groups()
+    indice = _indice_coluna(coluna)
+    if indice > NUM_COLUNAS:
+        return match.group(0)
+    estilo = estilos["dados"]["duplicado"][indice - 1]
+    return f'<c r="{coluna}{linha}" s="{estilo}"{_RE_ESTILO.sub("", atributos)}{fechamento}>'
+
+
+def _registrar_planilhas(zin, titulos, planilhas, substituicoes):
+    """Inclui as planilhas novas em workbook.xml, nas relações e nos content types."""
+    workbook = zin.read("xl/workbook.xml").decode("utf-8")
+    relacoes = zin.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    tipos = zin.read("[Content_Types].xml").decode("utf-8")
+
+    existentes = _RE_SHEET.findall(workbook)
+    if not existentes or "localSheetId" in workbook:
+        return False
+
+    proximo_sheet_id = max(int(re.search(r'\bsheetId="(\d+)"', sheet).group(1)) for sheet in existentes) + 1
+    proxima_relacao = max((int(n) for n in _RE_RELACAO_ID.findall(relacoes)), default=0) + 1
+    proxima_parte = max(
+        (int(m.group(1)) for m in map(_RE_PARTE_PLANILHA.match, zin.namelist()) if m), default=0
+    ) + 1
+
+    for titulo in titulos:
+        parte = f"xl/worksheets/sheet{proxima_parte}.xml"
+        id_relacao = f"rId{proxima_relacao}"
+        planilhas[titulo]["parte"] = parte
+
+        sheet = (
+            f'<sheet xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+            f'name={quoteattr(titulo)} sheetId="{proximo_sheet_id}" state="visible" r:id="{id_relacao}" />'
+        )
+        # Mantém a ordem das planilhas por número de PO, como em salvar_em_xlsx
+        posterior = next(
+            (s for s in _RE_SHEET.findall(workbook)
+             if _ordem_planilha(_desescapar(re.search(r'\bname="([^"]*)"', s).group(1))) > _ordem_planilha(titulo)),
+            None
+        )
+        if posterior is None:
+            workbook = workbook.replace("</sheets>", sheet + "</sheets>", 1)
+        else:
+            workbook = workbook.replace(posterior, sheet + posterior, 1)
+
+        relacoes = relacoes.replace(
+            "</Relationships>",
+            f'<Relationship Type="{RELACAO_PLANILHA}" Target="/{parte}" Id="{id_relacao}" /></Relationships>', 1
+        )
+        tipos = tipos.replace(
+            "</Types>", f'<Override PartName="/{parte}" ContentType="{TIPO_PLANILHA}" /></Types>', 1
+        )
+
+        proximo_sheet_id += 1
+        proxima_relacao += 1
+        proxima_parte += 1
+
+    substituicoes["xl/workbook.xml"] = workbook
+    substituicoes["xl/_rels/workbook.xml.rels"] = relacoes
+    substituicoes["[Content_Types].xml"] = tipos
+    return True
+
+
+def _xml_planilha_nova(titulo, novas, estilos):
+    """XML completo de uma planilha de PO nova (linhas 1-3 de cabeçalho + dados)."""
+    ultima_coluna = get_column_letter(NUM_COLUNAS)
+    borda = estilos["borda"]
+
+    def linha_mesclada(num_linha, texto, estilo):
+        celulas = [_xml_celula(f"A{num_linha}", texto, estilo)]
+        celulas += [_xml_celula(f"{get_column_letter(col)}{num_linha}", None, borda) for col in range(2, NUM_COLUNAS + 1)]
+        return f'<row r="{num_linha}" ht="30" customHeight="1">{"".join(celulas)}</row>'
+
+    cabecalho = "".join(
+        _xml_celula(f"{get_column_letter(col)}3", texto, estilos["cabecalho"])
+        for col, texto in enumerate(XLSX_CABECALHOS, 1)
+    )
+    colunas = "".join(
+        f'<col width="{largura}" customWidth="1" min="{col}" max="{col}" />'
+        for col, largura in enumerate(XLSX_LARGURAS_COLUNAS.values(), 1)
+    )
+    ultima_linha = novas[-1][0] if novas else 3
+
+    return (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetPr><outlinePr summaryBelow="1" summaryRight="1" /><pageSetUpPr /></sheetPr>'
+        f'<dimension ref="A1:{ultima_coluna}{ultima_linha}" />'
+        '<sheetViews><sheetView workbookViewId="0"><selection activeCell="A1" sqref="A1" /></sheetView></sheetViews>'
+        '<sheetFormatPr baseColWidth="8" defaultRowHeight="15" />'
+        f'<cols>{colunas}</cols>'
+        '<sheetData>'
+        + linha_mesclada(1, titulo, estilos["titulo"])
+        + linha_mesclada(2, "DESCRIÇÃO DE SERVIÇOS", estilos["servicos"])
+        + f'<row r="3" ht="20" customHeight="1">{cabecalho}</row>'
+        + "".join(_xml_linha(num_linha, valores, fundo, estilos) for num_linha, valores, fundo in novas)
+        + '</sheetData>'
+        f'<mergeCells count="2"><mergeCell ref="A1:{ultima_coluna}1" /><mergeCell ref="A2:{ultima_coluna}2" /></mergeCells>'
+        '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5" />'
+        '</worksheet>'
+    )
+
+
+def _xml_linha(num_linha, valores, fundo, estilos):
+    """XML de uma linha de dados (altura 40, estilo por coluna conforme o fundo)."""
+    ids = estilos["dados"][fundo]
+    celulas = "".join(
+        _xml_celula(f"{get_column_letter(col)}{num_linha}", valor, ids[col - 1])
+        for col, valor in enumerate(valores, 1)
+    )
+    return f'<row r="{num_linha}" ht="40" customHeight="1">{celulas}</row>'
+
+
+def _xml_celula(referencia, valor, estilo):
+    """XML de uma célula; textos são gravados como inline strings para não alterar sharedStrings."""
+    if valor is None or valor == "":
+        return f'<c r="{referencia}" s="{estilo}" />'
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}" s="{estilo}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c r="{referencia}" s="{estilo}" t="n"><v>{valor!r}</v></c>'
+
+    texto = escape(valor)
+    preservar = ' xml:space="preserve"' if texto != texto.strip() else ""
+    return f'<c r="{referencia}" s="{estilo}" t="inlineStr"><is><t{preservar}>{texto}</t></is></c>'
+
+
+def _valor_suportado(valor):
+    """Tipos que _xml_celula sabe gravar (o resto vai pelo caminho completo do openpyxl)."""
+    if isinstance(valor, str):
+        return not ILLEGAL_CHARACTERS_RE.search(valor)
+    if isinstance(valor, float):
+        return valor == valor and valor not in (float("inf"), float("-inf"))
+    return valor is None or isinstance(valor, (bool, int))
+
+
+def _ordem_planilha(titulo):
+    """Chave de ordenação das planilhas, a mesma de salvar_em_xlsx."""
+    sufixo = titulo.split("_")[1] if titulo.startswith("PO_") else ""
+    return int(sufixo) if sufixo.isdigit() else 0
+
+
+def _indice_coluna(letras):
+    """Índice (1-based) de uma coluna a partir das letras (A=1, E=5, AA=27)."""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice
+
+
+def _desescapar(texto):
+    """Desfaz o escape XML de um valor de atributo."""
+    return (texto.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"')
+            .replace("&apos;", "'").replace("&amp;", "&"))
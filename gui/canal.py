@@ -0,0 +1,116 @@
+import queue
+import time
+import tkinter as tk
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from config import GUI_INTERVALO_ATUALIZACAO_MS, GUI_LINHAS_CONSOLE, TAG_COR
+
+
+class CanalInterface:
+    """
+    Canal entre as threads de processamento e o loop do Tk.
+
+    log_message, update_progress e agendar podem ser chamados de qualquer
+    thread: apenas publicam o evento. A cada ``intervalo_ms`` o loop do Tk
+    aplica tudo o que chegou de uma vez: as mensagens do ciclo entram no
+    console em um único insert (só as que caberiam nas ``max_linhas``), o
+    excedente sai em um único delete e, do progresso, só o valor mais recente
+    é aplicado. O custo na interface não depende do ritmo dos documentos.
+
+    Args:
+        root: Janela principal
+        console: Widget Text do console, com as tags de cor configuradas
+        progress_bar: Barra de progresso (ttk.Progressbar)
+        intervalo_ms: Intervalo entre as atualizações da interface
+        max_linhas: Linhas mantidas no console
+    """
+
+    def __init__(self, root, console, progress_bar,
+                 intervalo_ms: int = GUI_INTERVALO_ATUALIZACAO_MS, max_linhas: int = GUI_LINHAS_CONSOLE):
+        self.root = root
+        self.console = console
+        self.progress_bar = progress_bar
+        self.intervalo_ms = intervalo_ms
+        self.max_linhas = max_linhas
+
+        self._mensagens = queue.SimpleQueue()
+        self._tarefas = queue.SimpleQueue()
+        # Último progresso publicado; a troca da tupla é atômica
+        self._progresso: Optional[Tuple[int, int]] = None
+        self._progresso_aplicado: Optional[Tuple[int, int]] = None
+
+    def log_message(self, message: str):
+        self._mensagens.put((time.strftime("%H:%M:%S"), message))
+
+    def update_progress(self, value: int, maximum: int):
+        self._progresso = (value, maximum)
+
+    def agendar(self, funcao: Callable[[], None]):
+        """Executa funcao no loop do Tk (ex.: reabilitar botões ao fim do processamento)."""
+        self._tarefas.put(funcao)
+
+    def iniciar(self):
+        """Começa a drenar o canal; chamar na thread do Tk, antes do mainloop."""
+        self.root.after(self.intervalo_ms, self._ciclo)
+
+    def limpar(self):
+        """Descarta as mensagens pendentes e zera o console e o progresso (thread do Tk)."""
+        self._drenar_mensagens()
+        self._progresso = self._progresso_aplicado = None
+        self.progress_bar["value"] = 0
+        self.console.delete("1.0", tk.END)
+
+    def _ciclo(self):
+        try:
+            self._aplicar()
+        finally:
+            self.root.after(self.intervalo_ms, self._ciclo)
+
+    def _drenar_mensagens(self) -> deque:
+        # Do que chegou no ciclo, só as últimas max_linhas ficariam no console
+        mensagens = deque(maxlen=self.max_linhas)
+        try:
+            while True:
+                mensagens.append(self._mensagens.get_nowait())
+        except queue.Empty:
+            return mensagens
+
+    def _aplicar(self):
+        progresso = self._progresso
+        if progresso is not None and progresso != self._progresso_aplicado:
+            self.progress_bar["maximum"] = progresso[1]
+            self.progress_bar["value"] = progresso[0]
+            self._progresso_aplicado = progresso
+
+        mensagens = self._drenar_mensagens()
+        if mensagens:
+            self._inserir(mensagens)
+
+        try:
+            while True:
+                self._tarefas.get_nowait()()
+        except queue.Empty:
+            pass
+
+    def _inserir(self, mensagens):
+        # Pares (texto, tags) de todas as mensagens, para um único insert
+        trechos = []
+        for timestamp, message in mensagens:
+            texto = message.strip()
+            trechos += [f"[{timestamp}] ", ()]
+            pos = 0
+            for match in TAG_COR.finditer(texto):
+                inicio, fim = match.span()
+                if inicio > pos:
+                    trechos += [texto[pos:inicio], ()]
+                trechos += [match.group(2), match.group(1)]
+                pos = fim
+            trechos += [texto[pos:] + "\n", ()]
+
+        self.console.insert(tk.END, *trechos)
+
+        linhas = int(self.console.index("end-1c").split(".")[0]) - 1
+        if linhas > self.max_linhas:
+            self.console.delete("1.0", f"{linhas - self.max_linhas + 1}.0")
+        self.console.see(tk.END)
@@ -1,19 +1,34 @@
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+from config import (
+    DEFAULT_WORKERS, DEFAULT_FORMATOS_EXPORTACAO, DEFAULT_TERMO_NOME, DEFAULT_TERMOS_EXCLUSAO, DEFAULT_XLSX_FILENAME
+)
+from core.controle import ControleExecucao
+from core.exportadores import EXPORTADORES, formatos_disponiveis
+from core.log import adicionar_sink, remover_sink
+from core.monitor import monitorar_diretorio
 from core.processor import process_directory
+from gui.canal import CanalInterface
 
 def launch_app():
     root = tk.Tk()
     root.title("Consolidador de Ordens de Serviço")
-    root.geometry("600x420")
+    root.geometry("600x510")
     root.resizable(False, False)  # Bloqueia o redimensionamento da janela
 
-    termo_nome = tk.StringVar(value="Linear Construtora LTDA")
-    termos_var = tk.StringVar(value="Cancelar, Cancelada, Corrigida")
+    termo_nome = tk.StringVar(value=DEFAULT_TERMO_NOME)
+    termos_var = tk.StringVar(value=DEFAULT_TERMOS_EXCLUSAO)
     pasta_var = tk.StringVar()
     xlsx_dir_var = tk.StringVar()
-    xlsx_nome_var = tk.StringVar(value="POs.xlsx")
+    xlsx_nome_var = tk.StringVar(value=DEFAULT_XLSX_FILENAME)
+    workers_var = tk.IntVar(value=DEFAULT_WORKERS)
+    ignorar_cache_var = tk.BooleanVar(value=False)
+    monitorar_var = tk.BooleanVar(value=False)
+    parar_monitoramento = threading.Event()
+    # Pausa/cancelamento da execução em andamento (um controle novo a cada Iniciar)
+    execucao = {"controle": ControleExecucao()}
+    formatos_vars = {formato: tk.BooleanVar(value=formato in DEFAULT_FORMATOS_EXPORTACAO) for formato in EXPORTADORES}
 
     def escolher_pasta():
         pasta = filedialog.askdirectory()
@@ -31,14 +46,50 @@ def launch_app():
                 messagebox.showwarning("Campos obrigatórios", "Preencha todos os campos obrigatórios.")
                 return
 
+            formatos = formatos_selecionados()
+            if not formatos:
+                messagebox.showwarning("Formatos", "Selecione ao menos um formato de exportação.")
+                return
+
+            # O Spinbox aceita texto livre: IntVar.get() falha com TclError
+            try:
+                workers = workers_var.get()
+            except tk.TclError:
+                workers = 0
+            if workers < 1:
+                messagebox.showwarning("Processos Paralelos", "Informe um número inteiro de processos, a partir de 1.")
+                return
+
+            # As variáveis do Tk só são lidas aqui, na thread da interface; a
+            # thread do processamento recebe os valores prontos
+            execucao["controle"] = ControleExecucao()
+            parametros = dict(
+                base_dir=pasta_var.get(),
+                termo_nome=termo_nome.get(),
+                termos_exclusao=termos_var.get().split(','),
+                xlsx_output_dir=xlsx_dir_var.get(),
+                xlsx_filename=xlsx_nome_var.get(),
+                update_progress=canal.update_progress,
+                log_message=canal.log_message,
+                workers=workers,
+                usar_cache=not ignorar_cache_var.get(),
+                formatos=formatos,
+                controle=execucao["controle"]
+            )
+            monitorar = monitorar_var.get()
+
             btn_iniciar["state"] = "disabled"  # Desabilita o botão ao iniciar
-            progress_bar["value"] = 0
-            console.delete("1.0", tk.END)
-            root.update()  # Atualiza a interface
+            parar_monitoramento.clear()
+            if monitorar:
+                btn_parar["state"] = "normal"
+            btn_pausar.configure(text="Pausar", state="normal")
+            btn_cancelar["state"] = "normal"
+            canal.limpar()
 
             # Criar thread para o processamento
             thread = threading.Thread(
                 target=executar_processamento,
+                args=(parametros, monitorar),
                 daemon=True
             )
             thread.start()
@@ -47,55 +98,51 @@ def launch_app():
             messagebox.showerror("Erro Inesperado", f"Erro inesperado:\n{str(e)}")
             btn_iniciar["state"] = "normal"  # Reabilita o botão em caso de erro
 
-    def executar_processamento():
+    def formatos_selecionados():
+        return [formato for formato, var in formatos_vars.items() if var.get()]
+
+    def executar_processamento(parametros, monitorar):
+        # Roda fora da thread do Tk: não lê variáveis do Tk e só atualiza a interface pelo canal
         try:
-            process_directory(
-                base_dir=pasta_var.get(),
-                termo_nome=termo_nome.get(),
-                termos_exclusao=termos_var.get().split(','),
-                xlsx_output_dir=xlsx_dir_var.get(),
-                xlsx_filename=xlsx_nome_var.get(),
-                update_progress=update_progress,
-                log_message=log_message
-            )
+            if monitorar:
+                monitorar_diretorio(parar=parar_monitoramento, **parametros)
+            else:
+                process_directory(**parametros)
         except Exception as e:
-            log_message(f"[<vermelho>ERRO</vermelho>] {str(e)}")
+            canal.log_message(f"[<vermelho>ERRO</vermelho>] {str(e)}")
         finally:
-            btn_iniciar["state"] = "normal"
-
-
-    def update_progress(value, maximum):
-        progress_bar["value"] = value
-        progress_bar["maximum"] = maximum
-        root.update_idletasks()
-
-
-    def log_message(message):
-        import datetime, re
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-
-        # Identificar tags <cor>...</cor>
-        def insert_colored(text):
-            pos = 0
-            pattern = re.compile(r"<(.*?)>(.*?)</\1>")
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                if start > pos:
-                    console.insert(tk.END, text[pos:start])
-                tag, content = match.groups()
-                console.insert(tk.END, content, tag)
-                pos = end
-            if pos < len(text):
-                console.insert(tk.END, text[pos:])
-
-        console.insert(tk.END, f"[{timestamp}] ")
-        insert_colored(message.strip())
-        console.insert(tk.END, "\n")
-        console.see(tk.END)
-
-        # Limita a 50 linhas
-        if int(console.index('end-1c').split('.')[0]) > 50:
-            console.delete("1.0", "2.0")
+            canal.agendar(finalizar_processamento)
+
+    def finalizar_processamento():
+        btn_iniciar["state"] = "normal"
+        btn_parar["state"] = "disabled"
+        btn_pausar.configure(text="Pausar", state="disabled")
+        btn_cancelar["state"] = "disabled"
+
+    def parar():
+        parar_monitoramento.set()
+        btn_parar["state"] = "disabled"
+        canal.log_message("<amarelo>Encerrando o monitoramento...</amarelo>")
+
+    def pausar():
+        controle = execucao["controle"]
+        if controle.pausado:
+            controle.retomar()
+            btn_pausar["text"] = "Pausar"
+            canal.log_message("<azul>Processamento retomado</azul>")
+        else:
+            controle.pausar()
+            btn_pausar["text"] = "Continuar"
+            canal.log_message("<amarelo>Pausado: os documentos em andamento param na próxima página</amarelo>")
+
+    def cancelar():
+        if not messagebox.askyesno(
+                "Cancelar", "Cancelar o processamento?\n\nO que já foi processado será gravado e movido."):
+            return
+        execucao["controle"].cancelar()
+        btn_pausar["state"] = "disabled"
+        btn_cancelar["state"] = "disabled"
+        canal.log_message("<amarelo>Cancelando...</amarelo>")
 
     # Seção [PDFs]
     frame_pdfs = ttk.LabelFrame(root, text="PDFs", padding=(10, 5))
@@ -112,8 +159,15 @@ def launch_app():
     entry_pasta.grid(row=2, column=1, sticky="ew", padx=5)
     ttk.Button(frame_pdfs, text="Selecionar", command=escolher_pasta).grid(row=2, column=2, padx=5)
 
-    # Seção [Arquivo Excel]
-    frame_excel = ttk.LabelFrame(root, text="Arquivo Excel", padding=(10, 5))
+    ttk.Label(frame_pdfs, text="Processos Paralelos:").grid(row=3, column=0, sticky="w", pady=2)
+    ttk.Spinbox(frame_pdfs, from_=1, to=max(DEFAULT_WORKERS * 2, 1), textvariable=workers_var, width=5).grid(row=3, column=1, sticky="w", padx=5)
+    ttk.Checkbutton(frame_pdfs, text="Ignorar cache (reprocessar todos)", variable=ignorar_cache_var).grid(row=3, column=1, sticky="e", padx=5)
+    ttk.Checkbutton(
+        frame_pdfs, text="Continuar monitorando a pasta (processa novos PDFs ao chegarem)", variable=monitorar_var
+    ).grid(row=4, column=1, sticky="w", padx=5)
+
+    # Seção [Arquivos de Saída]
+    frame_excel = ttk.LabelFrame(root, text="Arquivos de Saída", padding=(10, 5))
     frame_excel.pack(pady=10, padx=10, fill="x")
 
     ttk.Label(frame_excel, text="Nome do Arquivo:").grid(row=0, column=0, sticky="w", pady=2)
@@ -124,9 +178,28 @@ def launch_app():
     entry_saida.grid(row=1, column=1, sticky="ew", padx=5)
     ttk.Button(frame_excel, text="Selecionar", command=escolher_saida).grid(row=1, column=2, padx=5)
 
-    # Botão de Iniciar
-    btn_iniciar = ttk.Button(root, text="Iniciar ", command=iniciar)
-    btn_iniciar.pack(pady=10)
+    # Formatos sem as dependências instaladas aparecem desabilitados
+    ttk.Label(frame_excel, text="Formatos:").grid(row=2, column=0, sticky="w", pady=2)
+    frame_formatos = ttk.Frame(frame_excel)
+    frame_formatos.grid(row=2, column=1, sticky="w", padx=5)
+    disponiveis = formatos_disponiveis()
+    for formato, var in formatos_vars.items():
+        ttk.Checkbutton(
+            frame_formatos, text=formato.upper(), variable=var,
+            state="normal" if formato in disponiveis else "disabled"
+        ).pack(side="left", padx=(0, 10))
+
+    # Botões de Iniciar, Pausar/Continuar, Cancelar e Parar (monitoramento)
+    frame_botoes = ttk.Frame(root)
+    frame_botoes.pack(pady=10)
+    btn_iniciar = ttk.Button(frame_botoes, text="Iniciar ", command=iniciar)
+    btn_iniciar.pack(side="left", padx=5)
+    btn_pausar = ttk.Button(frame_botoes, text="Pausar", command=pausar, state="disabled")
+    btn_pausar.pack(side="left", padx=5)
+    btn_cancelar = ttk.Button(frame_botoes, text="Cancelar", command=cancelar, state="disabled")
+    btn_cancelar.pack(side="left", padx=5)
+    btn_parar = ttk.Button(frame_botoes, text="Parar", command=parar, state="disabled")
+    btn_parar.pack(side="left", padx=5)
 
     # Barra de progresso
     progress_bar = ttk.Progressbar(root, length=400, mode="determinate")
@@ -146,8 +219,17 @@ def launch_app():
     console.tag_config("roxo", foreground="purple")
     console.tag_config("cinza", foreground="gray")
 
+    # Processamento e log publicam no canal; o loop do Tk aplica em lotes
+    canal = CanalInterface(root, console, progress_bar)
+    canal.iniciar()
+
     # Ajuste de responsividade
     for frame in (frame_pdfs, frame_excel):
         frame.grid_columnconfigure(1, weight=1)
 
-    root.mainloop()
\ No newline at end of file
+    # Avisos e erros registrados fora de process_directory (cache, OCR, workers) também aparecem no console
+    sink = adicionar_sink(canal.log_message)
+    try:
+        root.mainloop()
+    finally:
+        remover_sink(sink)
\ No newline at end of file
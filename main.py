@@ -1,9 +1,15 @@
+import multiprocessing
 from gui.interface import launch_app
+from core.log import configurar_log
 from core.ocr_utils import check_dependencies
 import tkinter as tk
 from tkinter import messagebox
 
 if __name__ == "__main__":
+    # Necessário para o pool de processos no executável do PyInstaller
+    multiprocessing.freeze_support()
+    configurar_log()
+
     errors, poppler_path = check_dependencies()
 
     if errors:
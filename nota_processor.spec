@@ -1,5 +1,7 @@
 # os_consolidador.spec
 
+import importlib.util
+
 from PyInstaller.utils.hooks import collect_data_files
 from pathlib import Path
 
@@ -17,7 +19,9 @@ a = Analysis(
         *[(str(td), f"tesseract/tessdata") for td in tessdata],
         *[(str(pf), "poppler/bin") for pf in poppler_files],
     ],
-    hiddenimports=[],
+    # Dependências opcionais importadas só quando usadas; entram no executável
+    # se estiverem instaladas no ambiente do build
+    hiddenimports=[m for m in ("tesserocr", "pyarrow") if importlib.util.find_spec(m)],
     hookspath=[],
     runtime_hooks=[],
     excludes=[],
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do projeto são importados a partir da raiz (config, core, gui)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
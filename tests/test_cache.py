@@ -0,0 +1,34 @@
+"""Chave do cache de extração: toda configuração que altera o resultado a invalida."""
+import pytest
+
+from core import cache
+from core.cache import versao_extracao
+
+
+@pytest.mark.parametrize("configuracao, valor", [
+    ("EXTRATOR_VERSAO", -1),
+    ("OCR_CONFIG", "--psm 6"),
+    ("OCR_LANG", "eng"),
+    ("OCR_DPI_OPTIONS", {'inicial': 200, 'max': 600, 'passo': 100}),
+    ("OCR_PERFIL", "digitalizado"),
+    ("OCR_PERFIS_PREPROCESSAMENTO", {'padrao': {'limiar': 150}}),
+    ("OCR_ROI_ATIVO", False),
+    ("OCR_ROI_DPI_DETECCAO", 100),
+    ("OCR_ROI_COBERTURA_MAX", 0.9),
+    ("OCR_MIN_CARACTERES_PAGINA", 100),
+])
+def test_configuracao_muda_a_versao(monkeypatch, configuracao, valor):
+    original = versao_extracao()
+    monkeypatch.setattr(cache, configuracao, valor)
+    assert versao_extracao() != original
+
+
+def test_backend_muda_a_versao(monkeypatch):
+    monkeypatch.setattr(cache, "backend_efetivo", lambda: "pytesseract")
+    pytesseract = versao_extracao()
+    monkeypatch.setattr(cache, "backend_efetivo", lambda: "tesserocr")
+    assert versao_extracao() != pytesseract
+
+
+def test_versao_estavel():
+    assert versao_extracao() == versao_extracao()
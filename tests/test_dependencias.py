@@ -0,0 +1,70 @@
+"""Localização do Poppler/Tesseract e o escalonamento de OCR sem eles."""
+import os
+import stat
+
+import pytest
+
+import core.extrators
+from core import ocr_utils
+from core.extrators import EscalonamentoOCR
+from core.ocr_utils import OCRIndisponivel, caminho_poppler, configurar_poppler
+
+PDFTOPPM = "pdftoppm.exe" if os.name == "nt" else "pdftoppm"
+
+
+def instalar_pdftoppm(pasta):
+    executavel = pasta / PDFTOPPM
+    executavel.write_text("#!/bin/sh\n")
+    executavel.chmod(executavel.stat().st_mode | stat.S_IXUSR)
+    return pasta
+
+
+@pytest.fixture
+def sem_poppler(tmp_path, monkeypatch):
+    """Nenhum Poppler: PATH vazio, sem POPPLER_PATH e sem os caminhos padrão."""
+    monkeypatch.setenv("PATH", str(tmp_path / "vazio"))
+    monkeypatch.delenv("POPPLER_PATH", raising=False)
+    monkeypatch.setattr(ocr_utils, "POPPLER_PATHS", [])
+    return tmp_path
+
+
+def test_poppler_do_path(sem_poppler, monkeypatch):
+    monkeypatch.setenv("PATH", str(instalar_pdftoppm(sem_poppler)))
+    assert configurar_poppler() is None
+    assert "POPPLER_PATH" not in os.environ
+    assert caminho_poppler() is None
+
+
+def test_poppler_informado(sem_poppler):
+    pasta = instalar_pdftoppm(sem_poppler)
+    assert configurar_poppler(str(pasta / PDFTOPPM)) == str(pasta)
+    assert caminho_poppler() == str(pasta)
+
+
+def test_poppler_path_invalido_nao_esconde_o_do_path(sem_poppler, monkeypatch):
+    monkeypatch.setenv("POPPLER_PATH", str(sem_poppler / "inexistente"))
+    monkeypatch.setenv("PATH", str(instalar_pdftoppm(sem_poppler)))
+    assert configurar_poppler() is None
+
+
+def test_sem_poppler(sem_poppler):
+    with pytest.raises(FileNotFoundError):
+        configurar_poppler()
+    with pytest.raises(OCRIndisponivel):
+        caminho_poppler()
+
+
+def test_escalonamento_para_sem_ocr(monkeypatch):
+    tentativas = []
+
+    def indisponivel(filepath, dpi, **kwargs):
+        tentativas.append(dpi)
+        raise OCRIndisponivel("Poppler não encontrado")
+
+    monkeypatch.setattr(core.extrators, "extrair_textos_ocr_por_pagina", indisponivel)
+    escalonamento = EscalonamentoOCR("nota.pdf", ["", ""], dpis=[200, 300, 400])
+
+    assert escalonamento.executar([1]) == {}
+    assert escalonamento.executar() == {}
+    assert tentativas == [200]
+    assert escalonamento.indisponivel
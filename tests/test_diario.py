@@ -0,0 +1,108 @@
+"""Retomada de process_directory pelo diário depois de uma interrupção."""
+import os
+from collections import Counter
+
+import pytest
+from openpyxl import load_workbook
+
+import core.file_utils
+import core.processor
+from core import exportadores
+from core.diario import caminho_diario
+
+NOME = "POs.xlsx"
+ARQUIVOS = [f"NF {nota} Linear PO 123456.pdf" for nota in range(1, 5)]
+
+
+class Interrupcao(BaseException):
+    """Simula a execução derrubada (processo encerrado) no meio do trabalho."""
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    for nome in ARQUIVOS:
+        (entrada / nome).write_bytes(b"%PDF-1.4\n%%EOF\n")
+
+    # Extração simulada: uma linha de PO por nota, contando as chamadas
+    extracoes = Counter()
+
+    def extrair(filepath, usar_cache=True):
+        nome = os.path.basename(filepath)
+        extracoes[nome] += 1
+        nota = nome.split()[1]
+        resultado = {
+            "numero_nf": nota, "data_nf": "10/01/2024",
+            "linhas": [{"po": "123456", "linha": "10", "descricao": "SERVICO", "valor": f"{nota}00,00",
+                        "processado": True}],
+        }
+        return resultado, "sucesso", None, {}
+
+    monkeypatch.setattr(core.processor, "_process_pdf_protegido", extrair)
+    return entrada, tmp_path / "saida", extracoes
+
+
+def processar(entrada, saida):
+    return core.processor.process_directory(
+        str(entrada), "Linear", ["Cancelada"], str(saida), NOME,
+        lambda atual, total: None, lambda mensagem: None,
+        workers=1, usar_cache=False, formatos=["xlsx", "csv"]
+    )
+
+
+def notas_gravadas(saida):
+    wb = load_workbook(saida / NOME)
+    try:
+        return sorted(row[0] for row in wb["PO_123456"].iter_rows(min_row=4, max_col=1, values_only=True))
+    finally:
+        wb.close()
+
+
+@pytest.mark.parametrize("interromper_em", [1, 3])
+def test_retoma_sem_extrair_ou_exportar_de_novo(pasta, monkeypatch, interromper_em):
+    entrada, saida, extracoes = pasta
+    mover_arquivo = core.file_utils.mover_arquivo
+    movimentos = []
+
+    def mover_e_cair(origem, destino):
+        movimentos.append(origem)
+        if len(movimentos) == interromper_em:
+            raise Interrupcao()
+        return mover_arquivo(origem, destino)
+
+    monkeypatch.setattr(core.file_utils, "mover_arquivo", mover_e_cair)
+    with pytest.raises(Interrupcao):
+        processar(entrada, saida)
+    assert os.path.exists(caminho_diario(str(saida), NOME))
+
+    monkeypatch.setattr(core.file_utils, "mover_arquivo", mover_arquivo)
+    resumo = processar(entrada, saida)
+
+    assert not resumo["cancelado"]
+    assert all(vezes == 1 for vezes in extracoes.values()) and len(extracoes) == len(ARQUIVOS)
+    assert notas_gravadas(saida) == [1, 2, 3, 4]
+    with open(saida / "POs.csv", encoding="utf-8") as arquivo:
+        assert len(arquivo.readlines()) == 1 + len(ARQUIVOS)
+    assert sorted(os.listdir(entrada / "Notas Processadas")) == sorted(ARQUIVOS)
+    assert not os.path.exists(caminho_diario(str(saida), NOME))
+
+
+def test_retoma_formato_que_faltou(pasta, monkeypatch):
+    entrada, saida, _ = pasta
+
+    # Cai depois de gravar o XLSX, antes do CSV
+    def cair(*args, **kwargs):
+        raise Interrupcao()
+
+    monkeypatch.setattr(exportadores.ExportadorCSV, "abrir", cair)
+    with pytest.raises(Interrupcao):
+        processar(entrada, saida)
+    monkeypatch.undo()
+
+    monkeypatch.setattr(core.processor, "_process_pdf_protegido", lambda *a: pytest.fail("extraído de novo"))
+    processar(entrada, saida)
+
+    assert notas_gravadas(saida) == [1, 2, 3, 4]
+    with open(saida / "POs.csv", encoding="utf-8") as arquivo:
+        assert len(arquivo.readlines()) == 1 + len(ARQUIVOS)
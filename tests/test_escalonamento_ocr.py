@@ -0,0 +1,54 @@
+"""OCR de documentos mistos: só as páginas que podem fornecer os campos passam pelo OCR."""
+from collections import Counter
+
+import pytest
+
+import core.extrators
+from config import OCR_DPI_OPTIONS
+from core.extrators import extrair_dados
+
+DPIS = list(range(OCR_DPI_OPTIONS['inicial'], OCR_DPI_OPTIONS['max'] + 1, OCR_DPI_OPTIONS['passo']))
+
+CABECALHO = "PRESTADOR DE SERVICOS EXEMPLO LTDA - RUA DAS FLORES, CENTRO"
+LINHAS = "123456 LINHA 10 VALOR 1.500,00 / SERVICO DE MANUTENCAO PREVENTIVA"
+CONDICOES = "CONDICOES GERAIS: O PAGAMENTO SERA REALIZADO CONFORME CONTRATO VIGENTE"
+
+
+@pytest.fixture
+def documento(monkeypatch):
+    """
+    Nota de quatro páginas: cabeçalho digital sem a PO (legível só pelo OCR,
+    a partir do segundo DPI), linhas de pedido digitais, anexo digitalizado
+    ilegível e condições gerais digitais. Devolve as páginas de cada OCR.
+    """
+    textos_pdf = [CABECALHO, LINHAS, "", CONDICOES]
+    ocr_por_pagina = Counter()
+
+    def ocr(filepath, dpi, paginas=None, **kwargs):
+        paginas = paginas or range(1, len(textos_pdf) + 1)
+        ocr_por_pagina.update(paginas)
+        textos = {pagina: "" for pagina in paginas}
+        if 1 in textos and dpi > DPIS[0]:
+            textos[1] = CABECALHO + "\nPO 123456"
+        return textos
+
+    monkeypatch.setattr(core.extrators, "extrair_textos_paginas_pdf", lambda filepath: list(textos_pdf))
+    monkeypatch.setattr(core.extrators, "extrair_textos_ocr_por_pagina", ocr)
+    return ocr_por_pagina
+
+
+def test_paginas_digitais_nao_voltam_ao_ocr(documento):
+    dados = extrair_dados("documento.pdf", usar_cache=False)
+
+    assert dados['pos_nf'] == ["123456"] and dados['linhas_nf']
+    # Anexo digitalizado em todos os DPIs; cabeçalho até fornecer a PO;
+    # as páginas com linhas de pedido e com texto suficiente, nunca
+    assert documento == {3: len(DPIS), 1: 2}
+
+
+def test_camada_de_texto_ilegivel_usa_todas_as_paginas(documento, monkeypatch):
+    ilegivel = ["(cid:12)(cid:40)(cid:7)(cid:3)(cid:91)(cid:2)(cid:18)(cid:77)"] * 2
+    monkeypatch.setattr(core.extrators, "extrair_textos_paginas_pdf", lambda filepath: list(ilegivel))
+
+    extrair_dados("documento.pdf", usar_cache=False)
+    assert documento == {1: len(DPIS), 2: len(DPIS)}
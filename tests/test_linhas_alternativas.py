@@ -0,0 +1,99 @@
+"""extrair_linhas_alternativas contra o padrão alternativo original (regex com retrocesso)."""
+import random
+import re
+
+import pytest
+
+from core.extrators import extrair_linhas_alternativas
+
+# Padrão alternativo original de extrair_linhas_pedido
+PADRAO_ORIGINAL = re.compile(
+    r'(?:/)?\s*(?:PO\s+)?(?P<po>\d{6})[\s\S]*?(?:linha|item)[\s:]*(?P<linha>\d+)[\s\S]*?'
+    r'(?:valor|vlr?|total)[\s:]*[\$R]*(?P<valor>[\d.,]+)'
+    r'(?:[\s/;-]*(?P<descricao>[^\n\r]*))?',
+    re.IGNORECASE
+)
+
+
+def original(texto: str) -> list[dict]:
+    return [match.groupdict() for match in PADRAO_ORIGINAL.finditer(texto)]
+
+
+def linear(texto: str) -> list[dict]:
+    return [linha.groupdict() for linha in extrair_linhas_alternativas(texto)]
+
+
+@pytest.mark.parametrize("texto", [
+    # Formato real (layout das notas e variações do OCR)
+    "PO 123456 LINHA 1 VALOR 1.500,00 / SERVICO DE MANUTENCAO",
+    "PO 123456 LINHA 1 VALOR 1.500,00 / A\nPO 654321 LINHA 2 VALOR 20,50 / B\n",
+    "PO: 123456 Item: 3 Vlr: R$ 99,90 - LIMPEZA",
+    "123456 item 12 total R$1.234,56; PINTURA",
+    "PO 123456\nLINHA 4\nVALOR 10,00\nDESCRICAO NA LINHA SEGUINTE",
+    "Pedido 123456 - linha 7 - vl 300,00",
+    # Espaços e separadores a mais
+    "PO    123456     LINHA   :  5     VALOR  :   $R 45,00   /  ;  -  TEXTO",
+    "\t123456\tLINHA\t9\tVALOR\t9,99\t/\tTAB",
+    # Sem descrição
+    "PO 123456 LINHA 1 VALOR 10,00",
+    "PO 123456 LINHA 1 VALOR 10,00\n",
+    "PO 123456 LINHA 1 VALOR 10,00 /\r\nPO 654321 LINHA 2 VALOR 5,00",
+    # Valores quebrados
+    "PO 123456 LINHA 1 VALOR , / VIRGULA",
+    "PO 123456 LINHA 1 VALOR R$ abc / SEM NUMERO\nVALOR 7,00 / DEPOIS",
+    "PO 123456 LINHA 1 VALOR 1.2.3,4,5 / PONTUACAO",
+    "PO 123456 LINHA x VALOR 1,00\nLINHA 2 VALOR 3,00",
+    # Vários matches na mesma linha
+    "PO 123456 LINHA 1 VALOR 1,00 PO 654321 LINHA 2 VALOR 2,00",
+    "123456 linha 1 valor 1,00 / 234567 item 2 vlr 2,00 / 345678 linha 3 total 3,00",
+    # Números de seis dígitos sem as palavras-chave (pior caso da regex)
+    "123456 234567 345678 linha 1 456789 valor 10,00",
+    "123456 linha 1 234567 linha 2 345678",
+    "1234567 LINHA 1 VALOR 1,00",
+    "12345 LINHA 1 VALOR 1,00",
+    "LINHA 1 VALOR 1,00 123456",
+    # Palavras-chave dentro de outras palavras e maiúsculas/minúsculas
+    "123456 alinhamento 2 equivalor 3,00",
+    "123456 ITEMIZADO 4 TOTALIZADO 5,00",
+    "123456 LiNhA 6 VaLoR 7,00 / MiStO",
+    "",
+])
+def test_mesmas_linhas_do_padrao_original(texto):
+    assert linear(texto) == original(texto)
+
+
+def texto_aleatorio(rng: random.Random) -> str:
+    """Linhas no formato das notas com partes trocadas, repetidas ou faltando, e ruído entre elas."""
+    partes = [
+        ["", "PO ", "po:", "/ ", "Pedido "],
+        ["123456", "654321", "1234567", "12345", "123456 234567"],
+        [" ", "  ", "\n", " - ", ""],
+        ["LINHA ", "linha", "Item: ", "item", "ITEMIZADO ", ""],
+        ["1", "12", "x", ":  3", ""],
+        [" ", "\n", " 345678 ", ""],
+        ["VALOR ", "valor:", "vl ", "Vlr", "total ", "equivalor ", ""],
+        ["R$ ", "$R", "", " "],
+        ["1.500,00", "10,00", ",", ".", "abc", ""],
+        [" / SERVICO", "; LIMPEZA", " -", "", "\r\n", " /"],
+        ["\n", " ", ""],
+    ]
+    return "".join(
+        "".join(rng.choice(opcoes) for opcoes in partes if rng.random() < 0.9)
+        for _ in range(rng.randint(1, 4))
+    )
+
+
+def test_textos_aleatorios():
+    """Combinações aleatórias (semente fixa): linhas deformadas e trechos soltos."""
+    rng = random.Random(0)
+    trechos = [
+        "123456", "654321", "1234567", "12345", "PO ", "po:", "/", " ", "  ", "\n", "\r\n", ";", "-", ":",
+        "linha", "LINHA ", "item", "Item: ", "valor", "VALOR ", "vl", "vlr ", "total ", "R$", "$R",
+        "1", "12", "1.500,00", ",", ".", "abc", "SERVICO",
+    ]
+    for _ in range(3000):
+        texto = texto_aleatorio(rng)
+        assert linear(texto) == original(texto), texto
+
+        texto = "".join(rng.choice(trechos) for _ in range(rng.randint(1, 30)))
+        assert linear(texto) == original(texto), texto
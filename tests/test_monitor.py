@@ -0,0 +1,73 @@
+"""Observadores da pasta monitorada e o filtro de arquivos em gravação."""
+import sys
+import time
+
+import pytest
+
+from core.monitor import Estabilizacao, ObservadorInotify, ObservadorPolling, criar_observador
+
+
+def esperar_eventos(observador, caminho, limite=5.0):
+    """Eventos do observador até ``caminho`` aparecer ou o limite se esgotar."""
+    fim = time.monotonic() + limite
+    vistos = []
+    while time.monotonic() < fim and str(caminho) not in vistos:
+        vistos.extend(observador.eventos(0.2))
+    return vistos
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify só existe no Linux")
+def test_inotify_relata_pdfs_novos_inclusive_em_subpastas(tmp_path):
+    observador = criar_observador(str(tmp_path))
+    try:
+        assert isinstance(observador, ObservadorInotify)
+
+        pdf = tmp_path / "NF 1 Linear.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n")
+        assert str(pdf) in esperar_eventos(observador, pdf)
+
+        # Pasta criada depois do início: passa a ser vigiada
+        subpasta = tmp_path / "lote"
+        subpasta.mkdir()
+        esperar_eventos(observador, subpasta, limite=0.5)
+        outro = subpasta / "NF 2 Linear.pdf"
+        outro.write_bytes(b"%PDF-1.4\n")
+        assert str(outro) in esperar_eventos(observador, outro)
+
+        # As pastas de destino dos processados não são vigiadas
+        processadas = tmp_path / "Notas Processadas"
+        processadas.mkdir()
+        movido = processadas / "NF 1 Linear.pdf"
+        pdf.rename(movido)
+        assert str(movido) not in esperar_eventos(observador, movido, limite=0.5)
+    finally:
+        observador.fechar()
+
+
+def test_polling_relata_pdfs_novos_e_alterados(tmp_path):
+    observador = ObservadorPolling(str(tmp_path), intervalo=0.05)
+    pdf = tmp_path / "NF 1 Linear.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    assert str(pdf) in esperar_eventos(observador, pdf)
+
+    pdf.write_bytes(b"%PDF-1.4\n%%EOF\n")
+    assert str(pdf) in esperar_eventos(observador, pdf)
+
+
+def test_estabilizacao_espera_o_fim_da_gravacao(tmp_path):
+    pdf = tmp_path / "NF 1 Linear.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    estabilizacao = Estabilizacao(segundos=0.1, espera_maxima=60)
+
+    estabilizacao.tocar(str(pdf))
+    assert estabilizacao.prontos() == []
+    time.sleep(0.15)
+    # Estável, mas sem o marcador %%EOF: continua aguardando
+    assert estabilizacao.prontos() == []
+
+    with open(pdf, "ab") as arquivo:
+        arquivo.write(b"%%EOF\n")
+    assert estabilizacao.prontos() == []
+    time.sleep(0.15)
+    assert estabilizacao.prontos() == [str(pdf)]
+    assert len(estabilizacao) == 0
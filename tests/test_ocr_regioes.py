@@ -0,0 +1,24 @@
+"""Escolha do OCR por regiões conforme o motor (OCR_ROI_ATIVO)."""
+import pytest
+
+from core import ocr_utils
+from core.ocr_engines import MotorPytesseract, MotorTesserocr
+from core.ocr_utils import _MotorContado, usar_regioes
+
+
+class Motor:
+    def __init__(self, nome):
+        self.nome = nome
+
+
+@pytest.mark.parametrize("ativo, backend, esperado", [
+    ("auto", MotorTesserocr.nome, True),
+    ("auto", MotorPytesseract.nome, False),
+    (True, MotorPytesseract.nome, True),
+    (False, MotorTesserocr.nome, False),
+])
+def test_usar_regioes(monkeypatch, ativo, backend, esperado):
+    monkeypatch.setattr(ocr_utils, "OCR_ROI_ATIVO", ativo)
+    assert usar_regioes(Motor(backend)) is esperado
+    # O motor contado (custo do escalonamento) mantém o nome do motor do pool
+    assert usar_regioes(_MotorContado(Motor(backend), {})) is esperado
@@ -0,0 +1,97 @@
+"""Encerramento das etapas do pipeline e da extração em série no cancelamento."""
+import os
+import threading
+import time
+
+import pytest
+
+import core.processor
+from core.controle import ControleExecucao, verificar_cancelamento
+from core.pipeline import em_thread
+
+ARQUIVOS = [f"NF {nota} Linear PO 123456.pdf" for nota in range(1, 4)]
+
+
+@pytest.fixture(autouse=True)
+def sem_threads_restantes():
+    yield
+    for thread in threading.enumerate():
+        if thread.name.startswith("pipeline-"):
+            thread.join(5)
+
+
+def test_close_espera_o_produtor_e_fecha_a_fonte():
+    liberar = threading.Event()
+    estado = {"fechada": False, "em_andamento": False}
+
+    def fonte():
+        try:
+            yield 1
+            estado["em_andamento"] = True
+            liberar.wait(5)
+            estado["em_andamento"] = False
+            yield 2
+            yield 3
+        finally:
+            estado["fechada"] = True
+
+    etapa = em_thread(fonte(), tamanho_fila=1, nome="teste-close")
+    assert next(etapa) == 1
+    while not estado["em_andamento"]:
+        time.sleep(0.01)
+
+    threading.Timer(0.2, liberar.set).start()
+    etapa.close()
+
+    # O item em andamento terminou e a fonte foi fechada antes de close() retornar
+    assert not estado["em_andamento"] and estado["fechada"]
+    assert not any(t.name == "pipeline-teste-close" for t in threading.enumerate())
+
+
+def test_cancelar_encerra_a_extracao_em_serie(tmp_path, monkeypatch):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    for nome in ARQUIVOS:
+        (entrada / nome).write_bytes(b"%PDF-1.4\n%%EOF\n")
+
+    controle = ControleExecucao()
+    extraidas, interrompidas = [], []
+
+    def extrair(filepath, usar_cache=True):
+        nome = os.path.basename(filepath)
+        if len(extraidas) == 2:
+            # Extração lenta, em andamento quando o escritor vê o cancelamento;
+            # só termina por ele (ou pelo limite do teste)
+            while not controle.cancelado:
+                time.sleep(0.01)
+            time.sleep(0.1)
+            limite = time.monotonic() + 2
+            while time.monotonic() < limite:
+                try:
+                    verificar_cancelamento()
+                except BaseException:
+                    interrompidas.append(nome)
+                    raise
+                time.sleep(0.01)
+        extraidas.append(nome)
+        resultado = {"numero_nf": nome.split()[1], "data_nf": "10/01/2024", "linhas": []}
+        return resultado, "sucesso", None, {}
+
+    def cancelar_no_primeiro(atual, total):
+        # Cancela com o segundo documento já na fila: o escritor para nele
+        while len(extraidas) < 2:
+            time.sleep(0.01)
+        controle.cancelar()
+
+    monkeypatch.setattr(core.processor, "_process_pdf_protegido", extrair)
+    resumo = core.processor.process_directory(
+        str(entrada), "Linear", ["Cancelada"], str(tmp_path / "saida"), "POs.xlsx",
+        cancelar_no_primeiro, lambda mensagem: None,
+        workers=1, usar_cache=False, formatos=["xlsx"], controle=controle
+    )
+
+    assert resumo["cancelado"]
+    # A extração em andamento viu o cancelamento e a thread dela já terminou
+    assert len(extraidas) == 2 and len(interrompidas) == 1
+    assert not any(t.name == "pipeline-extracao" for t in threading.enumerate())
+
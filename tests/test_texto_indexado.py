@@ -0,0 +1,129 @@
+"""Extração dos campos por TextoIndexado contra as expressões originais, aplicadas ao texto inteiro."""
+import random
+import re
+from datetime import datetime
+
+import pytest
+
+from core.extrators import extrair_campos
+
+NOME = "documento.pdf"  # sem NF nem PO no nome: os campos vêm só do texto
+
+
+def nf_original(texto: str) -> str:
+    for pattern in (r'numero\s+da\s+nota[^\d]*(\d{4,})', r'\bnota\s*[.:]?\s*(\d{4,})'):
+        match = re.search(pattern, texto, re.IGNORECASE)
+        if match:
+            num = match.group(1).strip()
+            if num.isdigit() and len(num) >= 4:
+                return num
+
+    matches = re.findall(r'\b(?!0{4,})\d{4,}\b', texto)
+    return matches[0] if matches else ""
+
+
+def pos_original(texto: str) -> list[str]:
+    return list(dict.fromkeys(re.findall(r'\bPO\s+(\d{6})\b', texto, re.IGNORECASE)))
+
+
+def data_original(texto: str) -> str:
+    patterns = [
+        r'(?:data\s+e\s+hora\s+da\s+emiss[ao]\s*|emiss[ao]\s*:\s*)(\d{2}/\d{2}/\d{4})',
+        r'(?:data\s*:\s*|emiss[ao]\s*em\s*)(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})',
+        r'\b(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})\b'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, texto, re.IGNORECASE)
+        if match:
+            data = match.group(1).replace('-', '/').replace('.', '/')
+            try:
+                datetime.strptime(data, '%d/%m/%Y')
+                return data
+            except ValueError:
+                continue
+    return ""
+
+
+def linhas_original(texto: str) -> list[dict]:
+    """Com o prefixo opcional "(?:/)?\\s*(?:PO\\s+)?" do padrão preciso original."""
+    padrao_preciso = re.compile(
+        r'(?:/)?\s*(?:PO\s+)?(?P<po>\d{6})\s+LINHA\s+(?P<linha>\d+)\s+VALOR\s+(?P<valor>[\d.,]+)\s*/\s*(?P<descricao>[^\n\r]*)',
+        re.IGNORECASE
+    )
+    padrao_alternativo = re.compile(
+        r'(?:/)?\s*(?:PO\s+)?(?P<po>\d{6})[\s\S]*?(?:linha|item)[\s:]*(?P<linha>\d+)[\s\S]*?'
+        r'(?:valor|vlr?|total)[\s:]*[\$R]*(?P<valor>[\d.,]+)'
+        r'(?:[\s/;-]*(?P<descricao>[^\n\r]*))?',
+        re.IGNORECASE
+    )
+    matches = list(padrao_preciso.finditer(texto)) or list(padrao_alternativo.finditer(texto))
+    return [match.groupdict() for match in matches]
+
+
+def campos_original(texto: str) -> dict:
+    pos = pos_original(texto)
+    return {
+        'numero_nf': nf_original(texto),
+        'data_nf': data_original(texto),
+        'pos_nf': [po for po in pos if po.isdigit() and len(po) == 6],
+        'linhas_nf': linhas_original(texto),
+    }
+
+
+def campos(texto: str) -> dict:
+    dados = extrair_campos(NOME, texto)
+    return {**dados, 'linhas_nf': [linha.groupdict() for linha in dados['linhas_nf']]}
+
+
+NOTA = (
+    "NOTA FISCAL DE SERVICOS ELETRONICA\nNumero da Nota: 000123456\n"
+    "Data e Hora da Emissao 10/01/2024 08:15:00\n"
+    "PO 123456 LINHA 1 VALOR 1.500,00 / SERVICO DE MANUTENCAO\n"
+    "PO 654321 LINHA 2 VALOR 20,50 / LIMPEZA\n\nVALOR TOTAL DA NOTA R$ 1.520,50"
+)
+
+
+@pytest.mark.parametrize("texto", [
+    NOTA,
+    NOTA.lower(),
+    NOTA.replace("\n", "\r\n"),
+    # Prefixo do padrão preciso: barra, espaços e "PO" antes do número
+    "/ PO 123456 LINHA 1 VALOR 1,00 / A\n/123456 LINHA 2 VALOR 2,00 / B",
+    "PO  PO 123456 LINHA 1 VALOR 1,00 / A",
+    "XPO 123456 LINHA 1 VALOR 1,00 / A",
+    # Só o padrão alternativo
+    "Pedido 123456 item 3 vlr R$ 9,90 - PINTURA\nNota: 98765",
+    # Número da nota: cada padrão e o genérico
+    "nota . 4321\nnumero   da   nota ... 5555",
+    "NOTA: 12\ncodigo 0000 e 00012345",
+    "notas 1234 nota1234",
+    # Datas: prioridade, separadores e datas inválidas
+    "Emissao: 31/02/2024\ndata: 01-03-2024",
+    "emissao em 05.06.2023 e 07/08/2022",
+    "DATA E HORA DA EMISSAO 11/12/2021",
+    "emissa: 01/01/2020",
+    "12/13/2024 e 01/01/2024",
+    # Palavras-chave sem o resto do padrão
+    "LINHA VALOR PO NOTA DATA EMISSAO ITEM TOTAL",
+    "",
+    # Caracteres que mudam com lower() ou que a regex iguala a ASCII
+    "İtem 1 PO 123456 LINHA 1 VALOR 1,00 / A",
+    "NOTA 1234 ſ PO 123456 lınha 2 valor 3,00 / B",
+    "KELVIN nota 5678 data: 01/01/2024",
+])
+def test_mesmos_campos_das_expressoes_originais(texto):
+    assert campos(texto) == campos_original(texto)
+
+
+def test_textos_aleatorios():
+    """Trechos dos padrões combinados ao acaso (semente fixa)."""
+    rng = random.Random(0)
+    trechos = [
+        "PO ", "po", "/", " ", "\n", ":", ".", "-", "nota", "NOTA ", "numero da nota ", "data", "Data: ",
+        "emissao", "Emissao: ", "emissao em ", "data e hora da emissao ", "LINHA ", "item ", "VALOR ", "vlr ",
+        "total ", "R$", "123456", "654321", "1234", "0000", "10/01/2024", "31.12.2023", "99-99-9999",
+        "1.500,00", "SERVICO", "İ", "ı",
+    ]
+    for _ in range(3000):
+        texto = "".join(rng.choice(trechos) for _ in range(rng.randint(1, 25)))
+        assert campos(texto) == campos_original(texto), texto
@@ -0,0 +1,94 @@
+"""Anexação incremental ao POs.xlsx: gravar, reabrir com o openpyxl e anexar de novo."""
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from core import file_utils, xlsx_incremental
+from core.file_utils import salvar_em_xlsx
+from core.xlsx_incremental import anexar_incremental, caminho_manifesto, carregar_manifesto
+
+NOME = "POs.xlsx"
+
+
+def linha(nota, linha_po, valor, data="10/01/2024", descricao="SERVICO DE MANUTENCAO"):
+    # Valores já no tipo das células: a regra de duplicata compara a linha
+    # nova, sem conversão, às linhas gravadas
+    return {"nota": nota, "data_emissao": data, "linha": linha_po, "descricao": descricao, "valor": valor}
+
+
+def linhas_da_planilha(caminho, titulo):
+    """Valores (sem o cabeçalho) e cor de fundo da primeira célula de cada linha."""
+    wb = load_workbook(caminho)
+    try:
+        ws = wb[titulo]
+        return [
+            (tuple(celula.value for celula in celulas), celulas[0].fill.fgColor.rgb)
+            for celulas in ws.iter_rows(min_row=4)
+        ]
+    finally:
+        wb.close()
+
+
+def test_anexa_reabre_e_anexa_de_novo(tmp_path):
+    caminho = str(tmp_path / NOME)
+
+    assert salvar_em_xlsx(str(tmp_path), {"123456": [linha(1, 10, 100.5)]}, NOME)
+    assert carregar_manifesto(caminho) is not None
+
+    # Segunda gravação: pelo manifesto, sem carregar o workbook
+    assert salvar_em_xlsx(str(tmp_path), {
+        "123456": [linha(2, 20, 250.5)],
+        "654321": [linha(3, 10, 80.25)],
+    }, NOME)
+    valores = [v for v, _ in linhas_da_planilha(caminho, "PO_123456")]
+    assert [v[0] for v in valores] == [1, 2]
+    assert [v[0] for v, _ in linhas_da_planilha(caminho, "PO_654321")] == [3]
+
+    # O workbook reaberto continua válido para uma nova anexação, agora com uma duplicata
+    manifesto = carregar_manifesto(caminho)
+    assert manifesto is not None
+    assert salvar_em_xlsx(str(tmp_path), {"123456": [linha(1, 10, 100.5)]}, NOME)
+
+    linhas = linhas_da_planilha(caminho, "PO_123456")
+    assert [v[0] for v, _ in linhas] == [1, 2, 1]
+    # A primeira ocorrência é marcada em amarelo e a repetida em vermelho
+    assert [fundo for _, fundo in linhas] == ["00FFFF99", "00BDD7EE", "00FF9999"]
+    assert carregar_manifesto(caminho) is not None
+
+
+def test_falha_ao_substituir_preserva_o_original(tmp_path, monkeypatch):
+    caminho = str(tmp_path / NOME)
+    assert salvar_em_xlsx(str(tmp_path), {"123456": [linha(1, 10, 100.5)]}, NOME)
+    with open(caminho, "rb") as arquivo:
+        original = arquivo.read()
+
+    def falhar(origem, destino):
+        raise PermissionError(13, "arquivo em uso", destino)
+
+    monkeypatch.setattr(xlsx_incremental.os, "replace", falhar)
+    novos = {"123456": [(["2", "10/01/2024", "20", "X", "1,00"], [2, "10/01/2024", 20, "X", 1.0])]}
+    with pytest.raises(PermissionError):
+        anexar_incremental(caminho, novos, carregar_manifesto(caminho))
+
+    assert sorted(os.listdir(tmp_path)) == sorted([NOME, os.path.basename(caminho_manifesto(caminho))])
+    with open(caminho, "rb") as arquivo:
+        assert arquivo.read() == original
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_cabecalhos_e_larguras_vem_da_configuracao(tmp_path, monkeypatch, streaming):
+    cabecalhos = ["Nota", "Emissão", "Linha", "Serviço", "Total"]
+    larguras = {"A": 12, "B": 14, "C": 10, "D": 60, "E": 16}
+    monkeypatch.setattr(file_utils, "XLSX_CABECALHOS", cabecalhos)
+    monkeypatch.setattr(file_utils, "XLSX_LARGURAS_COLUNAS", larguras)
+
+    assert salvar_em_xlsx(str(tmp_path), {"123456": [linha(1, 10, 100.5)]}, NOME, streaming=streaming)
+
+    wb = load_workbook(tmp_path / NOME)
+    try:
+        ws = wb["PO_123456"]
+        assert [celula.value for celula in ws[3]] == cabecalhos
+        assert {coluna: ws.column_dimensions[coluna].width for coluna in larguras} == larguras
+    finally:
+        wb.close()